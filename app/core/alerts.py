@@ -0,0 +1,118 @@
+import asyncio
+import itertools
+import json
+import logging
+from datetime import datetime
+from threading import Lock
+from app.core.cache.catalog import StockLevelChange
+
+logger = logging.getLogger(__name__)
+
+
+# events buffered per subscriber; a subscriber that falls this far behind is dropped
+ALERT_QUEUE_SIZE = 256
+
+# idle streams send a comment this often so proxies keep the connection open
+ALERT_HEARTBEAT_SECONDS = 15.0
+
+
+# one server-sent event; the event name is the new stock status
+def format_sse(event: dict) -> str:
+    data = json.dumps(event, separators=(",", ":"))
+    return f"id: {event['id']}\nevent: {event['status']}\ndata: {data}\n\n"
+
+
+# one consumer of the alert stream; events are handed over to the event loop the
+# subscriber was created on, since stock writes run in worker threads
+class AlertSubscription:
+    def __init__(self, hub: "StockAlertHub", queue_size: int):
+        self._hub = hub
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue[dict | None] = asyncio.Queue(queue_size)
+        self.dropped = False
+
+    def _offer(self, events: list[dict]) -> None:
+        if self.dropped:
+            return
+        try:
+            for event in events:
+                self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.close()
+            logger.warning("Dropped a stock alert subscriber that fell behind")
+
+    # called from any thread
+    def deliver(self, events: list[dict]) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._offer, events)
+        except RuntimeError:
+            # the subscriber's event loop is gone
+            self._hub.unsubscribe(self)
+
+    # waits for the next event; None on timeout, or once the subscription is
+    # closed (then dropped is set)
+    async def get(self, timeout: float | None = None) -> dict | None:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    # must run on the subscriber's event loop
+    def close(self) -> None:
+        self.dropped = True
+        self._hub.unsubscribe(self)
+        # wakes up a pending get() with the end-of-stream marker
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+
+# in-process broadcast of stock status changes to any number of subscribers
+class StockAlertHub:
+    def __init__(self, queue_size: int = ALERT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: set[AlertSubscription] = set()
+        self._lock = Lock()
+        self._sequence = itertools.count(1)
+
+    # must be called from the event loop that will consume the events
+    def subscribe(self) -> AlertSubscription:
+        subscription = AlertSubscription(self, self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: AlertSubscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    # fans the changes of a committed stock write out to every subscriber
+    def publish(self, changes: list[StockLevelChange]) -> None:
+        if not changes:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+            if not subscribers:
+                return
+            events = [
+                {
+                    "id": next(self._sequence),
+                    "product_id": change.product_id,
+                    "name": change.name,
+                    "status": change.status,
+                    "previous_status": change.previous_status,
+                    "stock_quantity": change.stock_quantity,
+                    "min_stock_level": change.min_stock_level,
+                    "timestamp": datetime.now().isoformat(),
+                }
+                for change in changes
+            ]
+        for subscriber in subscribers:
+            subscriber.deliver(events)
+
+
+stock_alert_hub = StockAlertHub()
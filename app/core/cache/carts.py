@@ -0,0 +1,188 @@
+import time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+from typing import NamedTuple
+
+
+# carts kept at most; the least recently used are evicted first
+CART_STORE_SIZE = 100_000
+
+# carts untouched for this long are considered abandoned and evicted
+CART_IDLE_SECONDS = 2 * 60 * 60
+
+# distinct products a cart may hold
+MAX_CART_LINES = 1000
+
+# share of the subtotal members save, as applied by the sale path
+MEMBER_DISCOUNT_RATE = 0.3
+
+
+# a server-side cart: quantity and unit price per product, with the subtotal
+# kept up to date on every change instead of being re-summed on each quote
+class Cart:
+    __slots__ = ("cart_id", "user_id", "is_member", "lines", "subtotal", "touched_at")
+
+    def __init__(self, cart_id: str, user_id: int, is_member: bool):
+        self.cart_id = cart_id
+        self.user_id = user_id
+        self.is_member = is_member
+        # product id -> (quantity, unit price)
+        self.lines: dict[int, tuple[int, float]] = {}
+        self.subtotal = 0.0
+        self.touched_at = time.monotonic()
+
+    def set_line(self, product_id: int, quantity: int, unit_price: float) -> None:
+        old_quantity, old_price = self.lines.get(product_id, (0, 0.0))
+        self.subtotal += quantity * unit_price - old_quantity * old_price
+        if quantity:
+            self.lines[product_id] = (quantity, unit_price)
+        else:
+            self.lines.pop(product_id, None)
+        if not self.lines:
+            # drops the float drift of the running sum
+            self.subtotal = 0.0
+
+    @property
+    def item_count(self) -> int:
+        return sum(quantity for quantity, _ in self.lines.values())
+
+    @property
+    def discount(self) -> float:
+        return self.subtotal * MEMBER_DISCOUNT_RATE if self.is_member else 0.0
+
+    @property
+    def total(self) -> float:
+        return self.subtotal - self.discount
+
+
+# consistent copy of a cart, taken under the store lock
+class CartState(NamedTuple):
+    cart_id: str
+    user_id: int
+    is_member: bool
+    lines: dict[int, tuple[int, float]]
+    subtotal: float
+    discount: float
+    total: float
+
+
+# process-wide LRU of the open carts; abandoned carts are evicted lazily, so
+# the store never needs a background sweep
+class CartStore:
+    def __init__(
+        self, max_size: int = CART_STORE_SIZE, idle_seconds: float = CART_IDLE_SECONDS
+    ):
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self._carts: OrderedDict[str, Cart] = OrderedDict()
+        self._lock = Lock()
+
+    def _evict(self) -> None:
+        cutoff = time.monotonic() - self.idle_seconds
+        while self._carts:
+            cart = next(iter(self._carts.values()))
+            if cart.touched_at >= cutoff and len(self._carts) <= self.max_size:
+                break
+            self._carts.popitem(last=False)
+
+    def _cart(self, cart_id: str) -> Cart:
+        self._evict()
+        cart = self._carts.get(cart_id)
+        if cart is None:
+            raise ValueError(f"Cart '{cart_id}' not found or expired")
+        cart.touched_at = time.monotonic()
+        self._carts.move_to_end(cart_id)
+        return cart
+
+    @staticmethod
+    def _state(cart: Cart) -> CartState:
+        return CartState(
+            cart.cart_id,
+            cart.user_id,
+            cart.is_member,
+            dict(cart.lines),
+            cart.subtotal,
+            cart.discount,
+            cart.total,
+        )
+
+    def create(self, user_id: int, is_member: bool) -> CartState:
+        cart = Cart(uuid.uuid4().hex, user_id, is_member)
+        with self._lock:
+            self._carts[cart.cart_id] = cart
+            self._evict()
+            return self._state(cart)
+
+    # None if the cart does not exist or was evicted
+    def get(self, cart_id: str) -> CartState | None:
+        with self._lock:
+            try:
+                return self._state(self._cart(cart_id))
+            except ValueError:
+                return None
+
+    # adds quantity units of a product at unit_price; the line may not grow
+    # past max_quantity units
+    def add(
+        self,
+        cart_id: str,
+        product_id: int,
+        quantity: int,
+        unit_price: float,
+        max_quantity: int,
+    ) -> CartState:
+        with self._lock:
+            cart = self._cart(cart_id)
+            if product_id not in cart.lines and len(cart.lines) >= MAX_CART_LINES:
+                raise ValueError(f"A cart holds at most {MAX_CART_LINES} products")
+            current = cart.lines.get(product_id, (0, unit_price))[0]
+            if current + quantity > max_quantity:
+                raise ValueError(
+                    f"Only {max(max_quantity, 0)} units of product {product_id} "
+                    f"are available, the cart would hold {current + quantity}"
+                )
+            cart.set_line(product_id, current + quantity, unit_price)
+            return self._state(cart)
+
+    # removes quantity units of a product, or the whole line without a quantity
+    def remove(
+        self, cart_id: str, product_id: int, quantity: int | None = None
+    ) -> CartState:
+        with self._lock:
+            cart = self._cart(cart_id)
+            if product_id not in cart.lines:
+                raise ValueError(f"Product {product_id} is not in the cart")
+            current, unit_price = cart.lines[product_id]
+            remaining = 0 if quantity is None else max(current - quantity, 0)
+            cart.set_line(product_id, remaining, unit_price)
+            return self._state(cart)
+
+    # applies current unit prices to the lines (None drops a product that no
+    # longer exists); only the changed lines touch the subtotal
+    def reprice(self, cart_id: str, prices: dict[int, float | None]) -> CartState:
+        with self._lock:
+            cart = self._cart(cart_id)
+            for product_id, price in prices.items():
+                line = cart.lines.get(product_id)
+                if line is None or line[1] == price:
+                    continue
+                cart.set_line(
+                    product_id, line[0] if price is not None else 0, price or 0.0
+                )
+            return self._state(cart)
+
+    def discard(self, cart_id: str) -> None:
+        with self._lock:
+            self._carts.pop(cart_id, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._carts)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._carts.clear()
+
+
+cart_store = CartStore()
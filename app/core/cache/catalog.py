@@ -0,0 +1,441 @@
+import bisect
+import heapq
+from array import array
+from threading import Lock
+from typing import NamedTuple
+from sqlmodel import Session, select
+from app.database import MAX_IN_CLAUSE
+from app.models import Product
+from app.core.cache.tag_index import bitmap_from_ids, ids_from_bitmap
+
+
+# the price-sorted order keeps a cumulative bitmap every PRICE_BLOCK products
+PRICE_BLOCK = 1024
+
+_COLUMNS = (
+    Product.id,
+    Product.name,
+    Product.type,
+    Product.brand,
+    Product.price,
+    Product.stock_quantity,
+    Product.min_stock_level,
+)
+
+
+# stock status of a product, as reported by the stock alerts
+IN_STOCK = "in_stock"
+LOW_STOCK = "low_stock"
+OUT_OF_STOCK = "out_of_stock"
+
+
+def stock_status(stock_quantity: int, min_stock_level: int) -> str:
+    if stock_quantity <= 0:
+        return OUT_OF_STOCK
+    if stock_quantity <= min_stock_level:
+        return LOW_STOCK
+    return IN_STOCK
+
+
+# a product whose stock status changed in a refresh
+class StockLevelChange(NamedTuple):
+    product_id: int
+    name: str
+    previous_status: str
+    status: str
+    stock_quantity: int
+    min_stock_level: int
+
+
+class CatalogRow(NamedTuple):
+    id: int
+    name: str
+    type: str
+    brand: str
+    price: float
+    stock_quantity: int
+    min_stock_level: int
+
+
+# read-optimized, column-oriented copy of the product table; set membership
+# (brand, type, in stock) is kept as product-id bitmaps like the TagIndex
+class CatalogSnapshot:
+    def __init__(self):
+        self._lock = Lock()
+        self._loaded = False
+        self._reset()
+
+    def _reset(self) -> None:
+        # row-aligned columns; rows of deleted products stay as tombstones
+        self.rows: dict[int, int] = {}
+        self.ids = array("q")
+        self.names: list[str] = []
+        self.prices = array("d")
+        self.stock = array("q")
+        self.min_stock = array("q")
+        self.brand_codes = array("i")
+        self.type_codes = array("i")
+
+        # dictionary-encoded brand and type values
+        self.brands: list[str] = []
+        self.types: list[str] = []
+        self._brand_codes: dict[str, int] = {}
+        self._type_codes: dict[str, int] = {}
+
+        self.brand_bitmaps: list[int] = []
+        self.type_bitmaps: list[int] = []
+        self.all_products = 0
+        self.in_stock = 0
+        # 0 < stock <= min level, and stock == 0; kept up to date on every refresh
+        self.low_stock = 0
+        self.out_of_stock = 0
+
+        # rows in (name, id) order and the rank of each row in that order,
+        # rebuilt lazily after renames/inserts
+        self._name_order: list[int] = []
+        self._name_rank: array | None = None
+
+        self._price_ids: list[int] | None = None
+        self._price_values = array("d")
+        self._price_prefix: list[int] = []
+
+    @staticmethod
+    def _encode(
+        value: str, values: list[str], codes: dict[str, int], bitmaps: list[int]
+    ) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = len(values)
+            codes[value] = code
+            values.append(value)
+            bitmaps.append(0)
+        return code
+
+    def _unset_bits(self, row: int) -> None:
+        mask = ~(1 << self.ids[row])
+        self.brand_bitmaps[self.brand_codes[row]] &= mask
+        self.type_bitmaps[self.type_codes[row]] &= mask
+        self.all_products &= mask
+        self.in_stock &= mask
+        self.low_stock &= mask
+        self.out_of_stock &= mask
+
+    # writes the columns of a row; bitmaps are set afterwards with _set_bits
+    def _set_row(self, values: tuple) -> None:
+        product_id, name, product_type, brand, price, stock, min_stock = values
+        brand_code = self._encode(
+            brand, self.brands, self._brand_codes, self.brand_bitmaps
+        )
+        type_code = self._encode(
+            product_type, self.types, self._type_codes, self.type_bitmaps
+        )
+
+        row = self.rows.get(product_id)
+        if row is None:
+            row = len(self.ids)
+            self.rows[product_id] = row
+            self.ids.append(product_id)
+            self.names.append(name)
+            self.prices.append(price)
+            self.stock.append(stock)
+            self.min_stock.append(min_stock)
+            self.brand_codes.append(brand_code)
+            self.type_codes.append(type_code)
+            self._price_ids = None
+            self._name_rank = None
+        else:
+            self._unset_bits(row)
+            if self.prices[row] != price:
+                self._price_ids = None
+            if self.names[row] != name:
+                self._name_rank = None
+            self.names[row] = name
+            self.prices[row] = price
+            self.stock[row] = stock
+            self.min_stock[row] = min_stock
+            self.brand_codes[row] = brand_code
+            self.type_codes[row] = type_code
+
+    # sets the bits of many rows at once, one OR per touched bitmap
+    def _set_bits(self, product_ids: list[int]) -> None:
+        by_brand: dict[int, list[int]] = {}
+        by_type: dict[int, list[int]] = {}
+        in_stock = []
+        low_stock = []
+        out_of_stock = []
+        for product_id in product_ids:
+            row = self.rows[product_id]
+            by_brand.setdefault(self.brand_codes[row], []).append(product_id)
+            by_type.setdefault(self.type_codes[row], []).append(product_id)
+            stock = self.stock[row]
+            if stock > 0:
+                in_stock.append(product_id)
+                if stock <= self.min_stock[row]:
+                    low_stock.append(product_id)
+            else:
+                out_of_stock.append(product_id)
+        for code, ids in by_brand.items():
+            self.brand_bitmaps[code] |= bitmap_from_ids(ids)
+        for code, ids in by_type.items():
+            self.type_bitmaps[code] |= bitmap_from_ids(ids)
+        self.all_products |= bitmap_from_ids(product_ids)
+        self.in_stock |= bitmap_from_ids(in_stock)
+        self.low_stock |= bitmap_from_ids(low_stock)
+        self.out_of_stock |= bitmap_from_ids(out_of_stock)
+
+    def _remove_row(self, product_id: int) -> None:
+        row = self.rows.pop(product_id, None)
+        if row is not None:
+            self._unset_bits(row)
+            self._price_ids = None
+
+    # rows are read and applied under the lock, so a refresh waits for the load
+    # and its later read is applied after it
+    def _ensure_loaded(self, session: Session) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            products = session.exec(select(*_COLUMNS).order_by(Product.id)).all()
+            self._reset()
+            for values in products:
+                self._set_row(tuple(values))
+            self._build_bitmaps()
+            self._loaded = True
+
+    # loads the snapshot now instead of on first use; stock status changes are
+    # only reported by refreshes of a loaded snapshot
+    def load(self, session: Session) -> None:
+        self._ensure_loaded(session)
+
+    # builds every bitmap from the columns in one pass after a full load
+    def _build_bitmaps(self) -> None:
+        self.brand_bitmaps = [0] * len(self.brands)
+        self.type_bitmaps = [0] * len(self.types)
+        self._set_bits(list(self.rows))
+
+    # re-reads the given products after a write and returns the products whose
+    # stock status changed; no-op until the snapshot is loaded. The rows are read
+    # under the lock: concurrent refreshes of a product apply their reads in the
+    # order they were taken, so an older read never overwrites a newer one.
+    def refresh(
+        self, session: Session, product_ids: list[int]
+    ) -> list[StockLevelChange]:
+        if not product_ids:
+            return []
+        product_ids = list(set(product_ids))
+        changes = []
+        with self._lock:
+            if not self._loaded:
+                return []
+            found = []
+            for start in range(0, len(product_ids), MAX_IN_CLAUSE):
+                chunk = product_ids[start : start + MAX_IN_CLAUSE]
+                statement = select(*_COLUMNS).where(Product.id.in_(chunk))
+                found.extend(session.exec(statement))
+
+            for values in found:
+                product = CatalogRow(*values)
+                row = self.rows.get(product.id)
+                if row is not None:
+                    previous = stock_status(self.stock[row], self.min_stock[row])
+                    current = stock_status(
+                        product.stock_quantity, product.min_stock_level
+                    )
+                    if previous != current:
+                        changes.append(
+                            StockLevelChange(
+                                product.id,
+                                product.name,
+                                previous,
+                                current,
+                                product.stock_quantity,
+                                product.min_stock_level,
+                            )
+                        )
+                self._set_row(product)
+            self._set_bits([values[0] for values in found])
+            for product_id in set(product_ids) - {values[0] for values in found}:
+                self._remove_row(product_id)
+        return changes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+            self._loaded = False
+
+    # PRICE RANGES
+
+    def _build_price_order(self) -> None:
+        live_rows = sorted(self.rows.values(), key=self.prices.__getitem__)
+        self._price_ids = [self.ids[row] for row in live_rows]
+        self._price_values = array("d", map(self.prices.__getitem__, live_rows))
+        self._price_prefix = [0]
+        for start in range(0, len(self._price_ids), PRICE_BLOCK):
+            block = bitmap_from_ids(self._price_ids[start : start + PRICE_BLOCK])
+            self._price_prefix.append(self._price_prefix[-1] | block)
+
+    # bitmap of the first n products in price order
+    def _price_prefix_bitmap(self, n: int) -> int:
+        block = n // PRICE_BLOCK
+        tail = self._price_ids[block * PRICE_BLOCK : n]
+        return self._price_prefix[block] | bitmap_from_ids(tail)
+
+    def _price_range(self, min_price: float | None, max_price: float | None) -> int:
+        if self._price_ids is None:
+            self._build_price_order()
+        low = (
+            0
+            if min_price is None
+            else bisect.bisect_left(self._price_values, min_price)
+        )
+        high = (
+            len(self._price_ids)
+            if max_price is None
+            else bisect.bisect_right(self._price_values, max_price)
+        )
+        if high <= low:
+            return 0
+        return self._price_prefix_bitmap(high) & ~self._price_prefix_bitmap(low)
+
+    # FILTERS AND FACETS
+
+    def filter(
+        self,
+        session: Session,
+        brand: str | None = None,
+        product_type: str | None = None,
+        min_price: float | None = None,
+        max_price: float | None = None,
+        in_stock_only: bool = False,
+    ) -> int:
+        self._ensure_loaded(session)
+        with self._lock:
+            bitmap = self.in_stock if in_stock_only else self.all_products
+            if brand is not None:
+                code = self._brand_codes.get(brand)
+                bitmap &= self.brand_bitmaps[code] if code is not None else 0
+            if product_type is not None:
+                code = self._type_codes.get(product_type)
+                bitmap &= self.type_bitmaps[code] if code is not None else 0
+            if min_price is not None or max_price is not None:
+                bitmap &= self._price_range(min_price, max_price)
+            return bitmap
+
+    # products at or below their minimum stock level, but not out of stock
+    def low_stock_products(self, session: Session) -> int:
+        self._ensure_loaded(session)
+        with self._lock:
+            return self.low_stock
+
+    def out_of_stock_products(self, session: Session) -> int:
+        self._ensure_loaded(session)
+        with self._lock:
+            return self.out_of_stock
+
+    # counts of the given products per brand and per type (non-zero only)
+    def facet_counts(self, bitmap: int) -> tuple[dict[str, int], dict[str, int]]:
+        with self._lock:
+            brands = {
+                brand: count
+                for brand, brand_bitmap in zip(self.brands, self.brand_bitmaps)
+                if (count := (bitmap & brand_bitmap).bit_count())
+            }
+            types = {
+                product_type: count
+                for product_type, type_bitmap in zip(self.types, self.type_bitmaps)
+                if (count := (bitmap & type_bitmap).bit_count())
+            }
+        return brands, types
+
+    # ROW MATERIALIZATION
+
+    def _name_key(self, row: int) -> tuple[str, int]:
+        return self.names[row], self.ids[row]
+
+    def _ensure_name_rank(self) -> None:
+        if self._name_rank is not None:
+            return
+        self._name_order = sorted(range(len(self.ids)), key=self._name_key)
+        rank = array("q", bytes(len(self.ids) * array("q").itemsize))
+        for position, row in enumerate(self._name_order):
+            rank[row] = position
+        self._name_rank = rank
+
+    def _rows_by_name(self, rows: list[int]) -> list[int]:
+        self._ensure_name_rank()
+        return sorted(rows, key=self._name_rank.__getitem__)
+
+    def _to_row(self, row: int) -> CatalogRow:
+        return CatalogRow(
+            self.ids[row],
+            self.names[row],
+            self.types[self.type_codes[row]],
+            self.brands[self.brand_codes[row]],
+            self.prices[row],
+            self.stock[row],
+            self.min_stock[row],
+        )
+
+    # returns the products of a bitmap, ordered by name (or by id)
+    def get_rows(
+        self, session: Session, bitmap: int, order_by_name: bool = True
+    ) -> list[CatalogRow]:
+        self._ensure_loaded(session)
+        with self._lock:
+            bitmap &= self.all_products
+            rows = [self.rows[pid] for pid in ids_from_bitmap(bitmap)]
+            if order_by_name:
+                rows = self._rows_by_name(rows)
+            return [self._to_row(row) for row in rows]
+
+    # returns up to limit products of a bitmap that sort after the (name, id)
+    # keyset cursor; only the page is sorted, not the whole match
+    def get_page(
+        self,
+        session: Session,
+        bitmap: int,
+        after: tuple[str, int] | None,
+        limit: int,
+    ) -> list[CatalogRow]:
+        self._ensure_loaded(session)
+        with self._lock:
+            self._ensure_name_rank()
+            start = 0
+            if after is not None:
+                start = bisect.bisect_right(self._name_order, after, key=self._name_key)
+            bitmap &= self.all_products
+            if bitmap.bit_count() ** 2 > limit * len(self.rows):
+                rows = self._walk_name_order(bitmap, start, limit)
+            else:
+                rank = self._name_rank
+                ranks = [
+                    position
+                    for pid in ids_from_bitmap(bitmap)
+                    if (position := rank[self.rows[pid]]) >= start
+                ]
+                rows = [self._name_order[p] for p in heapq.nsmallest(limit, ranks)]
+            return [self._to_row(row) for row in rows]
+
+    # dense bitmaps: walk the name order from the cursor, testing membership
+    def _walk_name_order(self, bitmap: int, start: int, limit: int) -> list[int]:
+        members = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+        size = len(members)
+        rows = []
+        for position in range(start, len(self._name_order)):
+            row = self._name_order[position]
+            product_id = self.ids[row]
+            byte = product_id >> 3
+            if (
+                byte < size
+                and members[byte] >> (product_id & 7) & 1
+                and self.rows.get(product_id) == row
+            ):
+                rows.append(row)
+                if len(rows) == limit:
+                    break
+        return rows
+
+
+catalog_snapshot = CatalogSnapshot()
@@ -0,0 +1,49 @@
+from typing import Callable
+from sqlalchemy import event
+from sqlmodel import Session
+
+
+_HOOKS = "after_commit_hooks"
+
+
+# runs on_commit once the session's current transaction commits, or discard if
+# it ends without committing (rollback or close). The in-memory caches publish
+# their changes through it, so they never hold rows of a rolled back transaction.
+def after_commit(
+    session: Session,
+    on_commit: Callable[[], None],
+    discard: Callable[[], None] | None = None,
+) -> None:
+    if not session.in_transaction():
+        # nothing is pending: the changes are already committed
+        on_commit()
+        return
+    hooks = session.info.get(_HOOKS)
+    if hooks is None:
+        hooks = session.info[_HOOKS] = []
+        event.listen(session, "after_commit", _run_hooks)
+        event.listen(session, "after_transaction_end", _discard_hooks)
+    hooks.append((on_commit, discard))
+
+
+def _take_hooks(session: Session) -> list:
+    hooks = session.info.get(_HOOKS)
+    if not hooks:
+        return []
+    taken = list(hooks)
+    hooks.clear()
+    return taken
+
+
+def _run_hooks(session: Session) -> None:
+    for on_commit, _ in _take_hooks(session):
+        on_commit()
+
+
+def _discard_hooks(session: Session, transaction) -> None:
+    # savepoints end inside the outer transaction, which decides
+    if transaction.parent is not None:
+        return
+    for _, discard in _take_hooks(session):
+        if discard is not None:
+            discard()
@@ -0,0 +1,111 @@
+import heapq
+import math
+from array import array
+from threading import Lock
+from sqlmodel import Session, select
+from app.models import OrderProduct
+
+
+# neighbours kept per product
+TOP_NEIGHBOURS = 20
+
+# very large orders (bulk/B2B) say little about affinity and cost O(n^2) pairs
+MAX_ORDER_ITEMS = 100
+
+
+# item-to-item co-purchase similarity built from OrderProduct grouped by order
+class CoPurchaseIndex:
+    def __init__(self, top_neighbours: int = TOP_NEIGHBOURS):
+        self.top_neighbours = top_neighbours
+        self._pair_counts: dict[int, dict[int, int]] = {}
+        self._order_counts: dict[int, int] = {}
+        # product id -> (neighbour ids, cosine scores), best first
+        self._neighbours: dict[int, tuple[array, array]] = {}
+        self._loaded = False
+        self._lock = Lock()
+
+    def _count_order(self, product_ids: list[int]) -> None:
+        products = list(dict.fromkeys(product_ids))[:MAX_ORDER_ITEMS]
+        for product_id in products:
+            self._order_counts[product_id] = self._order_counts.get(product_id, 0) + 1
+            row = self._pair_counts.setdefault(product_id, {})
+            for other_id in products:
+                if other_id != product_id:
+                    row[other_id] = row.get(other_id, 0) + 1
+
+    def _rank(self, product_id: int) -> None:
+        row = self._pair_counts.get(product_id)
+        if not row:
+            self._neighbours.pop(product_id, None)
+            return
+        own_count = self._order_counts[product_id]
+        best = heapq.nlargest(
+            self.top_neighbours,
+            (
+                (count / math.sqrt(own_count * self._order_counts[other_id]), other_id)
+                for other_id, count in row.items()
+            ),
+        )
+        self._neighbours[product_id] = (
+            array("q", [other_id for _, other_id in best]),
+            array("d", [score for score, _ in best]),
+        )
+
+    # reads and installs the counts under the lock, so an order committed during
+    # the load waits for it and is folded in instead of dropped
+    def _ensure_loaded(self, session: Session) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            rows = session.exec(
+                select(OrderProduct.order_id, OrderProduct.product_id).order_by(
+                    OrderProduct.order_id
+                )
+            )
+            current_order = None
+            products: list[int] = []
+            for order_id, product_id in rows:
+                if order_id != current_order:
+                    self._count_order(products)
+                    current_order, products = order_id, []
+                products.append(product_id)
+            self._count_order(products)
+
+            for product_id in self._pair_counts:
+                self._rank(product_id)
+            self._loaded = True
+
+    # returns up to limit (product id, score) pairs, best first
+    def neighbours(
+        self, session: Session, product_id: int, limit: int
+    ) -> list[tuple[int, float]]:
+        self._ensure_loaded(session)
+        entry = self._neighbours.get(product_id)
+        if entry is None:
+            return []
+        ids, scores = entry
+        return list(zip(ids[:limit], scores[:limit]))
+
+    # folds a committed order into the matrix, re-ranking only the touched rows
+    def add_order(self, product_ids: list[int]) -> None:
+        with self._lock:
+            if not self._loaded:
+                return
+            self._count_order(product_ids)
+            touched = set(product_ids)
+            for product_id in product_ids:
+                touched.update(self._pair_counts.get(product_id, ()))
+            for product_id in touched:
+                self._rank(product_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pair_counts = {}
+            self._order_counts = {}
+            self._neighbours = {}
+            self._loaded = False
+
+
+co_purchase_index = CoPurchaseIndex()
@@ -0,0 +1,83 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import NamedTuple
+from app.core.services.idempotency_service import IDEMPOTENCY_KEY_TTL_HOURS
+
+
+# responses kept in memory; older keys are still found in the database
+IDEMPOTENCY_CACHE_SIZE = 10_000
+
+
+class StoredResponse(NamedTuple):
+    request_hash: str
+    response: str
+    created_at: datetime
+
+
+# process-wide LRU of the latest idempotent responses, in front of the
+# IdempotencyKey table, plus one lock per key being processed so concurrent
+# duplicates wait for the first request instead of running again. Entries are
+# keyed by (user id, key), as the table is.
+class IdempotencyCache:
+    def __init__(
+        self,
+        max_size: int = IDEMPOTENCY_CACHE_SIZE,
+        ttl_hours: float = IDEMPOTENCY_KEY_TTL_HOURS,
+    ):
+        self.max_size = max_size
+        self.ttl = timedelta(hours=ttl_hours)
+        self._entries: OrderedDict[tuple[int, str], StoredResponse] = OrderedDict()
+        self._lock = Lock()
+        # (user id, key) -> [lock, number of requests holding or waiting for it]
+        self._claims: dict[tuple[int, str], list] = {}
+
+    def get(self, user_id: int, key: str) -> StoredResponse | None:
+        with self._lock:
+            entry = self._entries.get((user_id, key))
+            if entry is None:
+                return None
+            if entry.created_at < datetime.now() - self.ttl:
+                del self._entries[(user_id, key)]
+                return None
+            self._entries.move_to_end((user_id, key))
+            return entry
+
+    def put(
+        self,
+        user_id: int,
+        key: str,
+        request_hash: str,
+        response: str,
+        created_at: datetime,
+    ) -> StoredResponse:
+        entry = StoredResponse(request_hash, response, created_at)
+        with self._lock:
+            self._entries[(user_id, key)] = entry
+            self._entries.move_to_end((user_id, key))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    # serializes the requests carrying the same key within this process
+    @contextmanager
+    def claim(self, user_id: int, key: str):
+        with self._lock:
+            claim = self._claims.setdefault((user_id, key), [Lock(), 0])
+            claim[1] += 1
+        try:
+            with claim[0]:
+                yield
+        finally:
+            with self._lock:
+                claim[1] -= 1
+                if not claim[1]:
+                    del self._claims[(user_id, key)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+idempotency_cache = IdempotencyCache()
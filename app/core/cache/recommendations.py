@@ -0,0 +1,250 @@
+import heapq
+import math
+import time
+from array import array
+from datetime import datetime, timedelta
+from threading import Lock
+from sqlmodel import Session, select, func
+from app.database import MAX_IN_CLAUSE
+from app.models import Product, ProductTag, UserFavoriteTag, Order, OrderProduct
+
+
+# scoring weights: tag overlap dominates, stock and sales break ties between matches
+IN_STOCK_BONUS = 0.5
+SALES_WEIGHT = 0.25
+RECENT_SALES_DAYS = 30
+
+# rankings kept per user; requests for more than this are capped by the use case
+MAX_RESULTS = 100
+
+# stock and sales changes are applied to the boosts on commit, but the product
+# count behind the tag weights and the recent sales window drift without them,
+# so the matrices are still rebuilt periodically
+REFRESH_SECONDS = 300
+
+
+# ranked recommendations from precomputed sparse user x tag and tag x product
+# matrices; tag writes rewrite only the rows of the tags they touch
+class RecommendationEngine:
+    def __init__(self, refresh_seconds: float = REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._user_tags: dict[int, set[int]] = {}
+        self._tag_products: dict[int, array] = {}
+        self._tag_weights: dict[int, float] = {}
+        self._product_boost: dict[int, float] = {}
+        self._product_count = 1
+        self._results: dict[int, list[tuple[int, float]]] = {}
+        self._built_at: float | None = None
+        # held for the whole build, so concurrent readers wait for a single build
+        # and deltas committed meanwhile are applied to the rebuilt matrices
+        self._lock = Lock()
+
+    def _build(self, session: Session) -> None:
+        user_tags: dict[int, set[int]] = {}
+        for user_id, tag_id in session.exec(
+            select(UserFavoriteTag.user_id, UserFavoriteTag.tag_id)
+        ):
+            user_tags.setdefault(user_id, set()).add(tag_id)
+
+        tag_products: dict[int, array] = {}
+        for tag_id, product_id in session.exec(
+            select(ProductTag.tag_id, ProductTag.product_id).order_by(
+                ProductTag.tag_id, ProductTag.product_id
+            )
+        ):
+            tag_products.setdefault(tag_id, array("q")).append(product_id)
+
+        product_count = max(session.exec(select(func.count(Product.id))).one(), 1)
+
+        self._user_tags = user_tags
+        self._tag_products = tag_products
+        self._product_count = product_count
+        self._tag_weights = {
+            tag_id: self._weight(len(product_ids))
+            for tag_id, product_ids in tag_products.items()
+        }
+        self._product_boost = self._read_boosts(session)
+        self._results = {}
+        self._built_at = time.monotonic()
+
+    # Helper: in-stock and recent sales boosts of the given products, or of every
+    # product; products with neither get no entry
+    @staticmethod
+    def _read_boosts(
+        session: Session, product_ids: list[int] | None = None
+    ) -> dict[int, float]:
+        chunks: list[list[int] | None] = [None]
+        if product_ids is not None:
+            chunks = [
+                product_ids[start : start + MAX_IN_CLAUSE]
+                for start in range(0, len(product_ids), MAX_IN_CLAUSE)
+            ]
+        since = datetime.now() - timedelta(days=RECENT_SALES_DAYS)
+        product_boost: dict[int, float] = {}
+        for chunk in chunks:
+            in_stock = select(Product.id).where(Product.stock_quantity > 0)
+            recent_sales = (
+                select(OrderProduct.product_id, func.sum(OrderProduct.quantity))
+                .join(Order)
+                .where(Order.date >= since)
+                .group_by(OrderProduct.product_id)
+            )
+            if chunk is not None:
+                in_stock = in_stock.where(Product.id.in_(chunk))
+                recent_sales = recent_sales.where(OrderProduct.product_id.in_(chunk))
+
+            for product_id in session.exec(in_stock):
+                product_boost[product_id] = IN_STOCK_BONUS
+            for product_id, sold in session.exec(recent_sales):
+                product_boost[product_id] = product_boost.get(
+                    product_id, 0.0
+                ) + SALES_WEIGHT * math.log1p(sold or 0)
+        return product_boost
+
+    # rarer tags are more specific, so they weigh more (inverse document frequency)
+    def _weight(self, tagged_count: int) -> float:
+        return 1.0 + math.log(max(self._product_count / tagged_count, 1.0))
+
+    def _is_fresh(self) -> bool:
+        built_at = self._built_at
+        return (
+            built_at is not None and time.monotonic() - built_at <= self.refresh_seconds
+        )
+
+    def _ensure_built(self, session: Session) -> None:
+        if self._is_fresh():
+            return
+        with self._lock:
+            # another reader may have built the matrices while this one waited
+            if not self._is_fresh():
+                self._build(session)
+
+    def _score(self, user_id: int) -> list[tuple[int, float]]:
+        scores: dict[int, float] = {}
+        for tag_id in self._user_tags.get(user_id, ()):
+            weight = self._tag_weights.get(tag_id, 0.0)
+            for product_id in self._tag_products.get(tag_id, ()):
+                scores[product_id] = scores.get(product_id, 0.0) + weight
+
+        boost = self._product_boost
+        for product_id in scores:
+            scores[product_id] += boost.get(product_id, 0.0)
+
+        # partial sort: only the best MAX_RESULTS are ordered
+        return heapq.nlargest(
+            MAX_RESULTS, scores.items(), key=lambda item: (item[1], -item[0])
+        )
+
+    # returns (product id, score) pairs, best first
+    def recommend(
+        self, session: Session, user_id: int, limit: int
+    ) -> list[tuple[int, float]]:
+        self._ensure_built(session)
+        ranked = self._results.get(user_id)
+        if ranked is None:
+            with self._lock:
+                ranked = self._score(user_id)
+                self._results[user_id] = ranked
+        return ranked[:limit]
+
+    # INCREMENTAL MAINTENANCE (tag changes are no-ops until the matrices are built)
+
+    def add_favorite(self, user_id: int, tag_id: int) -> None:
+        with self._lock:
+            if self._built_at is not None:
+                self._user_tags.setdefault(user_id, set()).add(tag_id)
+            self._results.pop(user_id, None)
+
+    def remove_favorite(self, user_id: int, tag_id: int) -> None:
+        with self._lock:
+            self._user_tags.get(user_id, set()).discard(tag_id)
+            self._results.pop(user_id, None)
+
+    # Helper: rewrites the product row and weight of a tag and drops the
+    # rankings of the users favouring it; the caller holds the lock
+    def _set_tag_products(self, tag_id: int, product_ids: set[int]) -> None:
+        if product_ids:
+            self._tag_products[tag_id] = array("q", sorted(product_ids))
+            self._tag_weights[tag_id] = self._weight(len(product_ids))
+        else:
+            self._tag_products.pop(tag_id, None)
+            self._tag_weights.pop(tag_id, None)
+        for user_id, tag_ids in self._user_tags.items():
+            if tag_id in tag_ids:
+                self._results.pop(user_id, None)
+
+    def add_tags(self, product_ids: list[int], tag_ids: list[int]) -> None:
+        with self._lock:
+            if self._built_at is None or not product_ids:
+                return
+            for tag_id in tag_ids:
+                tagged = set(self._tag_products.get(tag_id, ()))
+                self._set_tag_products(tag_id, tagged | set(product_ids))
+
+    def remove_tags(self, product_ids: list[int], tag_ids: list[int]) -> None:
+        with self._lock:
+            if self._built_at is None or not product_ids:
+                return
+            for tag_id in tag_ids:
+                if tag_id in self._tag_products:
+                    tagged = set(self._tag_products[tag_id])
+                    self._set_tag_products(tag_id, tagged - set(product_ids))
+
+    def drop_tags(self, tag_ids: list[int]) -> None:
+        with self._lock:
+            for tag_id in tag_ids:
+                self._set_tag_products(tag_id, set())
+                for favorites in self._user_tags.values():
+                    favorites.discard(tag_id)
+
+    def remove_product(self, product_id: int) -> None:
+        with self._lock:
+            if self._built_at is None:
+                return
+            tag_ids = [
+                tag_id
+                for tag_id, product_ids in self._tag_products.items()
+                if product_id in product_ids
+            ]
+            for tag_id in tag_ids:
+                tagged = set(self._tag_products[tag_id])
+                self._set_tag_products(tag_id, tagged - {product_id})
+            self._product_boost.pop(product_id, None)
+
+    # rereads the boosts of products whose stock or sales changed in a committed
+    # transaction and drops the rankings of the users favouring their tags
+    def refresh_products(self, session: Session, product_ids: list[int]) -> None:
+        if not product_ids:
+            return
+        product_ids = list(set(product_ids))
+        with self._lock:
+            if self._built_at is None:
+                return
+            boosts = self._read_boosts(session, product_ids)
+            for product_id in product_ids:
+                if product_id in boosts:
+                    self._product_boost[product_id] = boosts[product_id]
+                else:
+                    self._product_boost.pop(product_id, None)
+            changed = set(product_ids)
+            tag_ids = {
+                tag_id
+                for tag_id, tagged in self._tag_products.items()
+                if not changed.isdisjoint(tagged)
+            }
+            for user_id, favorites in self._user_tags.items():
+                if not tag_ids.isdisjoint(favorites):
+                    self._results.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._user_tags = {}
+            self._tag_products = {}
+            self._tag_weights = {}
+            self._product_boost = {}
+            self._product_count = 1
+            self._results = {}
+            self._built_at = None
+
+
+recommendation_engine = RecommendationEngine()
@@ -0,0 +1,177 @@
+import heapq
+from datetime import datetime
+from threading import Condition, Thread
+from typing import NamedTuple
+from sqlmodel import Session, select
+from app.models import StockReservation
+
+
+# units of a product held for a user's cart
+class Hold(NamedTuple):
+    quantity: int
+    expires_at: datetime
+    user_id: int
+
+
+# process-wide book of the active stock reservations: units reserved per
+# product, the holds of each cart, and a heap of expiry times drained by a
+# background timer, so available-to-sell never needs a query
+class ReservationBook:
+    def __init__(self):
+        self._reserved: dict[int, int] = {}
+        self._holds: dict[str, dict[int, Hold]] = {}
+        # (expires_at, cart_id, product_id); entries of replaced holds are
+        # skipped when popped
+        self._expiry: list[tuple[datetime, str, int]] = []
+        self._condition = Condition()
+        self._loaded = False
+        self._timer: Thread | None = None
+
+    def _add(self, cart_id: str, product_id: int, hold: Hold) -> None:
+        self._holds.setdefault(cart_id, {})[product_id] = hold
+        self._reserved[product_id] = self._reserved.get(product_id, 0) + hold.quantity
+        if not self._expiry or hold.expires_at < self._expiry[0][0]:
+            # the timer may be sleeping until a later expiry
+            self._condition.notify()
+        heapq.heappush(self._expiry, (hold.expires_at, cart_id, product_id))
+
+    def _remove(self, cart_id: str, product_id: int) -> Hold | None:
+        holds = self._holds.get(cart_id)
+        hold = holds.pop(product_id, None) if holds else None
+        if hold is None:
+            return None
+        if not holds:
+            del self._holds[cart_id]
+        remaining = self._reserved[product_id] - hold.quantity
+        if remaining:
+            self._reserved[product_id] = remaining
+        else:
+            del self._reserved[product_id]
+        return hold
+
+    def _expire(self, now: datetime) -> None:
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, cart_id, product_id = heapq.heappop(self._expiry)
+            hold = self._holds.get(cart_id, {}).get(product_id)
+            if hold is not None and hold.expires_at == expires_at:
+                self._remove(cart_id, product_id)
+
+    def _run_timer(self) -> None:
+        with self._condition:
+            while True:
+                now = datetime.now()
+                self._expire(now)
+                timeout = None
+                if self._expiry:
+                    timeout = (self._expiry[0][0] - now).total_seconds()
+                self._condition.wait(timeout)
+
+    # rebuilds the book from the unexpired reservation rows, once per process
+    def load(self, session: Session) -> None:
+        with self._condition:
+            if self._loaded:
+                return
+            now = datetime.now()
+            rows = session.exec(
+                select(
+                    StockReservation.cart_id,
+                    StockReservation.product_id,
+                    StockReservation.quantity,
+                    StockReservation.expires_at,
+                    StockReservation.user_id,
+                ).where(StockReservation.expires_at > now)
+            )
+            for cart_id, product_id, quantity, expires_at, user_id in rows:
+                self._add(cart_id, product_id, Hold(quantity, expires_at, user_id))
+            self._loaded = True
+            if self._timer is None:
+                self._timer = Thread(
+                    target=self._run_timer, name="reservation-expiry", daemon=True
+                )
+                self._timer.start()
+
+    # units of a product held by every cart but exclude_cart
+    def reserved(
+        self, session: Session, product_id: int, exclude_cart: str | None = None
+    ) -> int:
+        self.load(session)
+        with self._condition:
+            self._expire(datetime.now())
+            reserved = self._reserved.get(product_id, 0)
+            if exclude_cart is not None:
+                hold = self._holds.get(exclude_cart, {}).get(product_id)
+                if hold is not None:
+                    reserved -= hold.quantity
+            return reserved
+
+    # active holds of a cart by product id
+    def cart(self, session: Session, cart_id: str) -> dict[int, Hold]:
+        self.load(session)
+        with self._condition:
+            self._expire(datetime.now())
+            return dict(self._holds.get(cart_id, {}))
+
+    # holds quantity units of a product for a user's cart, replacing its previous
+    # hold, if that many are not reserved by other carts; a cart holding stock
+    # for another user is refused. Returns the previous hold so the caller can
+    # restore it if persisting the new one fails
+    def reserve(
+        self,
+        session: Session,
+        cart_id: str,
+        user_id: int,
+        product_id: int,
+        quantity: int,
+        stock_quantity: int,
+        expires_at: datetime,
+    ) -> Hold | None:
+        self.load(session)
+        with self._condition:
+            self._expire(datetime.now())
+            holds = self._holds.get(cart_id, {})
+            if any(hold.user_id != user_id for hold in holds.values()):
+                raise ValueError(f"Cart '{cart_id}' belongs to another user")
+            previous = holds.get(product_id)
+            available = stock_quantity - self._reserved.get(product_id, 0)
+            if previous is not None:
+                available += previous.quantity
+            if quantity > available:
+                raise ValueError(
+                    f"Only {max(available, 0)} units of product {product_id} "
+                    f"can be reserved, requested: {quantity}"
+                )
+            self._remove(cart_id, product_id)
+            self._add(cart_id, product_id, Hold(quantity, expires_at, user_id))
+            return previous
+
+    # puts back the hold reserve() replaced (None drops the new one)
+    def restore(self, cart_id: str, product_id: int, hold: Hold | None) -> None:
+        with self._condition:
+            self._remove(cart_id, product_id)
+            if hold is not None:
+                self._add(cart_id, product_id, hold)
+
+    # drops the holds of a cart, or only those of the given products; returns
+    # the holds dropped
+    def release(
+        self, cart_id: str, product_ids: list[int] | None = None
+    ) -> dict[int, Hold]:
+        with self._condition:
+            if product_ids is None:
+                product_ids = list(self._holds.get(cart_id, {}))
+            released = {}
+            for product_id in product_ids:
+                hold = self._remove(cart_id, product_id)
+                if hold is not None:
+                    released[product_id] = hold
+            return released
+
+    def clear(self) -> None:
+        with self._condition:
+            self._reserved.clear()
+            self._holds.clear()
+            self._expiry.clear()
+            self._loaded = False
+
+
+reservation_book = ReservationBook()
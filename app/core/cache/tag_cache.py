@@ -0,0 +1,99 @@
+from threading import Lock
+from sqlmodel import Session, select
+from app.database import MAX_IN_CLAUSE
+from app.models import Tag
+from app.core.cache.commit_hooks import after_commit
+
+
+# process-wide tag name <-> id dictionary shared by every TagService
+class TagCache:
+    def __init__(self):
+        self._ids: dict[str, int] = {}
+        self._names: dict[int, str] = {}
+        # tags inserted by transactions that have not committed yet; a lookup in
+        # such a transaction sees them, but they are only cached once it commits
+        self._uncommitted: dict[str, int] = {}
+        self._lock = Lock()
+
+    # resolves many tag names at once, querying only the names not cached yet
+    def get_ids(self, session: Session, names: list[str]) -> dict[str, int]:
+        with self._lock:
+            found = {name: self._ids[name] for name in names if name in self._ids}
+
+        missing = list({name for name in names if name not in found})
+        for start in range(0, len(missing), MAX_IN_CLAUSE):
+            chunk = missing[start : start + MAX_IN_CLAUSE]
+            rows = session.exec(select(Tag.name, Tag.id).where(Tag.name.in_(chunk)))
+            found.update(rows.all())
+
+        if missing:
+            with self._lock:
+                for name in missing:
+                    if name in found and name not in self._uncommitted:
+                        self._ids[name] = found[name]
+                        self._names[found[name]] = name
+        return found
+
+    # resolves many tag ids back to names, querying only the ids not cached yet
+    def get_names(self, session: Session, tag_ids: list[int]) -> dict[int, str]:
+        with self._lock:
+            found = {
+                tag_id: self._names[tag_id]
+                for tag_id in tag_ids
+                if tag_id in self._names
+            }
+
+        missing = list({tag_id for tag_id in tag_ids if tag_id not in found})
+        for start in range(0, len(missing), MAX_IN_CLAUSE):
+            chunk = missing[start : start + MAX_IN_CLAUSE]
+            rows = session.exec(select(Tag.id, Tag.name).where(Tag.id.in_(chunk)))
+            found.update(rows.all())
+
+        if missing:
+            with self._lock:
+                for tag_id in missing:
+                    if tag_id in found and found[tag_id] not in self._uncommitted:
+                        self._names[tag_id] = found[tag_id]
+                        self._ids[found[tag_id]] = tag_id
+        return found
+
+    # resolves a single tag name, None if the tag does not exist
+    def get_id(self, session: Session, name: str) -> int | None:
+        return self.get_ids(session, [name]).get(name)
+
+    # registers tags the session inserted: they are cached when its transaction
+    # commits and forgotten if it rolls back, so no id of a row that never
+    # existed is ever handed out
+    def add_created(self, session: Session, tag_ids: dict[str, int]) -> None:
+        with self._lock:
+            self._uncommitted.update(tag_ids)
+        after_commit(
+            session,
+            lambda: self._settle_created(tag_ids, committed=True),
+            lambda: self._settle_created(tag_ids, committed=False),
+        )
+
+    def _settle_created(self, tag_ids: dict[str, int], committed: bool) -> None:
+        with self._lock:
+            for name, tag_id in tag_ids.items():
+                if self._uncommitted.get(name) == tag_id:
+                    del self._uncommitted[name]
+                if committed:
+                    self._ids[name] = tag_id
+                    self._names[tag_id] = name
+
+    # drops names whose rows were deleted
+    def invalidate(self, names: list[str]) -> None:
+        with self._lock:
+            for name in names:
+                tag_id = self._ids.pop(name, None)
+                self._names.pop(tag_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ids.clear()
+            self._names.clear()
+            self._uncommitted.clear()
+
+
+tag_cache = TagCache()
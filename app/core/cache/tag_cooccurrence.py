@@ -0,0 +1,152 @@
+import heapq
+from array import array
+from threading import Lock
+from sqlmodel import Session, select, func
+from sqlalchemy.orm import aliased
+from app.models import Tag, ProductTag
+
+
+# up to this many tags a dense n x n counter array is smaller than nested dicts
+DENSE_MAX_TAGS = 1024
+# free rows reserved in the dense matrix for tags created after the build
+DENSE_HEADROOM = 64
+
+# related tags cached per tag, so a request only slices a precomputed list
+TOP_RELATED = 50
+
+
+class _DenseCounts:
+    def __init__(self, tag_ids: list[int]):
+        self.size = len(tag_ids) + DENSE_HEADROOM
+        self.slots = {tag_id: slot for slot, tag_id in enumerate(tag_ids)}
+        self.tag_ids = list(tag_ids)
+        self.counts = array("i", bytes(self.size * self.size * array("i").itemsize))
+
+    def _slot(self, tag_id: int) -> int | None:
+        slot = self.slots.get(tag_id)
+        if slot is None and len(self.tag_ids) < self.size:
+            slot = len(self.tag_ids)
+            self.slots[tag_id] = slot
+            self.tag_ids.append(tag_id)
+        return slot
+
+    def add(self, tag_a: int, tag_b: int, delta: int) -> bool:
+        slot_a, slot_b = self._slot(tag_a), self._slot(tag_b)
+        if slot_a is None or slot_b is None:
+            return False
+        self.counts[slot_a * self.size + slot_b] += delta
+        return True
+
+    def row(self, tag_id: int):
+        slot = self.slots.get(tag_id)
+        if slot is None:
+            return
+        start = slot * self.size
+        for other_slot, other_id in enumerate(self.tag_ids):
+            count = self.counts[start + other_slot]
+            if count > 0 and other_slot != slot:
+                yield other_id, count
+
+
+class _SparseCounts:
+    def __init__(self):
+        self.rows: dict[int, dict[int, int]] = {}
+
+    def add(self, tag_a: int, tag_b: int, delta: int) -> bool:
+        row = self.rows.setdefault(tag_a, {})
+        row[tag_b] = row.get(tag_b, 0) + delta
+        if row[tag_b] <= 0:
+            del row[tag_b]
+        return True
+
+    def row(self, tag_id: int):
+        yield from self.rows.get(tag_id, {}).items()
+
+
+# symmetric tag x tag co-occurrence counts (products carrying both tags)
+class TagCooccurrence:
+    def __init__(self):
+        self._counts: _DenseCounts | _SparseCounts | None = None
+        self._top: dict[int, list[tuple[int, int]]] = {}
+        self._lock = Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._counts is not None
+
+    # reads and installs the counts under the lock, so a tag change committed
+    # during the build waits for it and is applied on top instead of dropped
+    def _build(self, session: Session) -> None:
+        with self._lock:
+            if self._counts is not None:
+                return
+            tag_ids = list(session.exec(select(Tag.id)))
+            counts = (
+                _DenseCounts(tag_ids)
+                if len(tag_ids) <= DENSE_MAX_TAGS
+                else _SparseCounts()
+            )
+
+            other = aliased(ProductTag)
+            pairs = session.exec(
+                select(ProductTag.tag_id, other.tag_id, func.count())
+                .join(other, other.product_id == ProductTag.product_id)
+                .where(ProductTag.tag_id != other.tag_id)
+                .group_by(ProductTag.tag_id, other.tag_id)
+            )
+            for tag_a, tag_b, count in pairs:
+                counts.add(tag_a, tag_b, count)
+            self._counts = counts
+            self._top = {}
+
+    # returns up to limit (tag id, count) pairs, most frequent first
+    def related(
+        self, session: Session, tag_id: int, limit: int
+    ) -> list[tuple[int, int]]:
+        if self._counts is None:
+            self._build(session)
+        top = self._top.get(tag_id)
+        if top is None:
+            with self._lock:
+                top = heapq.nlargest(
+                    TOP_RELATED,
+                    self._counts.row(tag_id),
+                    key=lambda item: (item[1], -item[0]),
+                )
+                self._top[tag_id] = top
+        return top[:limit]
+
+    # applies the change of one product's tag set from before to after
+    def update_product(self, before: set[int], after: set[int]) -> None:
+        added = after - before
+        removed = before - after
+        if not added and not removed:
+            return
+        with self._lock:
+            if self._counts is None:
+                return
+            changes = [(added, after, 1), (removed, before, -1)]
+            touched = set()
+            for changed, tags, delta in changes:
+                for tag_a in changed:
+                    for tag_b in tags:
+                        if tag_b == tag_a or (tag_b in changed and tag_b < tag_a):
+                            continue
+                        stored = self._counts.add(tag_a, tag_b, delta)
+                        stored = self._counts.add(tag_b, tag_a, delta) and stored
+                        if not stored:
+                            # dense matrix ran out of rows: rebuild on next use
+                            self._counts = None
+                            self._top = {}
+                            return
+                        touched.update((tag_a, tag_b))
+            for tag_id in touched:
+                self._top.pop(tag_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counts = None
+            self._top = {}
+
+
+tag_cooccurrence = TagCooccurrence()
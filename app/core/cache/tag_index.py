@@ -0,0 +1,216 @@
+import re
+from threading import Lock
+from sqlmodel import Session, select
+from app.models import Product, ProductTag
+
+
+# products are stored as bits of an arbitrary-precision int (bit n = product id n)
+def bitmap_from_ids(ids) -> int:
+    ids = list(ids)
+    if not ids:
+        return 0
+    # setting bits in a buffer avoids copying a growing int once per id
+    buffer = bytearray(max(ids) // 8 + 1)
+    for product_id in ids:
+        buffer[product_id >> 3] |= 1 << (product_id & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def ids_from_bitmap(bitmap: int) -> list[int]:
+    bits = bin(bitmap)[:1:-1]
+    ids = []
+    position = bits.find("1")
+    while position != -1:
+        ids.append(position)
+        position = bits.find("1", position + 1)
+    return ids
+
+
+# in-memory inverted index tag id -> product bitmap, loaded lazily from ProductTag
+class TagIndex:
+    def __init__(self):
+        self._bitmaps: dict[int, int] = {}
+        self._all_products = 0
+        self._loaded = False
+        self._lock = Lock()
+
+    # reads and installs the index under the lock, so a tag change committed
+    # during the load waits for it and is applied on top instead of dropped
+    def _ensure_loaded(self, session: Session) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            product_ids = session.exec(select(Product.id)).all()
+            pairs = session.exec(select(ProductTag.tag_id, ProductTag.product_id))
+
+            tagged: dict[int, list[int]] = {}
+            for tag_id, product_id in pairs:
+                tagged.setdefault(tag_id, []).append(product_id)
+            self._bitmaps = {
+                tag_id: bitmap_from_ids(ids) for tag_id, ids in tagged.items()
+            }
+            self._all_products = bitmap_from_ids(product_ids)
+            self._loaded = True
+
+    # returns the bitmap of products tagged with tag_id (0 for unknown tags)
+    def get(self, session: Session, tag_id: int | None) -> int:
+        self._ensure_loaded(session)
+        if tag_id is None:
+            return 0
+        return self._bitmaps.get(tag_id, 0)
+
+    # returns a copy of every tag id -> product bitmap
+    def bitmaps(self, session: Session) -> dict[int, int]:
+        self._ensure_loaded(session)
+        with self._lock:
+            return dict(self._bitmaps)
+
+    def all_products(self, session: Session) -> int:
+        self._ensure_loaded(session)
+        return self._all_products
+
+    # INCREMENTAL MAINTENANCE (no-ops until the index is loaded)
+
+    def add_tags(self, product_ids: list[int], tag_ids: list[int]) -> None:
+        with self._lock:
+            if not self._loaded:
+                return
+            products = bitmap_from_ids(product_ids) & self._all_products
+            for tag_id in tag_ids:
+                self._bitmaps[tag_id] = self._bitmaps.get(tag_id, 0) | products
+
+    def remove_tags(self, product_ids: list[int], tag_ids: list[int]) -> None:
+        with self._lock:
+            if not self._loaded:
+                return
+            products = bitmap_from_ids(product_ids)
+            for tag_id in tag_ids:
+                if tag_id in self._bitmaps:
+                    self._bitmaps[tag_id] &= ~products
+
+    def drop_tags(self, tag_ids: list[int]) -> None:
+        with self._lock:
+            for tag_id in tag_ids:
+                self._bitmaps.pop(tag_id, None)
+
+    def add_product(self, product_id: int) -> None:
+        with self._lock:
+            if self._loaded:
+                self._all_products |= 1 << product_id
+
+    def add_products(self, product_ids: list[int]) -> None:
+        with self._lock:
+            if self._loaded:
+                self._all_products |= bitmap_from_ids(product_ids)
+
+    def remove_product(self, product_id: int) -> None:
+        with self._lock:
+            if not self._loaded:
+                return
+            mask = ~(1 << product_id)
+            self._all_products &= mask
+            for tag_id in self._bitmaps:
+                self._bitmaps[tag_id] &= mask
+
+    def clear(self) -> None:
+        with self._lock:
+            self._bitmaps = {}
+            self._all_products = 0
+            self._loaded = False
+
+
+tag_index = TagIndex()
+
+
+# BOOLEAN TAG EXPRESSIONS
+# grammar: or := and (OR and)* ; and := not (AND not)* ; not := NOT not | atom
+# atom := "(" or ")" | tag name (consecutive words, e.g. "Noise cancelling")
+
+_TOKEN_PATTERN = re.compile(r'\(|\)|"[^"]*"|[^\s()]+')
+_KEYWORDS = {"AND", "OR", "NOT"}
+
+
+def tokenize_tag_expression(expression: str) -> list:
+    tokens = []
+    extend = False
+    for raw in _TOKEN_PATTERN.findall(expression):
+        if raw in _KEYWORDS or raw in ("(", ")"):
+            tokens.append(raw)
+            extend = False
+        elif raw.startswith('"'):
+            tokens.append(("tag", raw.strip('"')))
+            extend = False
+        elif extend:
+            tokens[-1] = ("tag", f"{tokens[-1][1]} {raw}")
+        else:
+            tokens.append(("tag", raw))
+            extend = True
+    return tokens
+
+
+def tag_names_in_expression(tokens: list) -> list[str]:
+    return [token[1] for token in tokens if isinstance(token, tuple)]
+
+
+class _ExpressionEvaluator:
+    def __init__(self, tokens: list, resolve, universe: int):
+        self.tokens = tokens
+        self.position = 0
+        self.resolve = resolve
+        self.universe = universe
+
+    def _peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def _take(self):
+        token = self._peek()
+        self.position += 1
+        return token
+
+    def evaluate(self) -> int:
+        if not self.tokens:
+            raise ValueError("Tag expression cannot be empty")
+        result = self._or()
+        if self._peek() is not None:
+            raise ValueError(f"Unexpected token in tag expression: {self._peek()}")
+        return result
+
+    def _or(self) -> int:
+        result = self._and()
+        while self._peek() == "OR":
+            self._take()
+            result |= self._and()
+        return result
+
+    def _and(self) -> int:
+        result = self._not()
+        while self._peek() == "AND":
+            self._take()
+            result &= self._not()
+        return result
+
+    def _not(self) -> int:
+        if self._peek() == "NOT":
+            self._take()
+            return self.universe & ~self._not()
+        return self._atom()
+
+    def _atom(self) -> int:
+        token = self._take()
+        if token == "(":
+            result = self._or()
+            if self._take() != ")":
+                raise ValueError("Unbalanced parentheses in tag expression")
+            return result
+        if isinstance(token, tuple):
+            return self.resolve(token[1])
+        raise ValueError(f"Expected a tag name in tag expression, got: {token}")
+
+
+# evaluates e.g. "Wireless AND Gaming AND NOT Premium" into a product bitmap
+def evaluate_tag_expression(tokens: list, resolve, universe: int) -> int:
+    return _ExpressionEvaluator(tokens, resolve, universe).evaluate()
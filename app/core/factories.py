@@ -2,10 +2,20 @@ from app.core.services.order_service import OrderService
 from app.core.services.setup_service import SetupService
 from app.core.services.stock_service import StockService
 from app.core.services.tag_service import TagService
+from app.core.services.search_service import SearchService
+from app.core.services.ledger_service import StockLedgerService
+from app.core.services.forecast_service import ForecastService
+from app.core.services.analytics_service import AnalyticsService
+from app.core.services.idempotency_service import IdempotencyService
+from app.core.services.reservation_service import ReservationService
 from app.database import get_db
 from app.core.use_cases.sales_use import SalesUseCase
 from app.core.use_cases.stock_use import StockUseCase
 from app.core.use_cases.tag_use import TagUseCase
+from app.core.use_cases.catalog_use import CatalogUseCase
+from app.core.use_cases.export_use import ExportUseCase
+from app.core.use_cases.import_use import ImportUseCase
+from app.core.use_cases.analytics_use import AnalyticsUseCase
 from fastapi import Depends
 from sqlmodel import Session
 from app.adapters.jinja2_adapter import Jinja2Adapter
@@ -32,6 +42,10 @@ def get_sales_use_case(db: Session = Depends(get_db)):
         setup_service=SetupService(session=db),
         stock_service=StockService(session=db),
         type_adapter=TypeAdapter(),
+        ledger_service=StockLedgerService(session=db),
+        analytics_service=AnalyticsService(session=db),
+        idempotency_service=IdempotencyService(session=db),
+        reservation_service=ReservationService(session=db),
     )
 
 
@@ -41,8 +55,38 @@ def get_stock_use_case(db: Session = Depends(get_db)):
         stock_service=StockService(session=db),
         tag_service=TagService(session=db),
         type_adapter=TypeAdapter(),
+        ledger_service=StockLedgerService(session=db),
+        forecast_service=ForecastService(session=db),
+        reservation_service=ReservationService(session=db),
     )
 
 
 def get_tag_use_case(db: Session = Depends(get_db)):
     return TagUseCase(session=db, tag_service=TagService(session=db))
+
+
+def get_catalog_use_case(db: Session = Depends(get_db)):
+    return CatalogUseCase(
+        session=db,
+        tag_service=TagService(session=db),
+        search_service=SearchService(session=db),
+    )
+
+
+def get_export_use_case():
+    return ExportUseCase()
+
+
+def get_import_use_case(db: Session = Depends(get_db)):
+    return ImportUseCase(
+        session=db,
+        stock_service=StockService(session=db),
+        tag_service=TagService(session=db),
+        search_service=SearchService(session=db),
+        type_adapter=TypeAdapter(),
+        ledger_service=StockLedgerService(session=db),
+    )
+
+
+def get_analytics_use_case(db: Session = Depends(get_db)):
+    return AnalyticsUseCase(session=db, analytics_service=AnalyticsService(session=db))
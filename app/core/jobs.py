@@ -0,0 +1,85 @@
+import os
+from sqlmodel import Session
+from app.database import engine
+from app.core.scheduler import MaintenanceScheduler
+from app.core.services.tag_service import TagService
+from app.core.services.ledger_service import StockLedgerService
+from app.core.services.idempotency_service import IdempotencyService
+from app.core.services.reservation_service import ReservationService
+
+
+TAG_CLEANUP_JOB = "tag_cleanup"
+TAG_CLEANUP_INTERVAL_SECONDS = float(os.getenv("TAG_CLEANUP_INTERVAL_SECONDS", 3600))
+
+STOCK_SNAPSHOT_JOB = "stock_snapshot"
+STOCK_SNAPSHOT_INTERVAL_SECONDS = float(
+    os.getenv("STOCK_SNAPSHOT_INTERVAL_SECONDS", 3600)
+)
+
+STOCK_LEDGER_COMPACTION_JOB = "stock_ledger_compaction"
+STOCK_LEDGER_COMPACTION_INTERVAL_SECONDS = float(
+    os.getenv("STOCK_LEDGER_COMPACTION_INTERVAL_SECONDS", 86400)
+)
+STOCK_MOVEMENT_RETENTION_DAYS = float(os.getenv("STOCK_MOVEMENT_RETENTION_DAYS", 90))
+
+IDEMPOTENCY_PURGE_JOB = "idempotency_purge"
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS = float(
+    os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", 3600)
+)
+
+RESERVATION_PURGE_JOB = "reservation_purge"
+RESERVATION_PURGE_INTERVAL_SECONDS = float(
+    os.getenv("RESERVATION_PURGE_INTERVAL_SECONDS", 3600)
+)
+
+
+def cleanup_unused_tags() -> int:
+    with Session(engine) as session:
+        return TagService(session).cleanup_unused_tags()
+
+
+def take_stock_snapshots() -> int:
+    with Session(engine) as session:
+        return StockLedgerService(session).take_snapshots()
+
+
+def compact_stock_ledger() -> int:
+    with Session(engine) as session:
+        return StockLedgerService(session).compact_movements(
+            STOCK_MOVEMENT_RETENTION_DAYS
+        )
+
+
+def purge_idempotency_keys() -> int:
+    with Session(engine) as session:
+        return IdempotencyService(session).purge_expired()
+
+
+def purge_expired_reservations() -> int:
+    with Session(engine) as session:
+        return ReservationService(session).purge_expired()
+
+
+# registers every periodic maintenance job of the application
+def register_maintenance_jobs(scheduler: MaintenanceScheduler) -> None:
+    scheduler.register(
+        TAG_CLEANUP_JOB, cleanup_unused_tags, TAG_CLEANUP_INTERVAL_SECONDS
+    )
+    scheduler.register(
+        STOCK_SNAPSHOT_JOB, take_stock_snapshots, STOCK_SNAPSHOT_INTERVAL_SECONDS
+    )
+    scheduler.register(
+        STOCK_LEDGER_COMPACTION_JOB,
+        compact_stock_ledger,
+        STOCK_LEDGER_COMPACTION_INTERVAL_SECONDS,
+    )
+    scheduler.register(
+        IDEMPOTENCY_PURGE_JOB,
+        purge_idempotency_keys,
+        IDEMPOTENCY_PURGE_INTERVAL_SECONDS,
+    )
+    scheduler.register(
+        RESERVATION_PURGE_JOB,
+        purge_expired_reservations,
+        RESERVATION_PURGE_INTERVAL_SECONDS,
+    )
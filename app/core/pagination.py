@@ -0,0 +1,126 @@
+import base64
+import json
+from datetime import datetime
+from sqlmodel import Session
+from app.core.cache.catalog import CatalogSnapshot
+
+
+# page sizes for the keyset-paginated listing endpoints
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+# Helper: cursors are the sort key of the last item of a page as base64 JSON,
+# opaque to clients
+def _encode_key(key: list) -> str:
+    payload = json.dumps(key, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def _decode_key(cursor: str) -> list:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid pagination cursor")
+    if not isinstance(key, list) or len(key) != 2 or not isinstance(key[1], int):
+        raise ValueError("Invalid pagination cursor")
+    return key
+
+
+# product listings are sorted by (name, id)
+def encode_cursor(name: str, product_id: int) -> str:
+    return _encode_key([name, product_id])
+
+
+def decode_cursor(cursor: str | None) -> tuple[str, int] | None:
+    if not cursor:
+        return None
+    name, product_id = _decode_key(cursor)
+    if not isinstance(name, str):
+        raise ValueError("Invalid pagination cursor")
+    return name, product_id
+
+
+# order listings are sorted by (date, id), newest first
+def encode_date_cursor(date: datetime, order_id: int) -> str:
+    return _encode_key([date.isoformat(), order_id])
+
+
+def decode_date_cursor(cursor: str | None) -> tuple[datetime, int] | None:
+    if not cursor:
+        return None
+    date, order_id = _decode_key(cursor)
+    try:
+        return datetime.fromisoformat(date), order_id
+    except (ValueError, TypeError):
+        raise ValueError("Invalid pagination cursor")
+
+
+def validate_page_size(limit: int) -> int:
+    if limit <= 0:
+        raise ValueError("Limit must be positive")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+# parses a comma-separated fields= selector; None selects every field
+def parse_fields(fields: str | None, allowed: tuple[str, ...]) -> tuple[str, ...]:
+    if fields is None or not fields.strip():
+        return allowed
+    selected = tuple(
+        dict.fromkeys(field.strip() for field in fields.split(",") if field.strip())
+    )
+    unknown = [field for field in selected if field not in allowed]
+    if unknown:
+        raise ValueError(
+            f"Unknown fields: {unknown}. Allowed fields: {', '.join(allowed)}"
+        )
+    return selected
+
+
+# splits a limit + 1 fetch into the page and the cursor of the next page,
+# built by cursor_of from the last item of the page
+def split_page(rows: list, limit: int, cursor_of) -> tuple[list, str | None]:
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, cursor_of(rows[-1])
+
+
+# response field name -> CatalogRow attribute, for listings served from the snapshot
+CATALOG_ROW_FIELDS = {
+    "id": "id",
+    "name": "name",
+    "product_type": "type",
+    "brand": "brand",
+    "price": "price",
+    "stock_quantity": "stock_quantity",
+    "current_stock": "stock_quantity",
+    "min_stock_level": "min_stock_level",
+}
+
+
+# one page of the products of a catalog bitmap, as dicts of the selected fields
+def paginate_catalog(
+    catalog: CatalogSnapshot,
+    session: Session,
+    bitmap: int,
+    allowed: tuple[str, ...],
+    fields: str | None,
+    cursor: str | None,
+    limit: int,
+) -> tuple[list[dict], str | None]:
+    selected = parse_fields(fields, allowed)
+    limit = validate_page_size(limit)
+    rows = catalog.get_page(session, bitmap, decode_cursor(cursor), limit + 1)
+    rows, next_cursor = split_page(
+        rows, limit, lambda row: encode_cursor(row.name, row.id)
+    )
+    attributes = [CATALOG_ROW_FIELDS[field] for field in selected]
+    items = [
+        {
+            field: getattr(row, attribute)
+            for field, attribute in zip(selected, attributes)
+        }
+        for row in rows
+    ]
+    return items, next_cursor
@@ -0,0 +1,123 @@
+import logging
+import time
+from datetime import datetime
+from threading import Event, Lock, Thread
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+# a periodic maintenance task and the outcome of its last run
+class MaintenanceJob:
+    def __init__(self, name: str, func: Callable[[], Any], interval_seconds: float):
+        self.name = name
+        self.func = func
+        self.interval_seconds = interval_seconds
+        self.next_run_at = time.monotonic() + interval_seconds
+        self.queued = False
+        self.running = False
+        self.last_started_at: datetime | None = None
+        self.last_duration_seconds: float | None = None
+        self.last_result: Any = None
+        self.last_error: str | None = None
+
+    def status(self) -> dict:
+        return {
+            "name": self.name,
+            "interval_seconds": self.interval_seconds,
+            "queued": self.queued,
+            "running": self.running,
+            "last_started_at": self.last_started_at,
+            "last_duration_seconds": self.last_duration_seconds,
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+        }
+
+
+# runs registered jobs on their interval, or as soon as possible once enqueued,
+# in a single background thread so maintenance never blocks a request
+class MaintenanceScheduler:
+    def __init__(self):
+        self._jobs: dict[str, MaintenanceJob] = {}
+        self._lock = Lock()
+        self._wakeup = Event()
+        self._stopping = Event()
+        self._thread: Thread | None = None
+
+    def register(
+        self, name: str, func: Callable[[], Any], interval_seconds: float
+    ) -> MaintenanceJob:
+        with self._lock:
+            job = MaintenanceJob(name, func, interval_seconds)
+            self._jobs[name] = job
+        self._wakeup.set()
+        return job
+
+    def get_job(self, name: str) -> MaintenanceJob:
+        job = self._jobs.get(name)
+        if job is None:
+            raise ValueError(f"Maintenance job '{name}' is not registered")
+        return job
+
+    # schedules an immediate run; a job already queued or running is not doubled
+    def enqueue(self, name: str) -> MaintenanceJob:
+        job = self.get_job(name)
+        with self._lock:
+            job.queued = True
+        self._wakeup.set()
+        return job
+
+    def run_job(self, job: MaintenanceJob) -> None:
+        with self._lock:
+            job.queued = False
+            job.running = True
+        job.last_started_at = datetime.now()
+        started = time.perf_counter()
+        try:
+            job.last_result = job.func()
+            job.last_error = None
+        except Exception as e:
+            job.last_error = str(e)
+            logger.exception("Maintenance job %s failed", job.name)
+        finally:
+            job.last_duration_seconds = time.perf_counter() - started
+            job.next_run_at = time.monotonic() + job.interval_seconds
+            with self._lock:
+                job.running = False
+        logger.info(
+            "Maintenance job %s finished in %.3fs: %s",
+            job.name,
+            job.last_duration_seconds,
+            job.last_result,
+        )
+
+    def _loop(self) -> None:
+        while not self._stopping.is_set():
+            # cleared before looking at the jobs so an enqueue is never missed
+            self._wakeup.clear()
+            now = time.monotonic()
+            with self._lock:
+                jobs = list(self._jobs.values())
+            due = [job for job in jobs if job.queued or job.next_run_at <= now]
+            for job in due:
+                self.run_job(job)
+
+            next_run = min((job.next_run_at for job in jobs), default=now + 60)
+            self._wakeup.wait(timeout=max(next_run - time.monotonic(), 0.1))
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = Thread(target=self._loop, name="maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+maintenance_scheduler = MaintenanceScheduler()
@@ -0,0 +1,202 @@
+from datetime import date
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select, insert
+from app.models import (
+    Order,
+    OrderProduct,
+    Product,
+    DailySales,
+    DailyProductSales,
+    DailyBrandSales,
+)
+
+
+class AnalyticsService:
+    def __init__(self, session: Session):
+        self.session = session
+
+    # Helper: INSERT ... ON CONFLICT DO UPDATE that adds the counters of each
+    # row to the existing rollup row
+    def _add_to_rollup(self, model, keys: list[str], rows: list[dict]) -> None:
+        if not rows:
+            return
+        table = model.__table__
+        statement = sqlite_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=keys,
+            set_={
+                column: table.c[column] + statement.excluded[column]
+                for column in rows[0]
+                if column not in keys
+            },
+        )
+        self.session.exec(statement, params=rows)
+
+    # adds an order to the rollups; the caller commits it together with the
+    # order. The member discount is spread over the lines pro rata, so product
+    # and brand revenue add up to the order's final price.
+    def record_order(self, order: Order, product_map: list[tuple]) -> None:
+        self.record_orders([(order, product_map)])
+
+    # adds many orders to the rollups with one upsert per rollup table
+    def record_orders(self, orders: list[tuple[Order, list[tuple]]]) -> None:
+        by_day: dict[date, list] = {}
+        by_product: dict[tuple[date, int], list] = {}
+        by_brand: dict[tuple[date, str], list] = {}
+        for order, product_map in orders:
+            subtotal = sum(
+                product.price * quantity for product, quantity in product_map
+            )
+            factor = order.final_price / subtotal if subtotal else 0.0
+            day = order.date.date()
+
+            counters = by_day.setdefault(day, [0, 0, 0.0])
+            counters[0] += 1
+            counters[2] += order.final_price or 0.0
+            for product, quantity in product_map:
+                revenue = product.price * quantity * factor
+                counters[1] += quantity
+                for key, totals in (
+                    ((day, product.id), by_product),
+                    ((day, product.brand), by_brand),
+                ):
+                    line_counters = totals.setdefault(key, [0, 0.0])
+                    line_counters[0] += quantity
+                    line_counters[1] += revenue
+
+        self._add_to_rollup(
+            DailySales,
+            ["day"],
+            [
+                {"day": day, "order_count": count, "units": units, "revenue": revenue}
+                for day, (count, units, revenue) in by_day.items()
+            ],
+        )
+        self._add_to_rollup(
+            DailyProductSales,
+            ["day", "product_id"],
+            [
+                {"day": day, "product_id": key, "units": units, "revenue": revenue}
+                for (day, key), (units, revenue) in by_product.items()
+            ],
+        )
+        self._add_to_rollup(
+            DailyBrandSales,
+            ["day", "brand"],
+            [
+                {"day": day, "brand": key, "units": units, "revenue": revenue}
+                for (day, key), (units, revenue) in by_brand.items()
+            ],
+        )
+
+    # recomputes every rollup from the raw orders in one transaction. Order
+    # lines keep no unit price, so product and brand revenue are rebuilt from
+    # the current prices, scaled to each order's final price.
+    def rebuild(self) -> dict[str, int]:
+        line_total = Product.price * OrderProduct.quantity
+        subtotals = (
+            select(OrderProduct.order_id, func.sum(line_total).label("subtotal"))
+            .join(Product, Product.id == OrderProduct.product_id)
+            .group_by(OrderProduct.order_id)
+            .subquery()
+        )
+        lines = (
+            select(
+                func.date(Order.date).label("day"),
+                Order.id.label("order_id"),
+                OrderProduct.product_id,
+                Product.brand,
+                OrderProduct.quantity,
+                func.coalesce(
+                    line_total
+                    * Order.final_price
+                    / func.nullif(subtotals.c.subtotal, 0),
+                    0.0,
+                ).label("revenue"),
+            )
+            .join(OrderProduct, OrderProduct.order_id == Order.id)
+            .join(Product, Product.id == OrderProduct.product_id)
+            .join(subtotals, subtotals.c.order_id == Order.id)
+            .subquery("line")
+        )
+        units = func.sum(lines.c.quantity)
+        revenue = func.sum(lines.c.revenue)
+        rollups = [
+            (
+                DailySales,
+                ["day", "order_count", "units", "revenue"],
+                select(
+                    lines.c.day,
+                    func.count(lines.c.order_id.distinct()),
+                    units,
+                    revenue,
+                ).group_by(lines.c.day),
+            ),
+            (
+                DailyProductSales,
+                ["day", "product_id", "units", "revenue"],
+                select(lines.c.day, lines.c.product_id, units, revenue).group_by(
+                    lines.c.day, lines.c.product_id
+                ),
+            ),
+            (
+                DailyBrandSales,
+                ["day", "brand", "units", "revenue"],
+                select(lines.c.day, lines.c.brand, units, revenue).group_by(
+                    lines.c.day, lines.c.brand
+                ),
+            ),
+        ]
+
+        counts = {}
+        for model, columns, rows in rollups:
+            self.session.exec(delete(model))
+            result = self.session.exec(insert(model).from_select(columns, rows))
+            counts[model.__tablename__] = result.rowcount
+        self.session.commit()
+        return counts
+
+    # one row per day with sales in [start, end]
+    def get_daily_sales(self, start: date, end: date) -> list[DailySales]:
+        statement = (
+            select(DailySales)
+            .where(DailySales.day >= start, DailySales.day <= end)
+            .order_by(DailySales.day)
+        )
+        return list(self.session.exec(statement))
+
+    # (product id, name, units, revenue) of the best selling products
+    def get_top_products(
+        self, start: date, end: date, limit: int
+    ) -> list[tuple[int, str, int, float]]:
+        revenue = func.sum(DailyProductSales.revenue)
+        totals = (
+            select(
+                DailyProductSales.product_id,
+                func.sum(DailyProductSales.units).label("units"),
+                revenue.label("revenue"),
+            )
+            .where(DailyProductSales.day >= start, DailyProductSales.day <= end)
+            .group_by(DailyProductSales.product_id)
+            .order_by(revenue.desc())
+            .limit(limit)
+            .subquery()
+        )
+        statement = (
+            select(totals.c.product_id, Product.name, totals.c.units, totals.c.revenue)
+            .join(Product, Product.id == totals.c.product_id)
+            .order_by(totals.c.revenue.desc())
+        )
+        return list(self.session.exec(statement))
+
+    # (brand, units, revenue) of every brand with sales, best selling first
+    def get_brand_sales(self, start: date, end: date) -> list[tuple[str, int, float]]:
+        revenue = func.sum(DailyBrandSales.revenue)
+        statement = (
+            select(DailyBrandSales.brand, func.sum(DailyBrandSales.units), revenue)
+            .where(DailyBrandSales.day >= start, DailyBrandSales.day <= end)
+            .group_by(DailyBrandSales.brand)
+            .order_by(revenue.desc())
+        )
+        return list(self.session.exec(statement))
@@ -0,0 +1,113 @@
+from itertools import groupby
+from operator import itemgetter
+from typing import Iterator
+from sqlmodel import Session, select
+from app.models import Product, ProductTag, Tag, Order, OrderProduct
+
+
+# parent rows read per page while streaming; memory stays bounded by this
+EXPORT_BATCH_SIZE = 1000
+
+
+# Helper: pairs each parent row with its child rows, read from a second stream
+# sorted by the parent id, so the children are never grouped in memory
+def _merge_children(
+    parents: Iterator[tuple], child_rows: Iterator[tuple]
+) -> Iterator[tuple[tuple, list[tuple]]]:
+    groups = groupby(child_rows, key=itemgetter(0))
+    pending = next(groups, None)
+    for parent in parents:
+        parent_id = parent[0]
+        while pending is not None and pending[0] < parent_id:
+            pending = next(groups, None)
+        children = []
+        if pending is not None and pending[0] == parent_id:
+            children = [row[1:] for row in pending[1]]
+            pending = next(groups, None)
+        yield parent, children
+
+
+class ExportService:
+    def __init__(self, session: Session, batch_size: int = EXPORT_BATCH_SIZE):
+        self.session = session
+        self.batch_size = batch_size
+
+    # Helper: keyset pages of the parent rows, each read with its child rows in
+    # its own short read transaction. A cursor held open for a whole download
+    # would keep SQLite's shared lock and block every commit meanwhile; between
+    # pages no lock is held, at the cost of pages reflecting different commits.
+    def _pages(
+        self, parents, parent_id, children, child_parent_id
+    ) -> Iterator[tuple[tuple, list[tuple]]]:
+        last_id = None
+        while True:
+            page = parents.limit(self.batch_size)
+            if last_id is not None:
+                page = page.where(parent_id > last_id)
+            try:
+                rows = self.session.exec(page).all()
+                child_rows = []
+                if rows:
+                    child_rows = self.session.exec(
+                        children.where(
+                            child_parent_id >= rows[0][0],
+                            child_parent_id <= rows[-1][0],
+                        )
+                    ).all()
+            finally:
+                self.session.rollback()
+            yield from _merge_children(iter(rows), iter(child_rows))
+            if len(rows) < self.batch_size:
+                return
+            last_id = rows[-1][0]
+
+    # streams every product with its tag names, in id order
+    def iter_products(self) -> Iterator[dict]:
+        pages = self._pages(
+            select(
+                Product.id,
+                Product.name,
+                Product.type,
+                Product.brand,
+                Product.price,
+                Product.stock_quantity,
+                Product.min_stock_level,
+            ).order_by(Product.id),
+            Product.id,
+            select(ProductTag.product_id, Tag.name)
+            .join(Tag)
+            .order_by(ProductTag.product_id, ProductTag.tag_id),
+            ProductTag.product_id,
+        )
+
+        columns = ("id", "name", "type", "brand", "price")
+        columns += ("stock_quantity", "min_stock_level")
+        for row, tags in pages:
+            product = dict(zip(columns, row))
+            product["tags"] = [name for (name,) in tags]
+            yield product
+
+    # streams every order with its lines, in id order
+    def iter_orders(self) -> Iterator[dict]:
+        pages = self._pages(
+            select(Order.id, Order.user_id, Order.date, Order.final_price).order_by(
+                Order.id
+            ),
+            Order.id,
+            select(
+                OrderProduct.order_id, OrderProduct.product_id, OrderProduct.quantity
+            ).order_by(OrderProduct.order_id, OrderProduct.id),
+            OrderProduct.order_id,
+        )
+
+        for (order_id, user_id, date, final_price), lines in pages:
+            yield {
+                "id": order_id,
+                "user_id": user_id,
+                "date": date.isoformat() if date else None,
+                "final_price": final_price,
+                "lines": [
+                    {"product_id": product_id, "quantity": quantity}
+                    for product_id, quantity in lines
+                ],
+            }
@@ -0,0 +1,60 @@
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import DateTime, Float, and_, func, literal, union_all
+from sqlmodel import Session, select
+from app.models import Order, OrderProduct
+
+
+# days of sales history the velocity is computed over
+VELOCITY_WINDOW_DAYS = 28
+
+# span of the exponential moving average; recent days weigh more
+VELOCITY_SPAN_DAYS = 7
+
+
+# Helper: normalized weight of a daily bucket by its age in days (0 = today),
+# so a constant daily rate averages to itself
+def _day_weights(window_days: int, span_days: int) -> list[float]:
+    alpha = 2 / (span_days + 1)
+    weights = [alpha * (1 - alpha) ** age for age in range(window_days)]
+    total = sum(weights)
+    return [weight / total for weight in weights]
+
+
+class ForecastService:
+    def __init__(self, session: Session):
+        self.session = session
+
+    # exponentially weighted daily sales per product over the last window_days
+    # days, today included; products without sales in the window are left out.
+    # Each day is one range of the Order.date index joined with its weight, so
+    # the whole moving average is a single grouped sum in the database.
+    def sales_velocity(
+        self,
+        window_days: int = VELOCITY_WINDOW_DAYS,
+        span_days: int = VELOCITY_SPAN_DAYS,
+    ) -> dict[int, float]:
+        today = datetime.combine(date.today(), time.min)
+        buckets = union_all(
+            *[
+                select(
+                    literal(today - timedelta(days=age), DateTime).label("day_start"),
+                    literal(today - timedelta(days=age - 1), DateTime).label("day_end"),
+                    literal(weight, Float).label("weight"),
+                )
+                for age, weight in enumerate(_day_weights(window_days, span_days))
+            ]
+        ).cte("bucket")
+        statement = (
+            select(
+                OrderProduct.product_id,
+                func.sum(OrderProduct.quantity * buckets.c.weight),
+            )
+            .select_from(buckets)
+            .join(
+                Order,
+                and_(Order.date >= buckets.c.day_start, Order.date < buckets.c.day_end),
+            )
+            .join(OrderProduct, OrderProduct.order_id == Order.id)
+            .group_by(OrderProduct.product_id)
+        )
+        return dict(self.session.exec(statement).all())
@@ -0,0 +1,68 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import delete
+from sqlmodel import Session
+from app.models import IdempotencyKey
+
+
+# how long a stored response is replayed for; the purge job deletes older keys
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+
+# longest Idempotency-Key header accepted
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+
+# fingerprint of a request body; a key reused with a different body is rejected
+def request_fingerprint(payload: dict) -> str:
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _cutoff(ttl_hours: float) -> datetime:
+    return datetime.now() - timedelta(hours=ttl_hours)
+
+
+class IdempotencyService:
+    def __init__(self, session: Session):
+        self.session = session
+
+    # the stored request of a user's key, None once past the TTL
+    def get(
+        self, user_id: int, key: str, ttl_hours: float = IDEMPOTENCY_KEY_TTL_HOURS
+    ) -> IdempotencyKey | None:
+        stored = self.session.get(IdempotencyKey, (user_id, key))
+        if stored is None or stored.created_at < _cutoff(ttl_hours):
+            return None
+        return stored
+
+    # stores the response of a request; the caller commits it together with the
+    # changes the request made, so a retry never sees one without the other. An
+    # expired row the purge job has not deleted yet is replaced.
+    def store(
+        self,
+        user_id: int,
+        key: str,
+        request_hash: str,
+        response: str,
+        ttl_hours: float = IDEMPOTENCY_KEY_TTL_HOURS,
+    ) -> None:
+        self.session.exec(
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id)
+            .where(IdempotencyKey.key == key)
+            .where(IdempotencyKey.created_at < _cutoff(ttl_hours))
+        )
+        self.session.add(
+            IdempotencyKey(
+                user_id=user_id, key=key, request_hash=request_hash, response=response
+            )
+        )
+
+    # deletes the keys older than the TTL; returns the number deleted
+    def purge_expired(self, ttl_hours: float = IDEMPOTENCY_KEY_TTL_HOURS) -> int:
+        result = self.session.exec(
+            delete(IdempotencyKey).where(IdempotencyKey.created_at < _cutoff(ttl_hours))
+        )
+        self.session.commit()
+        return result.rowcount
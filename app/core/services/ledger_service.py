@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, literal
+from sqlmodel import Session, select, insert
+from app.models import Product, StockMovement, StockSnapshot
+
+
+# reasons recorded on stock movements
+SALE = "sale"
+RESTOCK = "restock"
+ADJUSTMENT = "adjustment"
+INITIAL_STOCK = "initial_stock"
+
+# movements older than this are compacted into the snapshots
+MOVEMENT_RETENTION_DAYS = 90
+
+
+class StockLedgerService:
+    def __init__(self, session: Session):
+        self.session = session
+
+    # appends one movement per product (zero changes are skipped); the caller
+    # commits them together with the stock change itself
+    def record_movements(
+        self, changes: dict[int, int], reason: str, order_id: int | None = None
+    ) -> None:
+        self.record_order_movements({order_id: changes}, reason)
+
+    # appends the movements of many orders in one executemany, keyed by order id
+    def record_order_movements(
+        self, changes_by_order: dict[int | None, dict[int, int]], reason: str
+    ) -> None:
+        now = datetime.now()
+        rows = [
+            {
+                "product_id": product_id,
+                "quantity_change": quantity_change,
+                "reason": reason,
+                "order_id": order_id,
+                "created_at": now,
+            }
+            for order_id, changes in changes_by_order.items()
+            for product_id, quantity_change in changes.items()
+            if quantity_change
+        ]
+        if rows:
+            self.session.exec(insert(StockMovement.__table__), params=rows)
+
+    # time of the oldest movement or snapshot kept for a product, None if its
+    # stock never moved through the ledger (e.g. rows loaded by a seed script)
+    def history_start(self, product_id: int) -> datetime | None:
+        first_movement = self.session.exec(
+            select(func.min(StockMovement.created_at)).where(
+                StockMovement.product_id == product_id
+            )
+        ).one()
+        first_snapshot = self.session.exec(
+            select(func.min(StockSnapshot.taken_at)).where(
+                StockSnapshot.product_id == product_id
+            )
+        ).one()
+        starts = [start for start in (first_movement, first_snapshot) if start]
+        return min(starts, default=None)
+
+    # stock of a product at the given time: the last snapshot taken by then plus
+    # the movements after it. Without one, the current stock minus the movements
+    # since. Past the retention window only the snapshot points are exact; times
+    # before the product's history are unknown and rejected.
+    def stock_as_of(self, product: Product, at: datetime) -> int:
+        start = self.history_start(product.id)
+        if start is None:
+            raise ValueError(f"No stock history recorded for product {product.id}")
+        if at < start:
+            raise ValueError(
+                f"No stock history for product {product.id} before "
+                f"{start.isoformat(sep=' ', timespec='seconds')}"
+            )
+        snapshot = self.session.exec(
+            select(StockSnapshot.stock_quantity, StockSnapshot.movement_id)
+            .where(StockSnapshot.product_id == product.id)
+            .where(StockSnapshot.taken_at <= at)
+            .order_by(StockSnapshot.taken_at.desc())
+            .limit(1)
+        ).first()
+        change = func.coalesce(func.sum(StockMovement.quantity_change), 0)
+        movements = select(change).where(StockMovement.product_id == product.id)
+        if snapshot is None:
+            later = movements.where(StockMovement.created_at > at)
+            return product.stock_quantity - self.session.exec(later).one()
+        stock_quantity, movement_id = snapshot
+        since = movements.where(StockMovement.id > movement_id).where(
+            StockMovement.created_at <= at
+        )
+        return stock_quantity + self.session.exec(since).one()
+
+    # snapshots the current stock of every product that moved since the last
+    # run; returns the number of snapshots taken
+    def take_snapshots(self) -> int:
+        last_movement_id = select(
+            func.coalesce(func.max(StockSnapshot.movement_id), 0)
+        ).scalar_subquery()
+        moved = (
+            select(
+                StockMovement.product_id,
+                func.max(StockMovement.id).label("movement_id"),
+            )
+            .where(StockMovement.id > last_movement_id)
+            .group_by(StockMovement.product_id)
+            .subquery()
+        )
+        rows = select(
+            Product.id,
+            Product.stock_quantity,
+            moved.c.movement_id,
+            literal(datetime.now()),
+        ).join(moved, moved.c.product_id == Product.id)
+        result = self.session.exec(
+            insert(StockSnapshot).from_select(
+                ["product_id", "stock_quantity", "movement_id", "taken_at"], rows
+            )
+        )
+        self.session.commit()
+        return result.rowcount
+
+    # deletes the movements older than the retention window that a snapshot from
+    # before the window already accounts for; returns the number deleted
+    def compact_movements(self, retention_days: float = MOVEMENT_RETENTION_DAYS) -> int:
+        cutoff = datetime.now() - timedelta(days=retention_days)
+        covered_up_to = (
+            select(func.max(StockSnapshot.movement_id))
+            .where(StockSnapshot.product_id == StockMovement.product_id)
+            .where(StockSnapshot.taken_at < cutoff)
+            .scalar_subquery()
+        )
+        result = self.session.exec(
+            delete(StockMovement)
+            .where(StockMovement.created_at < cutoff)
+            .where(StockMovement.id <= covered_up_to)
+        )
+        self.session.commit()
+        return result.rowcount
@@ -1,5 +1,7 @@
+from datetime import datetime
 from app.models import User, Product, Order, OrderProduct
-from sqlmodel import Session, select
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, select, insert, tuple_
 
 
 # This receives a list of products and quantitie and returns a summary of the order
@@ -12,24 +14,64 @@ class OrderService:
         self.session = session
 
     def get_products(self, product_ids: list[int]) -> list[Product]:
-        products = list(self.session.exec(select(Product).where(Product.id.in_(product_ids))).all())
+        products = list(
+            self.session.exec(select(Product).where(Product.id.in_(product_ids))).all()
+        )
         if not products:
             raise ValueError(f"Products with ids {product_ids} not found")
         return products
-    
+
     def create_order(self, user_id: int) -> Order:
         return Order(user_id=user_id)
 
     def create_order_product(self, order_id: int, product_id: int, quantity: int):
         return OrderProduct(order_id=order_id, product_id=product_id, quantity=quantity)
 
-    def calculate_price(self, user: User, product_map: list[tuple[Product, int]]) -> float:
-        total_price = sum([product.price * quantity for product, quantity in product_map])
+    # inserts an order with a Core INSERT ... RETURNING, skipping the ORM flush;
+    # the returned Order is not attached to the session
+    def insert_order(
+        self, user_id: int, date: datetime, final_price: float | None
+    ) -> Order:
+        return self.insert_orders(
+            [{"user_id": user_id, "date": date, "final_price": final_price}]
+        )[0]
+
+    # inserts many orders with multi-row INSERT ... RETURNING; the returned
+    # Orders, in row order, are not attached to the session
+    def insert_orders(self, rows: list[dict]) -> list[Order]:
+        if not rows:
+            return []
+        table = Order.__table__
+        statement = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+        order_ids = self.session.exec(statement, params=rows).scalars().all()
+        return [Order(id=order_id, **row) for order_id, row in zip(order_ids, rows)]
+
+    # inserts (order id, product id, quantity) lines in one executemany
+    def insert_order_lines(self, lines: list[tuple[int, int, int]]) -> None:
+        if lines:
+            self.session.exec(
+                insert(OrderProduct.__table__),
+                params=[
+                    {
+                        "order_id": order_id,
+                        "product_id": product_id,
+                        "quantity": quantity,
+                    }
+                    for order_id, product_id, quantity in lines
+                ],
+            )
+
+    def calculate_price(
+        self, user: User, product_map: list[tuple[Product, int]]
+    ) -> float:
+        total_price = sum(
+            [product.price * quantity for product, quantity in product_map]
+        )
         if user.is_member:
             return total_price * 0.7
         return total_price
 
-    def generate_invoice( 
+    def generate_invoice(
         self,
         order: Order,
         product_map: list[tuple[Product, int]],
@@ -63,35 +105,68 @@ class OrderService:
         for product, quantity in product_map:
             original_price = product.price
             line_total = original_price * quantity
-            
+
             # Apply member discount if applicable
             if user and user.is_member:
                 discounted_price = original_price * 0.7
                 discounted_line_total = discounted_price * quantity
                 discount_amount += line_total - discounted_line_total
-                
+
                 invoice_lines.append(
                     f"{product.name:<20} {quantity:<8} ${discounted_price:<9.2f} ${discounted_line_total:<9.2f}"
                 )
-                invoice_lines.append(f"{'':<20} {'':<8} {'(was $' + f'{original_price:.2f})':<10} {'':<10}")
+                invoice_lines.append(
+                    f"{'':<20} {'':<8} {'(was $' + f'{original_price:.2f})':<10} {'':<10}"
+                )
             else:
                 invoice_lines.append(
                     f"{product.name:<20} {quantity:<8} ${original_price:<9.2f} ${line_total:<9.2f}"
                 )
-            
+
             total_amount += line_total
 
         invoice_lines.append("-" * 50)
-        
+
         if user and user.is_member and discount_amount > 0:
             invoice_lines.append(f"{'SUBTOTAL':<38} ${total_amount:<9.2f}")
-            invoice_lines.append(f"{'MEMBER DISCOUNT (30%)':<38} -${discount_amount:<8.2f}")
+            invoice_lines.append(
+                f"{'MEMBER DISCOUNT (30%)':<38} -${discount_amount:<8.2f}"
+            )
             invoice_lines.append(f"{'FINAL TOTAL':<38} ${order.final_price:<9.2f}")
         else:
             invoice_lines.append(f"{'TOTAL':<38} ${total_amount:<9.2f}")
-            
+
         invoice_lines.append("=" * 50)
 
         return "\n".join(invoice_lines)
 
-
+    # up to limit orders, newest first, that sort before the (date, id) keyset
+    # cursor; the lines of the whole page come in one IN query
+    def get_orders_page(
+        self,
+        before: tuple[datetime, int] | None,
+        limit: int,
+        user_id: int | None = None,
+        product_id: int | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> list[Order]:
+        statement = select(Order).options(selectinload(Order.order_products))
+        if user_id is not None:
+            statement = statement.where(Order.user_id == user_id)
+        if product_id is not None:
+            statement = statement.where(
+                Order.id.in_(
+                    select(OrderProduct.order_id).where(
+                        OrderProduct.product_id == product_id
+                    )
+                )
+            )
+        if start is not None:
+            statement = statement.where(Order.date >= start)
+        if end is not None:
+            statement = statement.where(Order.date < end)
+        if before is not None:
+            statement = statement.where(tuple_(Order.date, Order.id) < before)
+        statement = statement.order_by(Order.date.desc(), Order.id.desc()).limit(limit)
+        return list(self.session.exec(statement))
@@ -0,0 +1,60 @@
+from datetime import datetime
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session
+from app.models import StockReservation
+
+
+# how long a reservation holds stock unless the caller asks otherwise
+DEFAULT_RESERVATION_TTL_SECONDS = 15 * 60
+MAX_RESERVATION_TTL_SECONDS = 24 * 60 * 60
+
+
+class ReservationService:
+    def __init__(self, session: Session):
+        self.session = session
+
+    # creates or replaces the reservation of a product for a user's cart; the
+    # caller commits it
+    def save(
+        self,
+        cart_id: str,
+        user_id: int,
+        product_id: int,
+        quantity: int,
+        expires_at: datetime,
+    ) -> None:
+        statement = sqlite_insert(StockReservation).values(
+            cart_id=cart_id,
+            product_id=product_id,
+            user_id=user_id,
+            quantity=quantity,
+            expires_at=expires_at,
+            created_at=datetime.now(),
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=["cart_id", "product_id"],
+            set_={
+                "quantity": statement.excluded.quantity,
+                "expires_at": statement.excluded.expires_at,
+            },
+        )
+        self.session.exec(statement)
+
+    # deletes the reservations of a cart, or only those of the given products;
+    # the caller commits it
+    def delete(self, cart_id: str, product_ids: list[int] | None = None) -> None:
+        statement = delete(StockReservation).where(StockReservation.cart_id == cart_id)
+        if product_ids is not None:
+            statement = statement.where(StockReservation.product_id.in_(product_ids))
+        self.session.exec(statement)
+
+    # deletes the rows of expired reservations; returns the number deleted
+    def purge_expired(self) -> int:
+        result = self.session.exec(
+            delete(StockReservation).where(
+                StockReservation.expires_at <= datetime.now()
+            )
+        )
+        self.session.commit()
+        return result.rowcount
@@ -0,0 +1,79 @@
+import re
+from sqlalchemy import bindparam, text
+from sqlmodel import Session
+from app.database import MAX_IN_CLAUSE, PRODUCT_SEARCH_TAGS_SQL
+
+
+# relative BM25 weights of the name, brand, type and tags columns
+BM25_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+
+_TERM_PATTERN = re.compile(r"\w+")
+
+_SEARCH_SQL = text(
+    f"""
+    SELECT product.id, product.name, product.brand, product.type, product.price,
+           product.stock_quantity,
+           highlight(product_search, 0, '<mark>', '</mark>') AS highlighted_name,
+           bm25(product_search, {", ".join(map(str, BM25_WEIGHTS))}) AS score
+    FROM product_search
+    JOIN product ON product.id = product_search.rowid
+    WHERE product_search MATCH :query
+    ORDER BY score, product.id
+    LIMIT :limit OFFSET :offset
+    """
+)
+
+_COUNT_SQL = text(
+    "SELECT count(*) FROM product_search WHERE product_search MATCH :query"
+)
+
+_INDEX_PRODUCTS_SQL = text(
+    f"""
+    INSERT INTO product_search (rowid, name, brand, type, tags)
+    SELECT product.id, product.name, product.brand, product.type, (
+        {PRODUCT_SEARCH_TAGS_SQL.format(product_id="product.id")}
+    )
+    FROM product WHERE product.id IN :product_ids
+    """
+).bindparams(bindparam("product_ids", expanding=True))
+
+
+# full-text product search over the product_search FTS5 table
+class SearchService:
+    def __init__(self, session: Session):
+        self.session = session
+
+    # turns free text into an FTS5 query: every word must match as a prefix
+    @staticmethod
+    def build_match_query(text_query: str) -> str | None:
+        terms = _TERM_PATTERN.findall(text_query)
+        if not terms:
+            return None
+        return " ".join(f'"{term}"*' for term in terms)
+
+    # returns (total matches, page of rows ranked by BM25, best first)
+    def search_products(
+        self, text_query: str, limit: int = 20, offset: int = 0
+    ) -> tuple[int, list]:
+        query = self.build_match_query(text_query)
+        if query is None:
+            return 0, []
+
+        total = self.session.exec(_COUNT_SQL, params={"query": query}).scalar_one()
+        rows = self.session.exec(
+            _SEARCH_SQL, params={"query": query, "limit": limit, "offset": offset}
+        ).all()
+        return total, rows
+
+    # bulk loads: pauses the insert triggers for the rest of the current write
+    # transaction; resume_indexing must run before the commit
+    def pause_indexing(self) -> None:
+        self.session.exec(text("UPDATE product_search_sync SET paused = 1"))
+
+    # indexes the products inserted while paused in one statement and resumes
+    # the triggers
+    def resume_indexing(self, product_ids: list[int]) -> None:
+        for start in range(0, len(product_ids), MAX_IN_CLAUSE):
+            chunk = product_ids[start : start + MAX_IN_CLAUSE]
+            self.session.exec(_INDEX_PRODUCTS_SQL, params={"product_ids": chunk})
+        self.session.exec(text("UPDATE product_search_sync SET paused = 0"))
@@ -1,5 +1,6 @@
 from app.models import User
 from sqlmodel import Session, select
+from app.database import MAX_IN_CLAUSE
 
 
 class SetupService:
@@ -20,4 +21,12 @@ class SetupService:
                 return user
         if not name:
             raise ValueError("Cannot create user without a name")
-        return self._create_user(name)
\ No newline at end of file
+        return self._create_user(name)
+
+    # gets many users with one query per chunk of ids; missing ids are skipped
+    def get_users(self, user_ids: list[int]) -> list[User]:
+        users = []
+        for start in range(0, len(user_ids), MAX_IN_CLAUSE):
+            chunk = user_ids[start : start + MAX_IN_CLAUSE]
+            users.extend(self.session.exec(select(User).where(User.id.in_(chunk))))
+        return users
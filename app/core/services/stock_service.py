@@ -1,6 +1,13 @@
-from sqlmodel import Session, select
+from sqlmodel import Session, select, insert, update, case
 from typing import Optional
-from app.models import Product, OrderProduct
+from app.models import Product
+from app.database import MAX_IN_CLAUSE
+
+
+# bound variables per product of the CASE updates: its IN list entry plus a WHEN
+# and a THEN per CASE; sell_stock binds its sold CASE twice and a floor CASE
+UPDATE_VARIABLES_PER_ID = 3
+SELL_VARIABLES_PER_ID = 7
 
 
 class StockService:
@@ -14,48 +21,83 @@ class StockService:
             raise ValueError(f"Product with id {product_id} not found")
         return product
 
-    def update_stock_quantity(self, product_id: int, quantity_change: int) -> None:
-        # 1. gets the product
+    # gets many products with one query per chunk of ids; missing ids are skipped
+    def get_products(self, product_ids: list[int]) -> list[Product]:
+        products = []
+        for start in range(0, len(product_ids), MAX_IN_CLAUSE):
+            chunk = product_ids[start : start + MAX_IN_CLAUSE]
+            statement = select(Product).where(Product.id.in_(chunk))
+            products.extend(self.session.exec(statement))
+        return products
+
+    # inserts many products with multi-row INSERTs, returning their ids in row order
+    def insert_products(self, rows: list[dict]) -> list[int]:
+        if not rows:
+            return []
+        # Core insert on the table skips the per-row ORM bookkeeping
+        table = Product.__table__
+        statement = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+        return self.session.exec(statement, params=rows).scalars().all()
+
+    def set_min_stock_level(self, product_id: int, min_level: int) -> None:
         product = self.get_product(product_id)
+        product.min_stock_level = min_level
 
-        # 2. updates stock
-        new_quantity = product.stock_quantity + quantity_change
-        if new_quantity < 0:
-            raise ValueError(
-                f"Insufficient stock for product {product_id}. Available: {product.stock_quantity}, requested: {-quantity_change}"
+    # Helper: sets a column from per-product values with one UPDATE per chunk;
+    # returns (id, stock_quantity, min_stock_level) of the updated products
+    def _update_by_id(self, column, values: dict[int, object], expression) -> list:
+        updated = []
+        product_ids = list(values)
+        chunk_size = max(MAX_IN_CLAUSE // UPDATE_VARIABLES_PER_ID, 1)
+        for start in range(0, len(product_ids), chunk_size):
+            chunk = product_ids[start : start + chunk_size]
+            per_product = case({pid: values[pid] for pid in chunk}, value=Product.id)
+            statement = (
+                update(Product)
+                .where(Product.id.in_(chunk))
+                .values({column: expression(per_product)})
+                .returning(Product.id, Product.stock_quantity, Product.min_stock_level)
+                .execution_options(synchronize_session=False)
             )
-        product.stock_quantity = new_quantity
+            updated.extend(self.session.exec(statement).all())
+        return updated
 
-    # returns all products that have stock (quantity > 0)
-    def get_all_products_in_stock(self) -> list[Product]:
-        statement = (
-            select(Product).where(Product.stock_quantity > 0).order_by(Product.name)
+    # adds a stock delta to many products at once; missing ids are skipped
+    def restock_products(self, deltas: dict[int, int]) -> list:
+        return self._update_by_id(
+            Product.stock_quantity,
+            deltas,
+            lambda delta: Product.stock_quantity + delta,
         )
-        return list(self.session.exec(statement))
 
-    # returns products that are below minimum stock but not zero
-    def get_low_stock_products(self) -> list[Product]:
-        statement = select(Product).where(
-            Product.stock_quantity <= Product.min_stock_level,
-            Product.stock_quantity > 0,
+    # sets the minimum stock level of many products at once; missing ids are skipped
+    def set_min_stock_levels(self, min_levels: dict[int, int]) -> list:
+        return self._update_by_id(
+            Product.min_stock_level, min_levels, lambda min_level: min_level
         )
-        return list(self.session.exec(statement))
-
-    # returns products that are out of stock
-    def get_out_of_stock_products(self) -> list[Product]:
-        statement = select(Product).where(Product.stock_quantity == 0)
-        return list(self.session.exec(statement))
-
-    def set_min_stock_level(self, product_id: int, min_level: int) -> None:
-        product = self.get_product(product_id)
-        product.min_stock_level = min_level
 
-    # updates stock for multiple products in an order
-    def process_order_stock_update(self, order_products: list[OrderProduct]) -> None:
-        for order_product in order_products:
-            self.update_stock_quantity(
-                order_product.product_id, -order_product.quantity
+    # takes sold units out of stock with one UPDATE per chunk, only where at
+    # least floors[id] units (the stock reserved for others) remain afterwards;
+    # returns (id, stock_quantity, min_stock_level) of the updated products, so
+    # a product missing from the result lacked stock
+    def sell_stock(self, quantities: dict[int, int], floors: dict[int, int]) -> list:
+        updated = []
+        product_ids = list(quantities)
+        chunk_size = max(MAX_IN_CLAUSE // SELL_VARIABLES_PER_ID, 1)
+        for start in range(0, len(product_ids), chunk_size):
+            chunk = product_ids[start : start + chunk_size]
+            sold = case({pid: quantities[pid] for pid in chunk}, value=Product.id)
+            floor = case({pid: floors.get(pid, 0) for pid in chunk}, value=Product.id)
+            statement = (
+                update(Product)
+                .where(Product.id.in_(chunk))
+                .where(Product.stock_quantity - sold >= floor)
+                .values(stock_quantity=Product.stock_quantity - sold)
+                .returning(Product.id, Product.stock_quantity, Product.min_stock_level)
+                .execution_options(synchronize_session=False)
             )
+            updated.extend(self.session.exec(statement).all())
+        return updated
 
     # returns stock status
     def get_stock_status(self, product_id: int) -> Optional[dict]:
@@ -1,23 +1,66 @@
-from sqlmodel import Session, select
+from sqlmodel import Session, select, insert, delete, exists, true
 from app.models import Tag, Product, ProductTag, User, UserFavoriteTag
+from app.database import MAX_IN_CLAUSE
+from app.core.cache.tag_cache import TagCache, tag_cache
+from app.core.cache.commit_hooks import after_commit
+from app.core.cache.tag_index import (
+    TagIndex,
+    tag_index,
+    tokenize_tag_expression,
+    tag_names_in_expression,
+    evaluate_tag_expression,
+    ids_from_bitmap,
+)
+from app.core.cache.recommendations import (
+    RecommendationEngine,
+    recommendation_engine,
+)
+from app.core.cache.tag_cooccurrence import TagCooccurrence, tag_cooccurrence
 
 
 class TagService:
-    def __init__(self, session: Session):
+    def __init__(
+        self,
+        session: Session,
+        cache: TagCache = tag_cache,
+        index: TagIndex = tag_index,
+        recommendations: RecommendationEngine = recommendation_engine,
+        cooccurrence: TagCooccurrence = tag_cooccurrence,
+    ):
         self.session = session
-
-    # Helper: gets or creates tag by name
-    def _get_tag(self, name: str) -> Tag:
-        tag = self.session.exec(select(Tag).where(Tag.name == name)).first()
-        if not tag:
-            raise ValueError(f"Tag with name {name} not found")
-        return tag
-
-    def _create_tag(self, name: str) -> Tag:
-        tag = Tag(name=name)
-        self.session.add(tag)
-        self.session.flush()
-        return tag
+        self.cache = cache
+        self.index = index
+        self.recommendations = recommendations
+        self.cooccurrence = cooccurrence
+
+    # Helper: resolves all names in one lookup, creating the missing tags in one
+    # multi-row INSERT
+    def _get_or_create_tag_ids(self, names: list[str]) -> dict[str, int]:
+        tag_ids = self.cache.get_ids(self.session, names)
+        missing = [name for name in dict.fromkeys(names) if name not in tag_ids]
+        if missing:
+            created = self.session.exec(
+                insert(Tag).returning(Tag.id, Tag.name),
+                params=[{"name": name} for name in missing],
+            )
+            created_ids = {name: tag_id for tag_id, name in created}
+            tag_ids.update(created_ids)
+            self.cache.add_created(self.session, created_ids)
+        return tag_ids
+
+    # Helper: current tag ids of each product, in chunked queries
+    def _product_tag_ids(self, product_ids: list[int]) -> dict[int, set[int]]:
+        tag_sets = {product_id: set() for product_id in product_ids}
+        for start in range(0, len(product_ids), MAX_IN_CLAUSE):
+            chunk = product_ids[start : start + MAX_IN_CLAUSE]
+            rows = self.session.exec(
+                select(ProductTag.product_id, ProductTag.tag_id).where(
+                    ProductTag.product_id.in_(chunk)
+                )
+            )
+            for product_id, tag_id in rows:
+                tag_sets[product_id].add(tag_id)
+        return tag_sets
 
     # PRODUCT TAG OPERATIONS
 
@@ -27,44 +70,188 @@ class TagService:
         if not product:
             raise ValueError(f"Product with id {product_id} not found")
 
+        tag_ids = self._get_or_create_tag_ids(tag_names)
+        existing_ids = {pt.tag_id for pt in product.tags}
+        before = set(existing_ids)
+
         added_tags = []
-        for tag_name in tag_names:
-            tag = self._get_tag(tag_name)
-            if not tag:
-                tag = self._create_tag(tag_name)
-
-            # check if product already has this tag
-            existing = next(
-                (pt for pt in product.tags if pt.tag_id == tag.id), None
-            )  #! TODO generator > SÓ PODE ITERAR UMA VEZ, NÃO PRECISA DE LISTA
-
-            if not existing:
-                product_tag = ProductTag(product_id=product_id, tag_id=tag.id)
+        for tag_name in dict.fromkeys(tag_names):
+            tag_id = tag_ids[tag_name]
+            if tag_id not in existing_ids:
+                product_tag = ProductTag(product_id=product_id, tag_id=tag_id)
                 self.session.add(product_tag)
+                existing_ids.add(tag_id)
                 added_tags.append(tag_name)
 
         self.session.commit()
+        added_ids = [tag_ids[name] for name in added_tags]
+        self.index.add_tags([product_id], added_ids)
+        self.recommendations.add_tags([product_id], added_ids)
+        self.cooccurrence.update_product(before, existing_ids)
         return added_tags
 
     # removes tags from a product
     def remove_tags_from_product(self, product_id: int, tag_names: list[str]) -> int:
-        removed_count = 0
-        for tag_name in tag_names:
-            tag = self.session.exec(select(Tag).where(Tag.name == tag_name)).first()
-            if tag:
-                product_tag = self.session.exec(
-                    select(ProductTag).where(
-                        ProductTag.product_id == product_id, ProductTag.tag_id == tag.id
-                    )
-                ).first()
+        tag_ids = self.cache.get_ids(self.session, tag_names)
+        if not tag_ids:
+            return 0
+
+        track_pairs = self.cooccurrence.loaded
+        if track_pairs:
+            before = self._product_tag_ids([product_id])[product_id]
+
+        product_tags = self.session.exec(
+            select(ProductTag).where(
+                ProductTag.product_id == product_id,
+                ProductTag.tag_id.in_(list(tag_ids.values())),
+            )
+        ).all()
 
-                if product_tag:
-                    self.session.delete(product_tag)
-                    removed_count += 1
+        removed_count = 0
+        for product_tag in product_tags:
+            self.session.delete(product_tag)
+            removed_count += 1
 
         self.session.commit()
+        removed_ids = {pt.tag_id for pt in product_tags}
+        self.index.remove_tags([product_id], list(removed_ids))
+        self.recommendations.remove_tags([product_id], list(removed_ids))
+        if track_pairs:
+            self.cooccurrence.update_product(before, before - removed_ids)
+        elif self.cooccurrence.loaded:
+            # built while the change was in flight; its old pairs are unknown
+            self.cooccurrence.clear()
         return removed_count
 
+    # adds and removes the same tags on many products in a single transaction
+    def bulk_update_product_tags(
+        self,
+        product_ids: list[int],
+        add_tag_names: list[str],
+        remove_tag_names: list[str],
+        commit: bool = True,
+    ) -> tuple[int, int]:
+        add_ids = list(self._get_or_create_tag_ids(add_tag_names).values())
+        remove_ids = list(self.cache.get_ids(self.session, remove_tag_names).values())
+        product_ids = list(dict.fromkeys(product_ids))
+
+        # before/after tag sets feed the co-occurrence matrix once committed
+        track_pairs = self.cooccurrence.loaded
+        tag_changes = []
+
+        added_count = 0
+        removed_count = 0
+        for start in range(0, len(product_ids), MAX_IN_CLAUSE):
+            chunk = product_ids[start : start + MAX_IN_CLAUSE]
+            if track_pairs:
+                before = self._product_tag_ids(chunk)
+
+            if remove_ids:
+                result = self.session.exec(
+                    delete(ProductTag).where(
+                        ProductTag.product_id.in_(chunk),
+                        ProductTag.tag_id.in_(remove_ids),
+                    )
+                )
+                removed_count += result.rowcount
+
+            if add_ids:
+                # product x tag pairs minus the pairs that already exist
+                missing_pairs = (
+                    select(Product.id, Tag.id)
+                    .join(Tag, true())
+                    .where(
+                        Product.id.in_(chunk),
+                        Tag.id.in_(add_ids),
+                        ~exists().where(
+                            ProductTag.product_id == Product.id,
+                            ProductTag.tag_id == Tag.id,
+                        ),
+                    )
+                )
+                result = self.session.exec(
+                    insert(ProductTag).from_select(
+                        ["product_id", "tag_id"], missing_pairs
+                    )
+                )
+                added_count += result.rowcount
+
+            if track_pairs:
+                after = self._product_tag_ids(chunk)
+                tag_changes.extend((before[pid], after[pid]) for pid in chunk)
+
+        # with commit=False the caller commits; a rollback leaves the indexes as
+        # they were
+        after_commit(
+            self.session,
+            lambda: self._publish_tag_changes(
+                product_ids, add_ids, remove_ids, tag_changes if track_pairs else None
+            ),
+        )
+        if commit:
+            self.session.commit()
+        return added_count, removed_count
+
+    # Helper: applies committed tag changes of many products to the in-memory
+    # indexes; tag_changes is None when the before/after tag sets were not
+    # tracked because the co-occurrence matrix was not loaded
+    def _publish_tag_changes(
+        self,
+        product_ids: list[int],
+        add_ids: list[int],
+        remove_ids: list[int],
+        tag_changes: list[tuple[set[int], set[int]]] | None,
+    ) -> None:
+        self.index.remove_tags(product_ids, remove_ids)
+        self.index.add_tags(product_ids, add_ids)
+        self.recommendations.remove_tags(product_ids, remove_ids)
+        self.recommendations.add_tags(product_ids, add_ids)
+        if tag_changes is None:
+            if self.cooccurrence.loaded:
+                # built while the change was in flight; its pairs are unknown
+                self.cooccurrence.clear()
+            return
+        for before_tags, after_tags in tag_changes:
+            self.cooccurrence.update_product(before_tags, after_tags)
+
+    # registers freshly inserted products in the tag index and tags them with one
+    # multi-row INSERT; returns the number of product tags created
+    def tag_new_products(
+        self, tag_names_by_product: dict[int, list[str]], commit: bool = True
+    ) -> int:
+        tag_ids = self._get_or_create_tag_ids(
+            [name for names in tag_names_by_product.values() for name in names]
+        )
+        tag_sets = {
+            product_id: {tag_ids[name] for name in names}
+            for product_id, names in tag_names_by_product.items()
+        }
+        pairs = [
+            {"product_id": product_id, "tag_id": tag_id}
+            for product_id, tag_set in tag_sets.items()
+            for tag_id in tag_set
+        ]
+        if pairs:
+            self.session.exec(insert(ProductTag.__table__), params=pairs)
+
+        # the caches only see the products once they are committed
+        after_commit(self.session, lambda: self._publish_new_products(tag_sets))
+        if commit:
+            self.session.commit()
+        return len(pairs)
+
+    # Helper: applies the tags of committed new products to the in-memory caches
+    def _publish_new_products(self, tag_sets: dict[int, set[int]]) -> None:
+        self.index.add_products(list(tag_sets))
+        tagged: dict[int, list[int]] = {}
+        for product_id, tag_set in tag_sets.items():
+            for tag_id in tag_set:
+                tagged.setdefault(tag_id, []).append(product_id)
+            self.cooccurrence.update_product(set(), tag_set)
+        for tag_id, product_ids in tagged.items():
+            self.index.add_tags(product_ids, [tag_id])
+            self.recommendations.add_tags(product_ids, [tag_id])
+
     # gets all tags for a product
     def get_product_tags(self, product_id: int) -> list[str]:
         # Fix: Get full Tag objects and extract names
@@ -74,12 +261,52 @@ class TagService:
         tags = self.session.exec(statement).all()
         return [tag.name for tag in tags]
 
-    # gets all products with a specific tag
-    def get_products_by_tag(self, tag_name: str) -> list[Product]:
-        statement = (
-            select(Product).join(ProductTag).join(Tag).where(Tag.name == tag_name)
+    # gets the tags most often found on the same products as tag_name
+    def get_related_tags(self, tag_name: str, limit: int = 10) -> list[tuple[str, int]]:
+        tag_id = self.cache.get_id(self.session, tag_name)
+        if tag_id is None:
+            raise ValueError(f"Tag with name {tag_name} not found")
+
+        related = self.cooccurrence.related(self.session, tag_id, limit)
+        if not related:
+            return []
+        names = dict(
+            self.session.exec(
+                select(Tag.id, Tag.name).where(
+                    Tag.id.in_([other_id for other_id, _ in related])
+                )
+            ).all()
+        )
+        return [
+            (names[other_id], count) for other_id, count in related if other_id in names
+        ]
+
+    # gets products matching a boolean tag expression, e.g. "Wireless AND NOT Premium"
+    def query_products_by_tags(
+        self, expression: str, in_stock_only: bool = True, limit: int = 100
+    ) -> list[Product]:
+        tokens = tokenize_tag_expression(expression)
+        tag_ids = self.cache.get_ids(self.session, tag_names_in_expression(tokens))
+        bitmap = evaluate_tag_expression(
+            tokens,
+            lambda name: self.index.get(self.session, tag_ids.get(name)),
+            self.index.all_products(self.session),
         )
-        return list(self.session.exec(statement))
+
+        # matching ids come out in ascending order, so chunks can stop at the limit
+        product_ids = ids_from_bitmap(bitmap)
+        products = []
+        for start in range(0, len(product_ids), MAX_IN_CLAUSE):
+            chunk = product_ids[start : start + MAX_IN_CLAUSE]
+            statement = (
+                select(Product).where(Product.id.in_(chunk)).order_by(Product.id)
+            )
+            if in_stock_only:
+                statement = statement.where(Product.stock_quantity > 0)
+            products.extend(self.session.exec(statement))
+            if len(products) >= limit:
+                break
+        return products[:limit]
 
     # USER FAVORITE TAG OPERATIONS
 
@@ -89,32 +316,33 @@ class TagService:
         if not user:
             raise ValueError(f"User with id {user_id} not found")
 
-        tag = self._get_or_create_tag(tag_name)
+        tag_id = self._get_or_create_tag_ids([tag_name])[tag_name]
 
         # check if user already has this favorite tag
         existing = self.session.exec(
             select(UserFavoriteTag).where(
-                UserFavoriteTag.user_id == user_id, UserFavoriteTag.tag_id == tag.id
+                UserFavoriteTag.user_id == user_id, UserFavoriteTag.tag_id == tag_id
             )
         ).first()
 
         if existing:
             raise ValueError(f"User already has '{tag_name}' as a favorite tag")
 
-        favorite_tag = UserFavoriteTag(user_id=user_id, tag_id=tag.id)
+        favorite_tag = UserFavoriteTag(user_id=user_id, tag_id=tag_id)
         self.session.add(favorite_tag)
         self.session.commit()
+        self.recommendations.add_favorite(user_id, tag_id)
         return tag_name
 
     # removes a favorite tag for a user
     def remove_favorite_tag(self, user_id: int, tag_name: str) -> bool:
-        tag = self.session.exec(select(Tag).where(Tag.name == tag_name)).first()
-        if not tag:
+        tag_id = self.cache.get_id(self.session, tag_name)
+        if tag_id is None:
             return False
 
         favorite_tag = self.session.exec(
             select(UserFavoriteTag).where(
-                UserFavoriteTag.user_id == user_id, UserFavoriteTag.tag_id == tag.id
+                UserFavoriteTag.user_id == user_id, UserFavoriteTag.tag_id == tag_id
             )
         ).first()
 
@@ -123,6 +351,7 @@ class TagService:
 
         self.session.delete(favorite_tag)
         self.session.commit()
+        self.recommendations.remove_favorite(user_id, tag_id)
         return True
 
     # gets all favorite tags for a user
@@ -134,22 +363,19 @@ class TagService:
         tags = self.session.exec(statement).all()
         return [tag.name for tag in tags]
 
-    # gets products recommended for a user based on their favorite tags
-    def get_recommended_products(self, user_id: int, limit: int = 10) -> list[Product]:
-        favorite_tags = self.get_user_favorite_tags(user_id)
-        if not favorite_tags:
+    # gets products recommended for a user, best match first, with their scores
+    def get_recommended_products(
+        self, user_id: int, limit: int = 10
+    ) -> list[tuple[Product, float]]:
+        ranked = self.recommendations.recommend(self.session, user_id, limit)
+        if not ranked:
             return []
 
-        # get products that have any of the user's favorite tags
-        statement = (
-            select(Product)
-            .join(ProductTag)
-            .join(Tag)
-            .where(Tag.name.in_(favorite_tags))
-            .distinct()
-            .limit(limit)
+        products = self.session.exec(
+            select(Product).where(Product.id.in_([pid for pid, _ in ranked]))
         )
-        return list(self.session.exec(statement))
+        by_id = {product.id: product for product in products}
+        return [(by_id[pid], score) for pid, score in ranked if pid in by_id]
 
     # UTILITY OPERATIONS
 
@@ -161,24 +387,18 @@ class TagService:
 
     # removes unused tags (tags not used by any products or users)
     def cleanup_unused_tags(self) -> int:
-        # find tags that are not used by any products or users
-        used_tag_ids = set()
-
-        # get tags used by products
-        product_tag_ids = self.session.exec(select(ProductTag.tag_id)).all()
-        used_tag_ids.update(product_tag_ids)
-
-        # get tags used by users
-        user_tag_ids = self.session.exec(select(UserFavoriteTag.tag_id)).all()
-        used_tag_ids.update(user_tag_ids)
-
-        # delete unused tags
-        unused_tags = self.session.exec(
-            select(Tag).where(Tag.id.not_in(used_tag_ids))
-        ).all()
-
-        for tag in unused_tags:
-            self.session.delete(tag)
-
+        statement = (
+            delete(Tag)
+            .where(
+                ~exists().where(ProductTag.tag_id == Tag.id),
+                ~exists().where(UserFavoriteTag.tag_id == Tag.id),
+            )
+            .returning(Tag.id, Tag.name)
+        )
+        removed = self.session.exec(statement).all()
         self.session.commit()
-        return len(unused_tags)
+
+        self.cache.invalidate([name for _, name in removed])
+        self.index.drop_tags([tag_id for tag_id, _ in removed])
+        self.recommendations.drop_tags([tag_id for tag_id, _ in removed])
+        return len(removed)
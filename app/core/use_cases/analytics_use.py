@@ -0,0 +1,97 @@
+from datetime import date, timedelta
+from sqlmodel import Session
+from app.core.services.analytics_service import AnalyticsService
+from app.core.pagination import validate_page_size
+from app.dtos import (
+    DailySalesItem,
+    DailySalesResponse,
+    ProductSalesItem,
+    TopProductsResponse,
+    BrandSalesItem,
+    BrandSalesResponse,
+)
+
+
+# days reported when no start date is given
+DEFAULT_REPORT_DAYS = 30
+
+# products listed by the top products report by default
+DEFAULT_TOP_PRODUCTS = 10
+
+
+# read-side use case for sales reporting, served from the rollup tables
+class AnalyticsUseCase:
+    def __init__(self, session: Session, analytics_service: AnalyticsService):
+        self.session = session
+        self.analytics_service = analytics_service
+
+    # Helper: resolves the reported [start, end] day range
+    @staticmethod
+    def _date_range(start: date | None, end: date | None) -> tuple[date, date]:
+        end = end or date.today()
+        start = start or end - timedelta(days=DEFAULT_REPORT_DAYS - 1)
+        if start > end:
+            raise ValueError("Start date cannot be after end date")
+        return start, end
+
+    # revenue, units and orders per day, with the totals of the range
+    def get_daily_sales(
+        self, start: date | None = None, end: date | None = None
+    ) -> DailySalesResponse:
+        start, end = self._date_range(start, end)
+        days = [
+            DailySalesItem(
+                day=row.day,
+                order_count=row.order_count,
+                units=row.units,
+                revenue=round(row.revenue, 2),
+            )
+            for row in self.analytics_service.get_daily_sales(start, end)
+        ]
+        return DailySalesResponse(
+            start=start,
+            end=end,
+            order_count=sum(day.order_count for day in days),
+            units=sum(day.units for day in days),
+            revenue=round(sum(day.revenue for day in days), 2),
+            days=days,
+        )
+
+    # best selling products of the range, by revenue
+    def get_top_products(
+        self,
+        start: date | None = None,
+        end: date | None = None,
+        limit: int = DEFAULT_TOP_PRODUCTS,
+    ) -> TopProductsResponse:
+        start, end = self._date_range(start, end)
+        limit = validate_page_size(limit)
+        products = [
+            ProductSalesItem(
+                product_id=product_id,
+                name=name,
+                units=units,
+                revenue=round(revenue, 2),
+            )
+            for product_id, name, units, revenue in (
+                self.analytics_service.get_top_products(start, end, limit)
+            )
+        ]
+        return TopProductsResponse(start=start, end=end, products=products)
+
+    # sales of every brand over the range, by revenue
+    def get_brand_sales(
+        self, start: date | None = None, end: date | None = None
+    ) -> BrandSalesResponse:
+        start, end = self._date_range(start, end)
+        brands = [
+            BrandSalesItem(brand=brand, units=units, revenue=round(revenue, 2))
+            for brand, units, revenue in self.analytics_service.get_brand_sales(
+                start, end
+            )
+        ]
+        return BrandSalesResponse(start=start, end=end, brands=brands)
+
+    # recomputes the rollups from the raw orders; returns the rows per table
+    def rebuild(self) -> dict[str, int]:
+        return self.analytics_service.rebuild()
@@ -0,0 +1,112 @@
+from sqlmodel import Session
+from app.core.services.tag_service import TagService
+from app.core.services.search_service import SearchService
+from app.core.cache.catalog import CatalogSnapshot, catalog_snapshot
+from app.dtos import FacetCountsResponse, SearchResponse, SearchResultItem
+
+
+# read-side use case for catalog browsing, served from the in-memory snapshot
+class CatalogUseCase:
+    def __init__(
+        self,
+        session: Session,
+        tag_service: TagService,
+        search_service: SearchService,
+        catalog: CatalogSnapshot = catalog_snapshot,
+    ):
+        self.session = session
+        self.tag_service = tag_service
+        self.search_service = search_service
+        self.catalog = catalog
+
+    # narrows the catalog to the products matching every filter, as a bitmap
+    def _filter(
+        self,
+        tag_names: list[str],
+        brand: str | None,
+        product_type: str | None,
+        min_price: float | None,
+        max_price: float | None,
+        in_stock_only: bool,
+    ) -> tuple[int, set[int]]:
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise ValueError("Minimum price cannot be greater than maximum price")
+
+        bitmap = self.catalog.filter(
+            self.session, brand, product_type, min_price, max_price, in_stock_only
+        )
+        tag_ids = self.tag_service.cache.get_ids(self.session, tag_names)
+        for tag_name in tag_names:
+            bitmap &= self.tag_service.index.get(self.session, tag_ids.get(tag_name))
+        return bitmap, set(tag_ids.values())
+
+    # counts per remaining tag, brand and type for the filtered product set
+    def get_facets(
+        self,
+        tag_names: list[str],
+        brand: str | None = None,
+        product_type: str | None = None,
+        min_price: float | None = None,
+        max_price: float | None = None,
+        in_stock_only: bool = False,
+    ) -> FacetCountsResponse:
+        bitmap, selected_tag_ids = self._filter(
+            tag_names, brand, product_type, min_price, max_price, in_stock_only
+        )
+
+        tag_counts = {}
+        for tag_id, tag_bitmap in self.tag_service.index.bitmaps(self.session).items():
+            if tag_id in selected_tag_ids:
+                continue
+            count = (bitmap & tag_bitmap).bit_count()
+            if count:
+                tag_counts[tag_id] = count
+        tag_names_by_id = self.tag_service.cache.get_names(
+            self.session, list(tag_counts)
+        )
+        brand_counts, type_counts = self.catalog.facet_counts(bitmap)
+
+        return FacetCountsResponse(
+            total=bitmap.bit_count(),
+            tags={
+                tag_names_by_id[tag_id]: count
+                for tag_id, count in tag_counts.items()
+                if tag_id in tag_names_by_id
+            },
+            brands=brand_counts,
+            types=type_counts,
+        )
+
+    # full-text search over name, brand, type and tags, ranked by BM25
+    def search_products(
+        self, query: str, limit: int = 20, offset: int = 0
+    ) -> SearchResponse:
+        if not query or not query.strip():
+            raise ValueError("Search query cannot be empty")
+        if limit <= 0:
+            raise ValueError("Limit must be positive")
+        if offset < 0:
+            raise ValueError("Offset cannot be negative")
+        if limit > 100:
+            limit = 100  # Cap limit to prevent abuse
+
+        total, rows = self.search_service.search_products(query, limit, offset)
+        return SearchResponse(
+            query=query,
+            total=total,
+            limit=limit,
+            offset=offset,
+            results=[
+                SearchResultItem(
+                    id=row.id,
+                    name=row.name,
+                    brand=row.brand,
+                    product_type=row.type,
+                    price=row.price,
+                    stock_quantity=row.stock_quantity,
+                    highlighted_name=row.highlighted_name,
+                    score=-row.score,  # bm25() is lower-is-better
+                )
+                for row in rows
+            ],
+        )
@@ -0,0 +1,152 @@
+import csv
+import io
+import json
+import zlib
+from typing import Iterator
+from sqlalchemy import Engine
+from sqlmodel import Session
+from app.database import engine
+from app.core.services.export_service import ExportService, EXPORT_BATCH_SIZE
+
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+# encoded output is handed out in chunks of roughly this many characters
+CHUNK_SIZE = 64 * 1024
+
+PRODUCT_CSV_COLUMNS = [
+    "id",
+    "name",
+    "type",
+    "brand",
+    "price",
+    "stock_quantity",
+    "min_stock_level",
+    "tags",
+]
+ORDER_CSV_COLUMNS = [
+    "order_id",
+    "user_id",
+    "date",
+    "final_price",
+    "product_id",
+    "quantity",
+]
+
+
+# Helper: one CSV line per product, tag names joined with "|"
+def _product_csv_rows(products: Iterator[dict]) -> Iterator[list]:
+    for product in products:
+        yield [product[column] for column in PRODUCT_CSV_COLUMNS[:-1]] + [
+            "|".join(product["tags"])
+        ]
+
+
+# Helper: one CSV line per order line (orders without lines get one empty line)
+def _order_csv_rows(orders: Iterator[dict]) -> Iterator[list]:
+    for order in orders:
+        header = [order["id"], order["user_id"], order["date"], order["final_price"]]
+        if not order["lines"]:
+            yield header + ["", ""]
+        for line in order["lines"]:
+            yield header + [line["product_id"], line["quantity"]]
+
+
+def _ndjson_chunks(records: Iterator[dict]) -> Iterator[str]:
+    encode = json.JSONEncoder(separators=(",", ":")).encode
+    buffer = []
+    size = 0
+    for record in records:
+        line = encode(record) + "\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def _csv_chunks(columns: list[str], rows: Iterator[list]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _encode(chunks: Iterator[str], compress: bool) -> Iterator[bytes]:
+    if not compress:
+        for chunk in chunks:
+            yield chunk.encode()
+        return
+    # wbits=31 writes a gzip container, so the stream is a valid .gz file
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# use case for full dumps of the catalog and the orders, e.g. for ERP syncs
+class ExportUseCase:
+    # the exports read through their own session: a stream outlives the request
+    # that started it
+    def __init__(self, bind: Engine = engine, batch_size: int = EXPORT_BATCH_SIZE):
+        self.bind = bind
+        self.batch_size = batch_size
+
+    @staticmethod
+    def validate_format(format: str) -> None:
+        if format not in EXPORT_FORMATS:
+            raise ValueError(
+                f"Unsupported export format '{format}'. Use one of: {', '.join(EXPORT_FORMATS)}"
+            )
+
+    @staticmethod
+    def media_type(format: str, compress: bool) -> str:
+        if compress:
+            return "application/gzip"
+        return "application/x-ndjson" if format == "ndjson" else "text/csv"
+
+    @staticmethod
+    def filename(name: str, format: str, compress: bool) -> str:
+        return f"{name}.{format}" + (".gz" if compress else "")
+
+    def _stream_products(self, format: str) -> Iterator[str]:
+        with Session(self.bind) as session:
+            products = ExportService(session, self.batch_size).iter_products()
+            if format == "ndjson":
+                yield from _ndjson_chunks(products)
+            else:
+                yield from _csv_chunks(PRODUCT_CSV_COLUMNS, _product_csv_rows(products))
+
+    def _stream_orders(self, format: str) -> Iterator[str]:
+        with Session(self.bind) as session:
+            orders = ExportService(session, self.batch_size).iter_orders()
+            if format == "ndjson":
+                yield from _ndjson_chunks(orders)
+            else:
+                yield from _csv_chunks(ORDER_CSV_COLUMNS, _order_csv_rows(orders))
+
+    # streams every product with its tags; the format is checked before streaming
+    def export_products(
+        self, format: str = "ndjson", compress: bool = False
+    ) -> Iterator[bytes]:
+        self.validate_format(format)
+        return _encode(self._stream_products(format), compress)
+
+    # streams every order with its lines; the format is checked before streaming
+    def export_orders(
+        self, format: str = "ndjson", compress: bool = False
+    ) -> Iterator[bytes]:
+        self.validate_format(format)
+        return _encode(self._stream_orders(format), compress)
@@ -0,0 +1,198 @@
+import csv
+import io
+import json
+from itertools import batched
+from typing import BinaryIO, Iterator
+from pydantic import TypeAdapter as ModelListAdapter, ValidationError
+from sqlmodel import Session
+from app.core.services.stock_service import StockService
+from app.core.services.tag_service import TagService
+from app.core.services.search_service import SearchService
+from app.core.services.ledger_service import StockLedgerService, INITIAL_STOCK
+from app.core.ports.type_port import TypePort
+from app.core.cache.catalog import CatalogSnapshot, catalog_snapshot
+from app.core.use_cases.stock_use import validate_create_product_input
+from app.dtos import CreateProductInput, ImportRowError, ImportProductsResponse
+
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+# rows validated and inserted per transaction
+IMPORT_BATCH_SIZE = 1000
+
+# validates a whole batch of rows in one call
+_CREATE_PRODUCT_ROWS = ModelListAdapter(list[CreateProductInput])
+
+# names the product export gives CreateProductInput fields, so an exported file
+# imports as is; other export fields (id, brand) are ignored
+_EXPORT_FIELD_NAMES = {"type": "product_type", "tags": "tag_names"}
+
+
+# Helper: a record with the export's field names renamed to the input's
+def _input_record(record: dict) -> dict:
+    return {_EXPORT_FIELD_NAMES.get(key, key): value for key, value in record.items()}
+
+
+# Helper: CSV records with the CreateProductInput or the export columns; empty
+# cells fall back to the defaults and tag names are separated by "|", as in the
+# export
+def _csv_records(lines: Iterator[str]) -> Iterator[dict | Exception]:
+    for record in csv.DictReader(lines):
+        record = _input_record(
+            {key: value for key, value in record.items() if key and value}
+        )
+        if "tag_names" in record:
+            record["tag_names"] = [
+                name.strip() for name in record["tag_names"].split("|") if name.strip()
+            ]
+        yield record
+
+
+def _ndjson_records(lines: Iterator[str]) -> Iterator[dict | Exception]:
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"Invalid JSON: {str(e)}")
+            continue
+        if not isinstance(record, dict):
+            yield ValueError("Expected a JSON object")
+            continue
+        yield _input_record(record)
+
+
+def _describe(error: dict) -> str:
+    field = ".".join(str(part) for part in error["loc"][1:])
+    return f"{field}: {error['msg']}" if field else error["msg"]
+
+
+# use case for loading many products at once from a CSV or NDJSON stream
+class ImportUseCase:
+    def __init__(
+        self,
+        session: Session,
+        stock_service: StockService,
+        tag_service: TagService,
+        search_service: SearchService,
+        type_adapter: TypePort,
+        ledger_service: StockLedgerService,
+        catalog: CatalogSnapshot = catalog_snapshot,
+    ):
+        self.session = session
+        self.stock_service = stock_service
+        self.tag_service = tag_service
+        self.search_service = search_service
+        self.type_adapter = type_adapter
+        self.ledger_service = ledger_service
+        self.catalog = catalog
+
+    # validates a batch, returning the valid inputs and the per-row errors
+    def _validate_batch(
+        self, batch: tuple[tuple[int, dict | Exception], ...]
+    ) -> tuple[list[CreateProductInput], list[ImportRowError]]:
+        errors = [
+            ImportRowError(row=row, error=str(record))
+            for row, record in batch
+            if isinstance(record, Exception)
+        ]
+        records = [(row, record) for row, record in batch if isinstance(record, dict)]
+        try:
+            inputs = _CREATE_PRODUCT_ROWS.validate_python([r for _, r in records])
+        except ValidationError as e:
+            invalid = {}
+            for error in e.errors():
+                invalid.setdefault(error["loc"][0], _describe(error))
+            errors.extend(
+                ImportRowError(row=records[index][0], error=message)
+                for index, message in invalid.items()
+            )
+            records = [
+                record for index, record in enumerate(records) if index not in invalid
+            ]
+            inputs = _CREATE_PRODUCT_ROWS.validate_python([r for _, r in records])
+
+        valid = []
+        for (row, _), input in zip(records, inputs):
+            try:
+                validate_create_product_input(self.type_adapter, input)
+                valid.append(input)
+            except ValueError as e:
+                errors.append(ImportRowError(row=row, error=str(e)))
+        return valid, errors
+
+    # inserts one batch of products and their tags in a single transaction; the
+    # search index is filled once per batch instead of once per row
+    def _insert_batch(self, inputs: list[CreateProductInput]) -> None:
+        self.search_service.pause_indexing()
+        product_ids = self.stock_service.insert_products(
+            [
+                {
+                    "name": input.name,
+                    "type": input.product_type,
+                    "price": input.price,
+                    "stock_quantity": input.stock_quantity,
+                    "min_stock_level": input.min_stock_level,
+                }
+                for input in inputs
+            ]
+        )
+        self.tag_service.tag_new_products(
+            {
+                product_id: input.tag_names
+                for product_id, input in zip(product_ids, inputs)
+            },
+            commit=False,
+        )
+        self.ledger_service.record_movements(
+            {
+                product_id: input.stock_quantity
+                for product_id, input in zip(product_ids, inputs)
+            },
+            INITIAL_STOCK,
+        )
+        self.search_service.resume_indexing(product_ids)
+        self.session.commit()
+        self.catalog.refresh(self.session, product_ids)
+        self.tag_service.recommendations.refresh_products(self.session, product_ids)
+
+    # imports products from a CSV or NDJSON byte stream in chunked transactions;
+    # invalid rows are reported and skipped, the rest are imported
+    def import_products(
+        self, stream: BinaryIO, format: str = "csv", batch_size: int = IMPORT_BATCH_SIZE
+    ) -> ImportProductsResponse:
+        if format not in IMPORT_FORMATS:
+            raise ValueError(
+                f"Unsupported import format '{format}'. Use one of: {', '.join(IMPORT_FORMATS)}"
+            )
+
+        lines = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        records = _csv_records(lines) if format == "csv" else _ndjson_records(lines)
+
+        imported_count = 0
+        errors: list[ImportRowError] = []
+        for batch in batched(enumerate(records, start=1), batch_size):
+            valid, batch_errors = self._validate_batch(batch)
+            errors.extend(batch_errors)
+            if not valid:
+                continue
+            try:
+                self._insert_batch(valid)
+                imported_count += len(valid)
+            except Exception as e:
+                self.session.rollback()
+                failed_rows = {error.row for error in batch_errors}
+                errors.extend(
+                    ImportRowError(row=row, error=f"Batch failed: {str(e)}")
+                    for row, _ in batch
+                    if row not in failed_rows
+                )
+
+        errors.sort(key=lambda error: error.row)
+        return ImportProductsResponse(
+            imported_count=imported_count,
+            failed_count=len(errors),
+            errors=errors,
+            message=f"Imported {imported_count} products, {len(errors)} rows failed",
+        )
@@ -1,11 +1,60 @@
-from sqlmodel import Session
-from app.models import User, Order, OrderProduct
+import logging
+from sqlmodel import Session, select
+from app.models import User, Product, Order
 from app.core.services.order_service import OrderService
 from app.core.services.setup_service import SetupService
 from app.core.services.stock_service import StockService
+from app.core.services.ledger_service import StockLedgerService, SALE
+from app.core.services.analytics_service import AnalyticsService
+from app.core.services.reservation_service import ReservationService
+from app.core.services.idempotency_service import (
+    IdempotencyService,
+    MAX_IDEMPOTENCY_KEY_LENGTH,
+    request_fingerprint,
+)
 from app.core.ports.type_port import TypePort
-from app.dtos import SaleResult
-from datetime import datetime
+from app.core.cache.copurchase import CoPurchaseIndex, co_purchase_index
+from app.core.cache.catalog import CatalogRow, CatalogSnapshot, catalog_snapshot
+from app.core.cache.tag_index import bitmap_from_ids
+from app.core.cache.idempotency import IdempotencyCache, idempotency_cache
+from app.core.cache.reservations import ReservationBook, reservation_book
+from app.core.cache.carts import CartState, CartStore, cart_store
+from app.core.cache.recommendations import RecommendationEngine, recommendation_engine
+from app.core.alerts import StockAlertHub, stock_alert_hub
+from app.core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    decode_date_cursor,
+    encode_date_cursor,
+    paginate_catalog,
+    split_page,
+    validate_page_size,
+)
+from app.dtos import (
+    SaleResult,
+    FrequentlyBoughtTogetherResponse,
+    ProductInStockResponse,
+    ProductPageResponse,
+    OrderLineItem,
+    OrderHistoryItem,
+    OrderHistoryResponse,
+    CartLineQuote,
+    CartQuoteResponse,
+    BatchSaleInput,
+    BatchSaleOrder,
+    BatchSaleOrderResult,
+    BatchSaleResponse,
+)
+from datetime import date, datetime, time, timedelta
+
+
+logger = logging.getLogger(__name__)
+
+# orders a single batch sale may hold
+MAX_BATCH_ORDERS = 1000
+
+# times a batch is re-planned against fresh stock when other sales took some of
+# it between the batch's read and its stock update
+BATCH_SALE_ATTEMPTS = 3
 
 
 class SalesUseCase:
@@ -16,15 +65,349 @@ class SalesUseCase:
         setup_service: SetupService,
         stock_service: StockService,
         type_adapter: TypePort,
+        ledger_service: StockLedgerService,
+        analytics_service: AnalyticsService,
+        idempotency_service: IdempotencyService,
+        reservation_service: ReservationService,
+        co_purchase: CoPurchaseIndex = co_purchase_index,
+        catalog: CatalogSnapshot = catalog_snapshot,
+        stock_alerts: StockAlertHub = stock_alert_hub,
+        idempotency: IdempotencyCache = idempotency_cache,
+        reservations: ReservationBook = reservation_book,
+        carts: CartStore = cart_store,
+        recommendations: RecommendationEngine = recommendation_engine,
     ):
         self.session = session
         self.order_service = order_service
         self.setup_service = setup_service
         self.stock_service = stock_service
         self.type_adapter = type_adapter
+        self.ledger_service = ledger_service
+        self.analytics_service = analytics_service
+        self.co_purchase = co_purchase
+        self.catalog = catalog
+        self.stock_alerts = stock_alerts
+        self.idempotency_service = idempotency_service
+        self.idempotency = idempotency
+        self.reservation_service = reservation_service
+        self.reservations = reservations
+        self.carts = carts
+        self.recommendations = recommendations
 
     def simple_sale(
-        self, user_id: int, product_ids: list[int], quantities: list[int]
+        self,
+        user_id: int,
+        product_ids: list[int],
+        quantities: list[int],
+        idempotency_key: str | None = None,
+    ) -> SaleResult:
+        if idempotency_key is None:
+            return self._simple_sale(user_id, product_ids, quantities)
+        if not idempotency_key or len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            raise ValueError(
+                f"Idempotency key must be 1 to {MAX_IDEMPOTENCY_KEY_LENGTH} characters"
+            )
+
+        request_hash = request_fingerprint(
+            {"user_id": user_id, "product_ids": product_ids, "quantities": quantities}
+        )
+        # a duplicate arriving while the first request runs waits for it here,
+        # then replays its response
+        with self.idempotency.claim(user_id, idempotency_key):
+            replayed = self._replay_sale(user_id, idempotency_key, request_hash)
+            if replayed is not None:
+                return replayed
+            try:
+                result = self._simple_sale(
+                    user_id,
+                    product_ids,
+                    quantities,
+                    (idempotency_key, request_hash),
+                )
+            except ValueError:
+                # another process may have committed the same key first, in
+                # which case the key's primary key rolled this sale back
+                replayed = self._replay_sale(user_id, idempotency_key, request_hash)
+                if replayed is None:
+                    raise
+                return replayed
+            self.idempotency.put(
+                user_id,
+                idempotency_key,
+                request_hash,
+                result.model_dump_json(),
+                datetime.now(),
+            )
+            return result
+
+    # Helper: the stored response of a user's idempotency key, from the
+    # in-memory cache or else the database; None if the key was not used yet
+    def _replay_sale(
+        self, user_id: int, key: str, request_hash: str
+    ) -> SaleResult | None:
+        stored = self.idempotency.get(user_id, key)
+        if stored is None:
+            row = self.idempotency_service.get(user_id, key)
+            if row is None:
+                return None
+            stored = self.idempotency.put(
+                user_id, key, row.request_hash, row.response, row.created_at
+            )
+        if stored.request_hash != request_hash:
+            raise ValueError("Idempotency key was already used for a different sale")
+        return SaleResult.model_validate_json(stored.response)
+
+    # opens a server-side cart for a user; its quotes include the member discount
+    def create_cart(self, user_id: int) -> CartQuoteResponse:
+        user = self.session.get(User, user_id)
+        if user is None:
+            raise ValueError(f"User with ID {user_id} not found")
+        return self._cart_quote(self.carts.create(user.id, user.is_member), {})
+
+    # adds units of a product to a cart at its current price, up to the stock
+    # not reserved by other carts
+    def add_to_cart(
+        self, cart_id: str, product_id: int, quantity: int
+    ) -> CartQuoteResponse:
+        if quantity <= 0 or not self.type_adapter.validate_quantity(quantity):
+            raise ValueError(f"Invalid quantity: {quantity}")
+        row = self._catalog_rows([product_id]).get(product_id)
+        if row is None:
+            raise ValueError(f"Product with id {product_id} not found")
+        available = self._available(row, cart_id)
+        self.carts.add(cart_id, product_id, quantity, row.price, available)
+        return self.get_cart_quote(cart_id)
+
+    # removes units of a product from a cart, or the whole line without quantity
+    def remove_from_cart(
+        self, cart_id: str, product_id: int, quantity: int | None = None
+    ) -> CartQuoteResponse:
+        if quantity is not None and quantity <= 0:
+            raise ValueError(f"Invalid quantity: {quantity}")
+        self.carts.remove(cart_id, product_id, quantity)
+        return self.get_cart_quote(cart_id)
+
+    # prices a cart; lines whose product price changed since they were added are
+    # repriced, and only those adjust the running subtotal
+    def get_cart_quote(self, cart_id: str) -> CartQuoteResponse:
+        cart = self.carts.get(cart_id)
+        if cart is None:
+            raise ValueError(f"Cart '{cart_id}' not found or expired")
+        rows = self._catalog_rows(list(cart.lines))
+        cart = self.carts.reprice(
+            cart_id,
+            {pid: rows[pid].price if pid in rows else None for pid in cart.lines},
+        )
+        return self._cart_quote(cart, rows)
+
+    # turns a cart into an order. A server-side cart is sold straight from the
+    # catalog snapshot at the prices of its last quote; if a price moved since,
+    # the cart is repriced and the checkout rejected, so the customer never pays
+    # a total no quote showed. Otherwise the stock reserved under the cart id is
+    # sold. Either way the cart's reservations are consumed, so the reserved
+    # units are sold even if other carts hold the rest of the stock.
+    def checkout_cart(self, user_id: int, cart_id: str) -> SaleResult:
+        cart = self.carts.get(cart_id)
+        if cart is None:
+            holds = self.reservations.cart(self.session, cart_id)
+            if not holds:
+                raise ValueError(f"Cart '{cart_id}' has no active reservations")
+            if any(hold.user_id != user_id for hold in holds.values()):
+                raise ValueError(f"Cart '{cart_id}' belongs to another user")
+            product_ids = list(holds)
+            quantities = [hold.quantity for hold in holds.values()]
+            return self._simple_sale(user_id, product_ids, quantities, cart_id=cart_id)
+
+        if cart.user_id != user_id:
+            raise ValueError(f"Cart '{cart_id}' belongs to another user")
+        if not cart.lines:
+            raise ValueError(f"Cart '{cart_id}' is empty")
+        rows = self._catalog_rows(list(cart.lines))
+        missing_ids = [pid for pid in cart.lines if pid not in rows]
+        if missing_ids:
+            raise ValueError(f"Products not found: {missing_ids}")
+        if any(rows[pid].price != price for pid, (_, price) in cart.lines.items()):
+            cart = self.carts.reprice(
+                cart_id, {pid: rows[pid].price for pid in cart.lines}
+            )
+            raise ValueError(
+                f"Prices changed since the last quote of cart '{cart_id}'; "
+                f"the new total is {cart.total:.2f}"
+            )
+        user = self.session.get(User, user_id)
+        if user is None:
+            raise ValueError(f"User with ID {user_id} not found")
+        product_map = [
+            (rows[pid], quantity) for pid, (quantity, _) in cart.lines.items()
+        ]
+        try:
+            result = self._sell(user, product_map, cart_id)
+        except Exception as e:
+            self.session.rollback()
+            raise ValueError(f"Sale failed: {str(e)}")
+        self.carts.discard(cart_id)
+        self._publish_sale([product_map], cart_id)
+        return result
+
+    # Helper: catalog rows of products by id; missing products are left out
+    def _catalog_rows(self, product_ids: list[int]) -> dict[int, CatalogRow]:
+        rows = self.catalog.get_rows(
+            self.session, bitmap_from_ids(product_ids), order_by_name=False
+        )
+        return {row.id: row for row in rows}
+
+    # Helper: quote of a cart state, with names from the given catalog rows
+    def _cart_quote(
+        self, cart: CartState, rows: dict[int, CatalogRow]
+    ) -> CartQuoteResponse:
+        return CartQuoteResponse(
+            cart_id=cart.cart_id,
+            user_id=cart.user_id,
+            is_member=cart.is_member,
+            lines=[
+                CartLineQuote(
+                    product_id=product_id,
+                    name=rows[product_id].name if product_id in rows else None,
+                    quantity=quantity,
+                    unit_price=unit_price,
+                    line_total=round(unit_price * quantity, 2),
+                )
+                for product_id, (quantity, unit_price) in cart.lines.items()
+            ],
+            item_count=sum(quantity for quantity, _ in cart.lines.values()),
+            subtotal=round(cart.subtotal, 2),
+            discount=round(cart.discount, 2),
+            total=round(cart.total, 2),
+        )
+
+    # Helper: units of a product a sale may take, stock reserved by other carts
+    # excluded
+    def _available(self, product, cart_id: str | None = None) -> int:
+        reserved = self.reservations.reserved(self.session, product.id, cart_id)
+        return product.stock_quantity - reserved
+
+    # Helper: rejects a sale asking for more than the stock not reserved by
+    # other carts, checked on the rows loaded for it
+    def _check_stock(self, product_map: list[tuple], cart_id: str | None) -> None:
+        requested: dict[int, int] = {}
+        for product, quantity in product_map:
+            requested[product.id] = requested.get(product.id, 0) + quantity
+        for product, _ in product_map:
+            available = self._available(product, cart_id)
+            if available < requested[product.id]:
+                raise ValueError(
+                    f"Insufficient stock for product ID {product.id} '{product.name}'. Available: {available}, requested: {requested[product.id]}"
+                )
+
+    # Helper: the sale path shared by every single-order sale. The order is one
+    # INSERT ... RETURNING, its lines one executemany and the stock one
+    # conditional UPDATE per chunk of products, so a sale costs the same handful
+    # of statements whatever its number of lines. A product whose unreserved
+    # stock ran out meanwhile fails the whole sale. Products are Product rows or
+    # catalog rows; the caller rolls back on errors and, once the sale is
+    # committed, publishes it with _publish_sale. With an (idempotency key,
+    # request hash) pair the response is stored with the order, and with a cart
+    # the cart's reservations are consumed by it.
+    def _sell(
+        self,
+        user: User,
+        product_map: list[tuple],
+        cart_id: str | None = None,
+        idempotency: tuple[str, str] | None = None,
+    ) -> SaleResult:
+        quantities: dict[int, int] = {}
+        for product, quantity in product_map:
+            quantities[product.id] = quantities.get(product.id, 0) + quantity
+        floors = {
+            pid: self.reservations.reserved(self.session, pid, cart_id)
+            for pid in quantities
+        }
+
+        total_price = sum(product.price * quantity for product, quantity in product_map)
+        if user.is_member:
+            total_price *= 0.7  # 30% discount for members
+
+        order = self.order_service.insert_order(user.id, datetime.now(), total_price)
+        self.order_service.insert_order_lines(
+            [(order.id, product.id, quantity) for product, quantity in product_map]
+        )
+        updated = self.stock_service.sell_stock(quantities, floors)
+        if len(updated) != len(quantities):
+            sold = {product_id for product_id, _, _ in updated}
+            short = next(
+                product for product, _ in product_map if product.id not in sold
+            )
+            stock = self.session.exec(
+                select(Product.stock_quantity).where(Product.id == short.id)
+            ).one()
+            raise ValueError(
+                f"Insufficient stock for product ID {short.id} '{short.name}'. Available: {stock - floors[short.id]}, requested: {quantities[short.id]}"
+            )
+        self._record_sale(order, product_map)
+
+        result = self._sale_result(order, product_map, user)
+        if idempotency is not None:
+            key, request_hash = idempotency
+            self.idempotency_service.store(
+                user.id, key, request_hash, result.model_dump_json()
+            )
+
+        if cart_id is not None:
+            self.reservation_service.delete(cart_id, list(quantities))
+        self.session.commit()
+        return result
+
+    # Helper: applies committed sales to the in-memory caches and alerts. The
+    # sales stand whatever happens here, so errors are logged, never raised; a
+    # catalog snapshot that may have missed the stock change is reloaded.
+    def _publish_sale(
+        self, product_maps: list[list[tuple]], cart_id: str | None = None
+    ) -> None:
+        sold_ids = list(
+            dict.fromkeys(
+                product.id for product_map in product_maps for product, _ in product_map
+            )
+        )
+        try:
+            if cart_id is not None:
+                self.reservations.release(cart_id, sold_ids)
+            for product_map in product_maps:
+                self.co_purchase.add_order([product.id for product, _ in product_map])
+            self.stock_alerts.publish(self.catalog.refresh(self.session, sold_ids))
+            self.recommendations.refresh_products(self.session, sold_ids)
+        except Exception:
+            logger.exception("Publishing the sale of products %s failed", sold_ids)
+            self.catalog.clear()
+
+    # Helper: result of a sale, invoice included
+    def _sale_result(
+        self, order: Order, product_map: list[tuple], user: User
+    ) -> SaleResult:
+        return SaleResult(
+            order_id=order.id,
+            user_id=user.id,
+            total_price=order.final_price,
+            invoice=self._generate_simple_invoice(order, product_map, user),
+            products_sold=[
+                {
+                    "product_id": product.id,
+                    "name": product.name,
+                    "quantity": quantity,
+                    "unit_price": product.price,
+                    "total": product.price * quantity,
+                }
+                for product, quantity in product_map
+            ],
+        )
+
+    # Helper: the sale itself, validated and priced from the product rows
+    def _simple_sale(
+        self,
+        user_id: int,
+        product_ids: list[int],
+        quantities: list[int],
+        idempotency: tuple[str, str] | None = None,
+        cart_id: str | None = None,
     ) -> SaleResult:
         try:
             # Validate inputs using type functions
@@ -40,100 +423,362 @@ class SalesUseCase:
             if not user:
                 raise ValueError(f"User with ID {user_id} not found")
 
-            # 2. Get all products
-            products = self.order_service.get_products(product_ids)
-            if len(products) != len(product_ids):
-                found_ids = [p.id for p in products]
-                missing_ids = [pid for pid in product_ids if pid not in found_ids]
-                raise ValueError(f"Products not found: {missing_ids}")
-
-            # 3. Create order
-            order = Order(user_id=user.id, date=datetime.now())
-            self.session.add(order)
-            self.session.flush()  # Get order ID
-
-            # 4. Create order products and update stock
-            order_products = []
-            product_map = []
-            total_price = 0.0
-
-            for product, quantity in zip(products, quantities):
-                # Check stock availability with improved error message
-                if product.stock_quantity < quantity:
-                    raise ValueError(
-                        f"Insufficient stock for product ID {product.id} '{product.name}'. Available: {product.stock_quantity}, requested: {quantity}"
-                    )
-
-                # Create order product
-                order_product = OrderProduct(
-                    order_id=order.id, product_id=product.id, quantity=quantity
-                )
-                self.session.add(order_product)
-                order_products.append(order_product)
-
-                # Update stock
-                product.stock_quantity -= quantity
-                self.session.add(product)
+            # 2. Get all products, matched to the quantities by id
+            product_map = self._product_map(product_ids, quantities)
 
-                # Calculate price
-                unit_price = product.price
-                item_total = unit_price * quantity
-                total_price += item_total
+            # 3. Check stock availability with improved error message
+            self._check_stock(product_map, cart_id)
 
-                product_map.append((product, quantity))
+            # 4. Insert the order and its lines, take the stock and commit
+            result = self._sell(user, product_map, cart_id, idempotency)
 
-            # 5. Set final price (apply member discount if applicable)
-            if user.is_member:
-                total_price *= 0.7  # 30% discount for members
-
-            order.final_price = total_price
-            self.session.add(order)
-
-            # 6. Commit all changes
-            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            raise ValueError(f"Sale failed: {str(e)}")
 
-            # 7. Generate invoice
-            invoice = self._generate_simple_invoice(order, product_map, user)
-
-            # 8. Return result
-            return SaleResult(
-                order_id=order.id,
-                user_id=user.id,
-                total_price=total_price,
-                invoice=invoice,
-                products_sold=[
-                    {
-                        "product_id": product.id,
-                        "name": product.name,
-                        "quantity": quantity,
-                        "unit_price": product.price,
-                        "total": product.price * quantity,
-                    }
+        self._publish_sale([product_map], cart_id)
+        return result
+
+    # Helper: (product, quantity) pairs in request order, the products loaded
+    # with one query per chunk of ids
+    def _product_map(
+        self, product_ids: list[int], quantities: list[int]
+    ) -> list[tuple[Product, int]]:
+        products = {
+            product.id: product
+            for product in self.stock_service.get_products(list(set(product_ids)))
+        }
+        missing_ids = [pid for pid in product_ids if pid not in products]
+        if missing_ids:
+            raise ValueError(f"Products not found: {missing_ids}")
+        return [
+            (products[pid], quantity) for pid, quantity in zip(product_ids, quantities)
+        ]
+
+    # sells many orders in one transaction. Users and products are loaded with
+    # one query each, orders and lines are bulk inserted, and stock is taken
+    # with one conditional UPDATE per chunk of the per-product totals. Orders
+    # are checked against the stock in submission order; with all_or_nothing a
+    # single failing order creates none of them. If other sales took stock
+    # between the read and the update, the batch is rolled back and planned
+    # again against the fresh stock, so only the orders that no longer fit fail.
+    def batch_sale(self, input: BatchSaleInput) -> BatchSaleResponse:
+        if not input.orders:
+            raise ValueError("Orders cannot be empty")
+        if len(input.orders) > MAX_BATCH_ORDERS:
+            raise ValueError(f"A batch holds at most {MAX_BATCH_ORDERS} orders")
+
+        for _ in range(BATCH_SALE_ATTEMPTS):
+            errors, accepted, reserved = self._plan_batch(input)
+            if errors and input.all_or_nothing:
+                accepted = []
+            created = self._insert_batch(accepted, reserved) if accepted else {}
+            if created is not None:
+                break
+        else:
+            raise ValueError("Batch sale failed: stock kept changing during the sale")
+
+        results = []
+        for index, order in enumerate(input.orders):
+            if index in created:
+                order_id, total_price = created[index]
+                results.append(
+                    BatchSaleOrderResult(
+                        user_id=order.user_id,
+                        success=True,
+                        order_id=order_id,
+                        total_price=total_price,
+                        message=f"Order {order_id} created",
+                    )
+                )
+            else:
+                results.append(
+                    BatchSaleOrderResult(
+                        user_id=order.user_id,
+                        success=False,
+                        message=errors.get(
+                            index, "Not created: another order in the batch failed"
+                        ),
+                    )
+                )
+        created_count = len(created)
+        failed_count = len(results) - created_count
+        return BatchSaleResponse(
+            created_count=created_count,
+            failed_count=failed_count,
+            results=results,
+            message=f"{created_count} orders created, {failed_count} failed",
+        )
+
+    # Helper: reads the users, products and unreserved stock of a batch and
+    # splits its orders into errors by batch index and the accepted orders, with
+    # the reserved units per product
+    def _plan_batch(
+        self, input: BatchSaleInput
+    ) -> tuple[
+        dict[int, str],
+        list[tuple[int, User, list[tuple[Product, int]]]],
+        dict[int, int],
+    ]:
+        users = {
+            user.id: user
+            for user in self.setup_service.get_users(
+                list({order.user_id for order in input.orders})
+            )
+        }
+        products = {
+            product.id: product
+            for product in self.stock_service.get_products(
+                list({pid for order in input.orders for pid in order.product_ids})
+            )
+        }
+        # stock each product can still give, net of the carts' reservations
+        reserved = {
+            pid: self.reservations.reserved(self.session, pid) for pid in products
+        }
+        remaining = {
+            pid: product.stock_quantity - reserved[pid]
+            for pid, product in products.items()
+        }
+
+        errors: dict[int, str] = {}
+        accepted: list[tuple[int, User, list[tuple[Product, int]]]] = []
+        for index, order in enumerate(input.orders):
+            error = self._batch_order_error(order, users, products)
+            if error is None:
+                quantities: dict[int, int] = {}
+                for pid, quantity in zip(order.product_ids, order.quantities):
+                    quantities[pid] = quantities.get(pid, 0) + quantity
+                short = next(
+                    (pid for pid, qty in quantities.items() if remaining[pid] < qty),
+                    None,
+                )
+                if short is not None:
+                    error = f"Insufficient stock for product ID {short} '{products[short].name}'. Available: {remaining[short]}, requested: {quantities[short]}"
+            if error is not None:
+                errors[index] = error
+                continue
+            for pid, quantity in quantities.items():
+                remaining[pid] -= quantity
+            product_map = [
+                (products[pid], quantity)
+                for pid, quantity in zip(order.product_ids, order.quantities)
+            ]
+            accepted.append((index, users[order.user_id], product_map))
+
+        return errors, accepted, reserved
+
+    # Helper: why an order of a batch cannot be sold, None if it can
+    def _batch_order_error(
+        self, order: BatchSaleOrder, users: dict, products: dict
+    ) -> str | None:
+        if not order.product_ids:
+            return "Order has no products"
+        if len(order.product_ids) != len(order.quantities):
+            return "Number of product IDs must match number of quantities"
+        if any(
+            quantity <= 0 or not self.type_adapter.validate_quantity(quantity)
+            for quantity in order.quantities
+        ):
+            return "All quantities must be positive numbers"
+        if order.user_id not in users:
+            return f"User with ID {order.user_id} not found"
+        missing_ids = [pid for pid in order.product_ids if pid not in products]
+        if missing_ids:
+            return f"Products not found: {missing_ids}"
+        return None
+
+    # Helper: inserts the accepted orders of a batch and takes their stock in one
+    # transaction; returns (order id, final price) by batch index, or None after
+    # rolling back if a product no longer had the stock the batch was planned on
+    def _insert_batch(
+        self,
+        accepted: list[tuple[int, User, list[tuple[Product, int]]]],
+        reserved: dict[int, int],
+    ) -> dict[int, tuple[int, float]]:
+        try:
+            now = datetime.now()
+            rows = []
+            totals: dict[int, int] = {}
+            for _, user, product_map in accepted:
+                total_price = sum(
+                    product.price * quantity for product, quantity in product_map
+                )
+                if user.is_member:
+                    total_price *= 0.7  # 30% discount for members
+                rows.append(
+                    {"user_id": user.id, "date": now, "final_price": total_price}
+                )
+                for product, quantity in product_map:
+                    totals[product.id] = totals.get(product.id, 0) + quantity
+
+            orders = self.order_service.insert_orders(rows)
+            self.order_service.insert_order_lines(
+                [
+                    (order.id, product.id, quantity)
+                    for order, (_, _, product_map) in zip(orders, accepted)
                     for product, quantity in product_map
-                ],
+                ]
             )
-
+            updated = self.stock_service.sell_stock(totals, reserved)
+            if len(updated) != len(totals):
+                self.session.rollback()
+                return None
+            sales = [
+                (order, product_map)
+                for order, (_, _, product_map) in zip(orders, accepted)
+            ]
+            self._record_sales(sales)
+            self.session.commit()
         except Exception as e:
             self.session.rollback()
-            raise ValueError(f"Sale failed: {str(e)}")
+            raise ValueError(f"Batch sale failed: {str(e)}")
 
-    def get_available_products(self) -> list[dict]:
-        """Get all products that are in stock"""
-        try:
-            products = self.stock_service.get_all_products_in_stock()
-            return [
+        self._publish_sale([product_map for _, product_map in sales])
+        return {
+            index: (order.id, order.final_price)
+            for order, (index, _, _) in zip(orders, accepted)
+        }
+
+    def get_available_products(
+        self,
+        cursor: str | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        fields: str | None = None,
+    ) -> ProductPageResponse:
+        """Get one page of the products that are in stock"""
+        in_stock = self.catalog.filter(self.session, in_stock_only=True)
+        items, next_cursor = paginate_catalog(
+            self.catalog,
+            self.session,
+            in_stock,
+            tuple(ProductInStockResponse.model_fields),
+            fields,
+            cursor,
+            limit,
+        )
+        return ProductPageResponse(items=items, next_cursor=next_cursor)
+
+    def get_frequently_bought_together(
+        self, product_id: int, limit: int = 5
+    ) -> FrequentlyBoughtTogetherResponse:
+        """Get the products most often bought in the same order as product_id"""
+        if limit <= 0:
+            raise ValueError("Limit must be positive")
+
+        self.stock_service.get_product(product_id)
+        neighbours = self.co_purchase.neighbours(self.session, product_id, limit)
+        products = {
+            product.id: product
+            for product in self.stock_service.get_products(
+                [other_id for other_id, _ in neighbours]
+            )
+        }
+        return FrequentlyBoughtTogetherResponse(
+            product_id=product_id,
+            products=[
                 {
-                    "id": product.id,
-                    "name": product.name,
-                    "product_type": product.product_type,
-                    "price": product.price,
-                    "stock_quantity": product.stock_quantity,
-                    "min_stock_level": product.min_stock_level,
+                    "id": other_id,
+                    "name": products[other_id].name,
+                    "price": products[other_id].price,
+                    "stock_quantity": products[other_id].stock_quantity,
+                    "score": round(score, 4),
                 }
-                for product in products
-            ]
-        except Exception as e:
-            raise ValueError(f"Failed to get available products: {str(e)}")
+                for other_id, score in neighbours
+                if other_id in products
+            ],
+        )
+
+    # Helper: ledger movements and sales rollups of a sale, committed together
+    # with the order
+    def _record_sale(self, order: Order, product_map: list[tuple]) -> None:
+        self._record_sales([(order, product_map)])
+
+    # Helper: ledger movements and sales rollups of many sales, one executemany
+    # and one upsert per rollup table for all of them
+    def _record_sales(self, sales: list[tuple[Order, list[tuple]]]) -> None:
+        changes_by_order: dict[int, dict[int, int]] = {}
+        for order, product_map in sales:
+            changes = changes_by_order.setdefault(order.id, {})
+            for product, quantity in product_map:
+                changes[product.id] = changes.get(product.id, 0) - quantity
+        self.ledger_service.record_order_movements(changes_by_order, SALE)
+        self.analytics_service.record_orders(sales)
+
+    # Helper: one page of the order history matching the filters
+    def _orders_page(
+        self, cursor: str | None, limit: int, **filters
+    ) -> OrderHistoryResponse:
+        limit = validate_page_size(limit)
+        orders = self.order_service.get_orders_page(
+            decode_date_cursor(cursor), limit + 1, **filters
+        )
+        orders, next_cursor = split_page(
+            orders, limit, lambda order: encode_date_cursor(order.date, order.id)
+        )
+        # product names come from the catalog snapshot instead of the database
+        product_ids = {
+            line.product_id for order in orders for line in order.order_products
+        }
+        names = {
+            row.id: row.name
+            for row in self.catalog.get_rows(
+                self.session, bitmap_from_ids(list(product_ids)), order_by_name=False
+            )
+        }
+        items = [
+            OrderHistoryItem(
+                id=order.id,
+                user_id=order.user_id,
+                date=order.date,
+                final_price=order.final_price,
+                lines=[
+                    OrderLineItem(
+                        product_id=line.product_id,
+                        product_name=names.get(line.product_id),
+                        quantity=line.quantity,
+                    )
+                    for line in order.order_products
+                ],
+            )
+            for order in orders
+        ]
+        return OrderHistoryResponse(items=items, next_cursor=next_cursor)
+
+    def get_orders(
+        self,
+        start: date | None = None,
+        end: date | None = None,
+        cursor: str | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> OrderHistoryResponse:
+        """Get one page of the orders placed between start and end (inclusive)"""
+        if start is not None and end is not None and start > end:
+            raise ValueError("Start date cannot be after end date")
+        return self._orders_page(
+            cursor,
+            limit,
+            start=datetime.combine(start, time.min) if start else None,
+            end=datetime.combine(end + timedelta(days=1), time.min) if end else None,
+        )
+
+    def get_user_orders(
+        self, user_id: int, cursor: str | None = None, limit: int = DEFAULT_PAGE_SIZE
+    ) -> OrderHistoryResponse:
+        """Get one page of the orders of a user"""
+        if self.session.get(User, user_id) is None:
+            raise ValueError(f"User with ID {user_id} not found")
+        return self._orders_page(cursor, limit, user_id=user_id)
+
+    def get_product_orders(
+        self,
+        product_id: int,
+        cursor: str | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> OrderHistoryResponse:
+        """Get one page of the orders that include a product"""
+        self.stock_service.get_product(product_id)
+        return self._orders_page(cursor, limit, product_id=product_id)
 
     def _generate_simple_invoice(
         self, order: Order, product_map: list[tuple], user: User
@@ -176,45 +821,19 @@ class SalesUseCase:
 
     # Keep the old method for backward compatibility
     def create_order(self, input) -> str:
-        # This is kept for backward compatibility but simplified
+        # This is kept for backward compatibility but shares the sale path
         try:
             user = self.setup_service.get_user(input.user_id, input.name)
-            products = self.order_service.get_products(
-                [p.product_id for p in input.products]
+            product_map = self._product_map(
+                [p.product_id for p in input.products],
+                [p.quantity for p in input.products],
             )
-
-            order = Order(user_id=user.id, date=datetime.now())
-            self.session.add(order)
-            self.session.flush()
-
-            product_map = []
-            for product, input_product in zip(products, input.products):
-                if product.stock_quantity < input_product.quantity:
-                    raise ValueError(
-                        f"Insufficient stock for product ID {product.id} '{product.name}'. Available: {product.stock_quantity}, requested: {input_product.quantity}"
-                    )
-
-                order_product = OrderProduct(
-                    order_id=order.id,
-                    product_id=product.id,
-                    quantity=input_product.quantity,
-                )
-                self.session.add(order_product)
-
-                product.stock_quantity -= input_product.quantity
-                self.session.add(product)
-
-                product_map.append((product, input_product.quantity))
-
-            total_price = sum(product.price * qty for product, qty in product_map)
-            if user.is_member:
-                total_price *= 0.7
-
-            order.final_price = total_price
-            self.session.commit()
-
-            return self._generate_simple_invoice(order, product_map, user)
+            self._check_stock(product_map, None)
+            result = self._sell(user, product_map)
 
         except Exception as e:
             self.session.rollback()
             raise ValueError(f"Order creation failed: {str(e)}")
+
+        self._publish_sale([product_map])
+        return result.invoice
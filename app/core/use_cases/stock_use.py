@@ -1,8 +1,32 @@
+import heapq
+import math
+from datetime import datetime, timedelta
 from sqlmodel import Session
 from app.core.services.stock_service import StockService
 from app.core.services.tag_service import TagService
-from app.models import Product
+from app.core.services.forecast_service import ForecastService, VELOCITY_WINDOW_DAYS
+from app.core.services.ledger_service import (
+    StockLedgerService,
+    ADJUSTMENT,
+    INITIAL_STOCK,
+    RESTOCK,
+)
+from app.core.services.reservation_service import (
+    ReservationService,
+    DEFAULT_RESERVATION_TTL_SECONDS,
+    MAX_RESERVATION_TTL_SECONDS,
+)
+from app.models import Product, User
 from app.core.ports.type_port import TypePort
+from app.core.cache.catalog import CatalogSnapshot, catalog_snapshot
+from app.core.cache.reservations import ReservationBook, reservation_book
+from app.core.alerts import AlertSubscription, StockAlertHub, stock_alert_hub
+from app.core.cache.tag_index import bitmap_from_ids
+from app.core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    paginate_catalog,
+    validate_page_size,
+)
 from app.dtos import (
     RestockInput,
     SetMinStockInput,
@@ -10,17 +34,58 @@ from app.dtos import (
     UpdateProductInput,
     DeleteProductInput,
     StockStatusResponse,
-    LowStockProductResponse,
-    OutOfStockProductResponse,
+    StockAsOfResponse,
+    ReorderSuggestion,
+    ReorderReportResponse,
     SetMinStockResponse,
     RestockResponse,
     CreateProductResponse,
     UpdateProductResponse,
     DeleteProductResponse,
     ProductInStockResponse,
+    ProductPageResponse,
+    BatchRestockInput,
+    BatchSetMinStockInput,
+    BatchStockItemResult,
+    BatchStockResponse,
+    ReserveStockInput,
+    ReservationItem,
+    ReservationResponse,
+    CartReservationsResponse,
 )
 
 
+# fields selectable on the low and out of stock listings
+STOCK_LEVEL_FIELDS = ("id", "name", "current_stock", "min_stock_level")
+
+# fields selectable on the in stock listing
+IN_STOCK_FIELDS = tuple(ProductInStockResponse.model_fields)
+
+# reorder report defaults: days a supplier takes to deliver, and days of sales a
+# reorder should cover once it arrives
+DEFAULT_LEAD_TIME_DAYS = 7
+DEFAULT_COVERAGE_DAYS = 30
+MAX_VELOCITY_WINDOW_DAYS = 365
+
+
+# validates a new product using type functions; shared with the bulk import
+def validate_create_product_input(
+    type_adapter: TypePort, input: CreateProductInput
+) -> None:
+    if not type_adapter.validate_price(input.price):
+        raise ValueError("Price cannot be negative or exceed maximum value")
+    if not type_adapter.validate_quantity(input.stock_quantity):
+        raise ValueError("Stock quantity cannot be negative or exceed maximum value")
+    if not type_adapter.validate_quantity(input.min_stock_level):
+        raise ValueError(
+            "Minimum stock level cannot be negative or exceed maximum value"
+        )
+    if not type_adapter.validate_product_name(input.name):
+        raise ValueError("Product name is invalid or empty")
+    if not type_adapter.validate_product_name(input.product_type):
+        raise ValueError("Product type is invalid or empty")
+
+
 # use case for stock
 class StockUseCase:
     def __init__(
@@ -29,29 +94,28 @@ class StockUseCase:
         stock_service: StockService,
         tag_service: TagService,
         type_adapter: TypePort,
+        ledger_service: StockLedgerService,
+        forecast_service: ForecastService,
+        reservation_service: ReservationService,
+        catalog: CatalogSnapshot = catalog_snapshot,
+        stock_alerts: StockAlertHub = stock_alert_hub,
+        reservations: ReservationBook = reservation_book,
     ):
         self.session = session
         self.stock_service = stock_service
         self.tag_service = tag_service
         self.type_adapter = type_adapter
+        self.ledger_service = ledger_service
+        self.forecast_service = forecast_service
+        self.catalog = catalog
+        self.stock_alerts = stock_alerts
+        self.reservation_service = reservation_service
+        self.reservations = reservations
 
     # creates a new product
     def create_product(self, input: CreateProductInput) -> CreateProductResponse:
         # validates input data using type functions
-        if not self.type_adapter.validate_price(input.price):
-            raise ValueError("Price cannot be negative or exceed maximum value")
-        if not self.type_adapter.validate_quantity(input.stock_quantity):
-            raise ValueError(
-                "Stock quantity cannot be negative or exceed maximum value"
-            )
-        if not self.type_adapter.validate_quantity(input.min_stock_level):
-            raise ValueError(
-                "Minimum stock level cannot be negative or exceed maximum value"
-            )
-        if not self.type_adapter.validate_product_name(input.name):
-            raise ValueError("Product name is invalid or empty")
-        if not self.type_adapter.validate_product_name(input.product_type):
-            raise ValueError("Product type is invalid or empty")
+        validate_create_product_input(self.type_adapter, input)
 
         # creates the product
         product = Product(
@@ -62,10 +126,16 @@ class StockUseCase:
             min_stock_level=input.min_stock_level,
         )
 
-        # persists the product
+        # persists the product with its opening stock movement
         self.session.add(product)
         self.session.flush()
+        self.ledger_service.record_movements(
+            {product.id: product.stock_quantity}, INITIAL_STOCK
+        )
         self.session.commit()
+        self.tag_service.index.add_product(product.id)
+        self.catalog.refresh(self.session, [product.id])
+        self.tag_service.recommendations.refresh_products(self.session, [product.id])
 
         # adds tags to the product if provided
         tag_names = []
@@ -130,6 +200,9 @@ class StockUseCase:
             product.price = input.price
             updated_fields.append("price")
         if input.stock_quantity is not None:
+            self.ledger_service.record_movements(
+                {product.id: input.stock_quantity - product.stock_quantity}, ADJUSTMENT
+            )
             product.stock_quantity = input.stock_quantity
             updated_fields.append("stock quantity")
         if input.min_stock_level is not None:
@@ -141,25 +214,22 @@ class StockUseCase:
             # gets current tags (now returns List[str])
             current_tag_names = self.tag_service.get_product_tags(input.product_id)
 
-            # removes tags that are not in the new list
+            # removes tags that are not in the new list and adds the new ones
             tags_to_remove = [
                 tag_name
                 for tag_name in current_tag_names
                 if tag_name not in input.tag_names
             ]
-            if tags_to_remove:
-                self.tag_service.remove_tags_from_product(
-                    input.product_id, tags_to_remove
-                )
-
-            # adds new tags
             new_tags = [
                 tag_name
                 for tag_name in input.tag_names
                 if tag_name not in current_tag_names
             ]
-            if new_tags:
-                self.tag_service.add_tags_to_product(input.product_id, new_tags)
+            if tags_to_remove or new_tags:
+                # committed together with the product fields below
+                self.tag_service.bulk_update_product_tags(
+                    [input.product_id], new_tags, tags_to_remove, commit=False
+                )
 
             updated_fields.append("tags")
 
@@ -167,6 +237,8 @@ class StockUseCase:
         self.session.add(product)
         self.session.flush()
         self.session.commit()
+        self.stock_alerts.publish(self.catalog.refresh(self.session, [product.id]))
+        self.tag_service.recommendations.refresh_products(self.session, [product.id])
 
         # gets updated tag names
         tag_names = self.tag_service.get_product_tags(input.product_id)
@@ -218,93 +290,356 @@ class StockUseCase:
         # deletes the product
         self.session.delete(product)
         self.session.commit()
+        self.tag_service.index.remove_product(product_id)
+        self.tag_service.recommendations.remove_product(product_id)
+        self.catalog.refresh(self.session, [product_id])
 
         message = f"Successfully deleted product '{product_name}' (ID: {product_id})"
         return DeleteProductResponse(
             product_id=product_id, product_name=product_name, message=message
         )
 
-    # restocks inventory
-    def restock_product(self, input: RestockInput) -> RestockResponse:
-        # gets the product
-        product = self.stock_service.get_product(
-            input.product_id
-        )  # TODO remove _ from get_product
-
-        # validates input data using type functions
-        if not self.type_adapter.validate_quantity(input.quantity):
-            raise ValueError(
-                "Restock quantity cannot be negative or exceed maximum value"
-            )
+    # restocks many products in one transaction, one UPDATE per chunk
+    def restock_products(self, input: BatchRestockInput) -> BatchStockResponse:
+        if not input.items:
+            raise ValueError("Items cannot be empty")
+
+        # validates input data using type functions; deltas of repeated ids add up
+        errors = {}
+        deltas: dict[int, int] = {}
+        for index, item in enumerate(input.items):
+            if not self.type_adapter.validate_quantity(item.quantity):
+                errors[index] = (
+                    "Restock quantity cannot be negative or exceed maximum value"
+                )
+            else:
+                deltas[item.product_id] = deltas.get(item.product_id, 0) + item.quantity
+
+        updated = self.stock_service.restock_products(deltas)
+        found = {row[0] for row in updated}
+        self.ledger_service.record_movements(
+            {
+                product_id: delta
+                for product_id, delta in deltas.items()
+                if product_id in found
+            },
+            RESTOCK,
+        )
+        self.session.commit()
+        changes = self.catalog.refresh(self.session, [row[0] for row in updated])
+        self.stock_alerts.publish(changes)
+        self.tag_service.recommendations.refresh_products(self.session, list(found))
+
+        levels = {
+            product_id: (stock, min_level) for product_id, stock, min_level in updated
+        }
+        return self._batch_response(
+            input.items,
+            errors,
+            levels,
+            "restocked",
+            lambda item: (
+                f"Successfully restocked {item.quantity} units of product {item.product_id}"
+            ),
+        )
 
-        # updates stock
-        product.stock_quantity += input.quantity
+    # sets many minimum stock levels in one transaction, one UPDATE per chunk
+    def set_min_stock_levels(self, input: BatchSetMinStockInput) -> BatchStockResponse:
+        if not input.items:
+            raise ValueError("Items cannot be empty")
+
+        # validates input data using type functions; the last level of an id wins
+        errors = {}
+        min_levels: dict[int, int] = {}
+        for index, item in enumerate(input.items):
+            if not self.type_adapter.validate_quantity(item.min_level):
+                errors[index] = (
+                    "Minimum stock level cannot be negative or exceed maximum value"
+                )
+            else:
+                min_levels[item.product_id] = item.min_level
 
-        # persists changes
-        self.session.add(product)
-        self.session.flush()
+        updated = self.stock_service.set_min_stock_levels(min_levels)
         self.session.commit()
+        changes = self.catalog.refresh(self.session, [row[0] for row in updated])
+        self.stock_alerts.publish(changes)
+
+        levels = {
+            product_id: (stock, min_level) for product_id, stock, min_level in updated
+        }
+        return self._batch_response(
+            input.items,
+            errors,
+            levels,
+            "updated",
+            lambda item: (
+                f"Successfully set min stock level to {item.min_level} for product {item.product_id}"
+            ),
+        )
 
-        message = f"Successfully restocked {input.quantity} units of product {input.product_id}"
-        return RestockResponse(message=message)
+    # Helper: per-item results of a batch stock update, in input order
+    def _batch_response(
+        self,
+        items: list,
+        errors: dict[int, str],
+        levels: dict[int, tuple[int, int]],
+        action: str,
+        success_message,
+    ) -> BatchStockResponse:
+        results = []
+        for index, item in enumerate(items):
+            if index in errors:
+                result = BatchStockItemResult(
+                    product_id=item.product_id, success=False, message=errors[index]
+                )
+            elif item.product_id not in levels:
+                result = BatchStockItemResult(
+                    product_id=item.product_id,
+                    success=False,
+                    message=f"Product with id {item.product_id} not found",
+                )
+            else:
+                stock_quantity, min_stock_level = levels[item.product_id]
+                result = BatchStockItemResult(
+                    product_id=item.product_id,
+                    success=True,
+                    stock_quantity=stock_quantity,
+                    min_stock_level=min_stock_level,
+                    message=success_message(item),
+                )
+            results.append(result)
+
+        updated_count = sum(result.success for result in results)
+        failed_count = len(results) - updated_count
+        return BatchStockResponse(
+            updated_count=updated_count,
+            failed_count=failed_count,
+            results=results,
+            message=f"{updated_count} items {action}, {failed_count} failed",
+        )
+
+    # restocks inventory
+    def restock_product(self, input: RestockInput) -> RestockResponse:
+        result = self.restock_products(BatchRestockInput(items=[input])).results[0]
+        if not result.success:
+            raise ValueError(result.message)
+        return RestockResponse(message=result.message)
 
     # sets minimum stock level
     def set_min_stock_level(self, input: SetMinStockInput) -> SetMinStockResponse:
-        # validates input data using type functions
-        if not self.type_adapter.validate_quantity(input.min_level):
-            raise ValueError(
-                "Minimum stock level cannot be negative or exceed maximum value"
-            )
+        batch = BatchSetMinStockInput(items=[input])
+        result = self.set_min_stock_levels(batch).results[0]
+        if not result.success:
+            raise ValueError(result.message)
+        return SetMinStockResponse(message=result.message)
+
+    # loads the catalog snapshot, which detects the stock status changes; it
+    # blocks on the database, so async callers run it in a worker thread
+    def prepare_stock_alerts(self) -> None:
+        self.catalog.load(self.session)
+
+    # subscribes to the stock status changes of every later stock write; must
+    # run on the event loop that consumes them
+    def subscribe_stock_alerts(self) -> AlertSubscription:
+        self.prepare_stock_alerts()
+        return self.stock_alerts.subscribe()
+
+    # returns products with stock below minimum, one page at a time; the set is
+    # maintained by the catalog snapshot on every stock write
+    def get_low_stock_products(
+        self,
+        cursor: str | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        fields: str | None = None,
+    ) -> ProductPageResponse:
+        low_stock = self.catalog.low_stock_products(self.session)
+        items, next_cursor = paginate_catalog(
+            self.catalog,
+            self.session,
+            low_stock,
+            STOCK_LEVEL_FIELDS,
+            fields,
+            cursor,
+            limit,
+        )
+        return ProductPageResponse(items=items, next_cursor=next_cursor)
 
-        self.stock_service.set_min_stock_level(input.product_id, input.min_level)
-        self.session.commit()
-        message = f"Successfully set min stock level to {input.min_level} for product {input.product_id}"
-        return SetMinStockResponse(message=message)
-
-    # returns products with stock below minimum
-    def get_low_stock_products(self) -> list[LowStockProductResponse]:
-        products = self.stock_service.get_low_stock_products()
-        return [
-            LowStockProductResponse(
-                id=product.id,
-                name=product.name,
-                current_stock=product.stock_quantity,
-                min_stock_level=product.min_stock_level,
-            )
-            for product in products
-        ]
-
-    # returns products with zero stock
-    def get_out_of_stock_products(self) -> list[OutOfStockProductResponse]:
-        products = self.stock_service.get_out_of_stock_products()
-        return [
-            OutOfStockProductResponse(
-                id=product.id,
-                name=product.name,
-                current_stock=product.stock_quantity,
-                min_stock_level=product.min_stock_level,
-            )
-            for product in products
-        ]
+    # returns products with zero stock, one page at a time
+    def get_out_of_stock_products(
+        self,
+        cursor: str | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        fields: str | None = None,
+    ) -> ProductPageResponse:
+        out_of_stock = self.catalog.out_of_stock_products(self.session)
+        items, next_cursor = paginate_catalog(
+            self.catalog,
+            self.session,
+            out_of_stock,
+            STOCK_LEVEL_FIELDS,
+            fields,
+            cursor,
+            limit,
+        )
+        return ProductPageResponse(items=items, next_cursor=next_cursor)
 
     # returns stock status
     def get_stock_status(self, product_id: int) -> StockStatusResponse:
         status = self.stock_service.get_stock_status(product_id)
         if status is None:
             raise ValueError(f"Product {product_id} not found")
-        return StockStatusResponse(**status)
-
-    # returns all products that have stock (quantity > 0)
-    def get_all_products_in_stock(self) -> list[ProductInStockResponse]:
-        products = self.stock_service.get_all_products_in_stock()
-        return [
-            ProductInStockResponse(
-                id=product.id,
-                name=product.name,
-                product_type=product.product_type,
-                price=product.price,
-                stock_quantity=product.stock_quantity,
-                min_stock_level=product.min_stock_level,
+        reserved = self.reservations.reserved(self.session, product_id)
+        return StockStatusResponse(
+            **status,
+            reserved_quantity=reserved,
+            available_quantity=max(status["current_stock"] - reserved, 0),
+        )
+
+    # holds units of a product for a cart until the TTL runs out, replacing the
+    # cart's previous reservation of the product; sales and other carts only
+    # see the stock left unreserved
+    def reserve_stock(self, input: ReserveStockInput) -> ReservationResponse:
+        if input.quantity <= 0 or not self.type_adapter.validate_quantity(
+            input.quantity
+        ):
+            raise ValueError(f"Invalid quantity: {input.quantity}")
+        ttl_seconds = input.ttl_seconds
+        if ttl_seconds is None:
+            ttl_seconds = DEFAULT_RESERVATION_TTL_SECONDS
+        if not 0 < ttl_seconds <= MAX_RESERVATION_TTL_SECONDS:
+            raise ValueError(
+                f"TTL must be between 1 and {MAX_RESERVATION_TTL_SECONDS} seconds"
+            )
+        if self.session.get(User, input.user_id) is None:
+            raise ValueError(f"User with ID {input.user_id} not found")
+        product = self.stock_service.get_product(input.product_id)
+        expires_at = datetime.now() + timedelta(seconds=ttl_seconds)
+
+        previous = self.reservations.reserve(
+            self.session,
+            input.cart_id,
+            input.user_id,
+            product.id,
+            input.quantity,
+            product.stock_quantity,
+            expires_at,
+        )
+        try:
+            self.reservation_service.save(
+                input.cart_id, input.user_id, product.id, input.quantity, expires_at
             )
-            for product in products
-        ]
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            self.reservations.restore(input.cart_id, product.id, previous)
+            raise
+
+        reserved = self.reservations.reserved(self.session, product.id)
+        return ReservationResponse(
+            cart_id=input.cart_id,
+            product_id=product.id,
+            quantity=input.quantity,
+            expires_at=expires_at,
+            available_quantity=max(product.stock_quantity - reserved, 0),
+        )
+
+    # returns the active reservations of a cart
+    def get_cart_reservations(self, cart_id: str) -> CartReservationsResponse:
+        holds = self.reservations.cart(self.session, cart_id)
+        return self._cart_reservations(cart_id, holds)
+
+    # releases every reservation of a cart; returns the released ones
+    def release_reservations(self, cart_id: str) -> CartReservationsResponse:
+        self.reservations.load(self.session)
+        self.reservation_service.delete(cart_id)
+        self.session.commit()
+        return self._cart_reservations(cart_id, self.reservations.release(cart_id))
+
+    # Helper: response listing the holds of a cart
+    def _cart_reservations(self, cart_id: str, holds: dict) -> CartReservationsResponse:
+        return CartReservationsResponse(
+            cart_id=cart_id,
+            items=[
+                ReservationItem(
+                    product_id=product_id,
+                    quantity=hold.quantity,
+                    expires_at=hold.expires_at,
+                )
+                for product_id, hold in sorted(holds.items())
+            ],
+        )
+
+    # returns the stock a product had at a past time, from the stock ledger
+    def get_stock_as_of(self, product_id: int, at: datetime) -> StockAsOfResponse:
+        product = self.stock_service.get_product(product_id)
+        return StockAsOfResponse(
+            product_id=product.id,
+            name=product.name,
+            at=at,
+            stock_quantity=self.ledger_service.stock_as_of(product, at),
+        )
+
+    # projects days until stockout from the recent sales velocity and suggests
+    # reorder points and quantities, most urgent products first
+    def get_reorder_report(
+        self,
+        window_days: int = VELOCITY_WINDOW_DAYS,
+        lead_time_days: int = DEFAULT_LEAD_TIME_DAYS,
+        coverage_days: int = DEFAULT_COVERAGE_DAYS,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> ReorderReportResponse:
+        if not 1 <= window_days <= MAX_VELOCITY_WINDOW_DAYS:
+            raise ValueError(
+                f"Window must be between 1 and {MAX_VELOCITY_WINDOW_DAYS} days"
+            )
+        if lead_time_days < 0 or coverage_days < 0:
+            raise ValueError("Lead time and coverage cannot be negative")
+        limit = validate_page_size(limit)
+
+        velocity = self.forecast_service.sales_velocity(window_days)
+        products = self.catalog.get_rows(
+            self.session, bitmap_from_ids(list(velocity)), order_by_name=False
+        )
+        suggestions = []
+        for product in products:
+            rate = velocity[product.id]
+            if rate <= 0:
+                continue
+            # units held by carts are as good as sold
+            reserved = self.reservations.reserved(self.session, product.id)
+            available = max(product.stock_quantity - reserved, 0)
+            target_stock = math.ceil(rate * (lead_time_days + coverage_days))
+            suggestions.append(
+                ReorderSuggestion(
+                    product_id=product.id,
+                    name=product.name,
+                    current_stock=product.stock_quantity,
+                    available_quantity=available,
+                    min_stock_level=product.min_stock_level,
+                    daily_velocity=round(rate, 4),
+                    days_until_stockout=round(available / rate, 2),
+                    suggested_min_stock_level=math.ceil(rate * lead_time_days),
+                    suggested_reorder_quantity=max(0, target_stock - available),
+                )
+            )
+        return ReorderReportResponse(
+            window_days=window_days,
+            lead_time_days=lead_time_days,
+            coverage_days=coverage_days,
+            products=heapq.nsmallest(
+                limit, suggestions, key=lambda item: item.days_until_stockout
+            ),
+        )
+
+    # returns products that have stock (quantity > 0), one page at a time
+    def get_all_products_in_stock(
+        self,
+        cursor: str | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        fields: str | None = None,
+    ) -> ProductPageResponse:
+        in_stock = self.catalog.filter(self.session, in_stock_only=True)
+        items, next_cursor = paginate_catalog(
+            self.catalog, self.session, in_stock, IN_STOCK_FIELDS, fields, cursor, limit
+        )
+        return ProductPageResponse(items=items, next_cursor=next_cursor)
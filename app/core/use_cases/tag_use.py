@@ -1,23 +1,44 @@
 from sqlmodel import Session
 from app.core.services.tag_service import TagService
+from app.core.scheduler import MaintenanceScheduler, maintenance_scheduler
+from app.core.jobs import TAG_CLEANUP_JOB
+from app.core.cache.catalog import CatalogSnapshot, catalog_snapshot
+from app.core.pagination import DEFAULT_PAGE_SIZE, paginate_catalog
 from app.dtos import (
     AddTagsToProductInput,
     RemoveTagsFromProductInput,
+    BulkProductTagsInput,
+    BulkProductTagsResponse,
     ProductTagsResponse,
     ProductsByTagResponse,
+    TagQueryResponse,
+    RelatedTagsResponse,
     AddFavoriteTagInput,
     RemoveFavoriteTagInput,
     UserFavoriteTagsResponse,
     RecommendedProductsResponse,
     AllTagsResponse,
     CleanupResponse,
+    MaintenanceJobResponse,
 )
 
 
+# fields selectable on the products-by-tag listing
+TAGGED_PRODUCT_FIELDS = ("id", "name", "product_type", "price", "stock_quantity")
+
+
 class TagUseCase:
-    def __init__(self, session: Session, tag_service: TagService):
+    def __init__(
+        self,
+        session: Session,
+        tag_service: TagService,
+        scheduler: MaintenanceScheduler = maintenance_scheduler,
+        catalog: CatalogSnapshot = catalog_snapshot,
+    ):
         self.session = session
         self.tag_service = tag_service
+        self.scheduler = scheduler
+        self.catalog = catalog
 
     # PRODUCT TAG OPERATIONS
 
@@ -48,30 +69,105 @@ class TagUseCase:
             product_id=input.product_id, tag_names=remaining_tags
         )
 
+    def bulk_update_product_tags(
+        self, input: BulkProductTagsInput
+    ) -> BulkProductTagsResponse:
+        # Validate input
+        if not input.product_ids:
+            raise ValueError("Product IDs cannot be empty")
+        if not input.add_tag_names and not input.remove_tag_names:
+            raise ValueError("Tag names to add or remove cannot both be empty")
+        if set(input.add_tag_names) & set(input.remove_tag_names):
+            raise ValueError("A tag cannot be added and removed at the same time")
+
+        # Call service methods directly - let exceptions bubble up
+        added_count, removed_count = self.tag_service.bulk_update_product_tags(
+            input.product_ids, input.add_tag_names, input.remove_tag_names
+        )
+
+        product_count = len(set(input.product_ids))
+        return BulkProductTagsResponse(
+            product_count=product_count,
+            added_count=added_count,
+            removed_count=removed_count,
+            message=f"Added {added_count} and removed {removed_count} tags across {product_count} products",
+        )
+
     def get_product_tags(self, product_id: int) -> ProductTagsResponse:
         # Call service methods directly - let exceptions bubble up
         tag_names = self.tag_service.get_product_tags(product_id)
         return ProductTagsResponse(product_id=product_id, tag_names=tag_names)
 
-    def get_products_by_tag(self, tag_name: str) -> ProductsByTagResponse:
+    def get_products_by_tag(
+        self,
+        tag_name: str,
+        cursor: str | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        fields: str | None = None,
+    ) -> ProductsByTagResponse:
         # Validate input
         if not tag_name or not tag_name.strip():
             raise ValueError("Tag name cannot be empty")
 
+        # Served from the tag index and the catalog snapshot, one page at a time
+        tag_id = self.tag_service.cache.get_id(self.session, tag_name.strip())
+        tagged = self.tag_service.index.get(self.session, tag_id)
+        product_list, next_cursor = paginate_catalog(
+            self.catalog,
+            self.session,
+            tagged,
+            TAGGED_PRODUCT_FIELDS,
+            fields,
+            cursor,
+            limit,
+        )
+
+        return ProductsByTagResponse(
+            tag_name=tag_name, products=product_list, next_cursor=next_cursor
+        )
+
+    def get_related_tags(self, tag_name: str, limit: int = 10) -> RelatedTagsResponse:
+        # Validate input
+        if not tag_name or not tag_name.strip():
+            raise ValueError("Tag name cannot be empty")
+        if limit <= 0:
+            raise ValueError("Limit must be positive")
+
         # Call service methods directly - let exceptions bubble up
-        products = self.tag_service.get_products_by_tag(tag_name.strip())
+        related = self.tag_service.get_related_tags(tag_name.strip(), limit)
+        return RelatedTagsResponse(
+            tag_name=tag_name,
+            related_tags=[{"name": name, "count": count} for name, count in related],
+        )
+
+    def query_products_by_tags(
+        self, expression: str, in_stock_only: bool = True, limit: int = 100
+    ) -> TagQueryResponse:
+        # Validate input
+        if not expression or not expression.strip():
+            raise ValueError("Tag expression cannot be empty")
+        if limit <= 0:
+            raise ValueError("Limit must be positive")
+        if limit > 1000:
+            limit = 1000  # Cap limit to prevent abuse
+
+        # Call service methods directly - let exceptions bubble up
+        products = self.tag_service.query_products_by_tags(
+            expression.strip(), in_stock_only, limit
+        )
         product_list = [
             {
                 "id": p.id,
                 "name": p.name,
-                "product_type": p.product_type,
+                "product_type": p.type,
+                "brand": p.brand,
                 "price": p.price,
                 "stock_quantity": p.stock_quantity,
             }
             for p in products
         ]
 
-        return ProductsByTagResponse(tag_name=tag_name, products=product_list)
+        return TagQueryResponse(expression=expression, products=product_list)
 
     # USER FAVORITE TAG OPERATIONS
 
@@ -134,11 +230,12 @@ class TagUseCase:
             {
                 "id": p.id,
                 "name": p.name,
-                "product_type": p.product_type,
+                "product_type": p.type,
                 "price": p.price,
                 "stock_quantity": p.stock_quantity,
+                "score": round(score, 4),
             }
-            for p in products
+            for p, score in products
         ]
 
         return RecommendedProductsResponse(user_id=user_id, products=product_list)
@@ -157,3 +254,12 @@ class TagUseCase:
             message=f"Successfully removed {removed_count} unused tags",
             removed_count=removed_count,
         )
+
+    def schedule_cleanup_unused_tags(self) -> MaintenanceJobResponse:
+        # Runs on the maintenance thread; the response reports the previous run
+        job = self.scheduler.enqueue(TAG_CLEANUP_JOB)
+        return MaintenanceJobResponse(**job.status())
+
+    def get_cleanup_status(self) -> MaintenanceJobResponse:
+        job = self.scheduler.get_job(TAG_CLEANUP_JOB)
+        return MaintenanceJobResponse(**job.status())
@@ -1,9 +1,107 @@
+from sqlalchemy import Engine, text
 from sqlmodel import create_engine, SQLModel, Session
 
 
 DATABASE_URL = "sqlite:///calitech.db"
 engine = create_engine(DATABASE_URL)
 
+# SQLite refuses statements with too many bound variables (999 before 3.32), so
+# IN lists are chunked; a statement binding several values per id takes
+# proportionally fewer ids per chunk
+MAX_IN_CLAUSE = 500
+
+# tags column of the search index for the product with id :product_id
+PRODUCT_SEARCH_TAGS_SQL = """
+    SELECT coalesce(group_concat(tag.name, ' '), '') FROM producttag
+    JOIN tag ON tag.id = producttag.tag_id
+    WHERE producttag.product_id = {product_id}
+"""
+
+# FTS5 index over product name, brand, type and tag names (rowid = product id),
+# kept in sync by triggers so every write path, ORM or bulk SQL, is covered.
+# Bulk loads may pause the insert triggers inside their write transaction
+# (product_search_sync.paused) and index the new products in one statement.
+PRODUCT_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE product_search USING fts5(
+        name, brand, type, tags,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TABLE product_search_sync (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        paused INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "INSERT INTO product_search_sync (id, paused) VALUES (1, 0)",
+    """
+    CREATE TRIGGER product_search_insert AFTER INSERT ON product
+    WHEN NOT (SELECT paused FROM product_search_sync) BEGIN
+        INSERT INTO product_search (rowid, name, brand, type, tags)
+        VALUES (new.id, new.name, new.brand, new.type, '');
+    END
+    """,
+    """
+    CREATE TRIGGER product_search_update AFTER UPDATE OF name, brand, type ON product
+    BEGIN
+        UPDATE product_search SET name = new.name, brand = new.brand, type = new.type
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER product_search_delete AFTER DELETE ON product BEGIN
+        DELETE FROM product_search WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER product_search_tag_insert AFTER INSERT ON producttag
+    WHEN NOT (SELECT paused FROM product_search_sync) BEGIN
+        UPDATE product_search SET tags = (
+            {PRODUCT_SEARCH_TAGS_SQL.format(product_id="new.product_id")}
+        ) WHERE rowid = new.product_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER product_search_tag_delete AFTER DELETE ON producttag BEGIN
+        UPDATE product_search SET tags = (
+            {PRODUCT_SEARCH_TAGS_SQL.format(product_id="old.product_id")}
+        ) WHERE rowid = old.product_id;
+    END
+    """,
+    # backfills products that existed before the index
+    f"""
+    INSERT INTO product_search (rowid, name, brand, type, tags)
+    SELECT product.id, product.name, product.brand, product.type, (
+        {PRODUCT_SEARCH_TAGS_SQL.format(product_id="product.id")}
+    )
+    FROM product
+    """,
+]
+
+# objects of older layouts of the search index, dropped before a rebuild
+PRODUCT_SEARCH_OBJECTS = [
+    ("TRIGGER", "product_search_insert"),
+    ("TRIGGER", "product_search_update"),
+    ("TRIGGER", "product_search_delete"),
+    ("TRIGGER", "product_search_tag_insert"),
+    ("TRIGGER", "product_search_tag_delete"),
+    ("TABLE", "product_search_sync"),
+    ("TABLE", "product_search"),
+]
+
+# tables of short-lived data whose older layouts lack a key column: (table,
+# column). Their rows would expire soon anyway, so such a table is dropped and
+# recreated instead of migrated.
+RECREATED_TABLES = [
+    # idempotency keys are scoped per user
+    ("idempotencykey", "user_id"),
+    # reservations record the user who holds them
+    ("stockreservation", "user_id"),
+]
+
+
 def get_db():
     with Session(engine) as session:
         try:
@@ -11,5 +109,29 @@ def get_db():
         finally:
             session.close()
 
-def init_database():
-    SQLModel.metadata.create_all(bind=engine)
\ No newline at end of file
+
+# the index is derived data: a missing or outdated one is rebuilt from scratch
+def init_search_index(bind: Engine = engine):
+    with bind.begin() as connection:
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'product_search_sync'")
+        ).first()
+        if not exists:
+            for kind, name in PRODUCT_SEARCH_OBJECTS:
+                connection.execute(text(f"DROP {kind} IF EXISTS {name}"))
+            for statement in PRODUCT_SEARCH_DDL:
+                connection.execute(text(statement))
+
+
+def init_database(bind: Engine = engine):
+    with bind.begin() as connection:
+        for table, column in RECREATED_TABLES:
+            columns = connection.execute(text(f"PRAGMA table_info({table})")).all()
+            if columns and column not in {row.name for row in columns}:
+                connection.execute(text(f"DROP TABLE {table}"))
+    SQLModel.metadata.create_all(bind=bind)
+    # create_all skips existing tables, so indexes added later are created here
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+    init_search_index(bind)
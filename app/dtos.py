@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import Optional
+from datetime import date, datetime
 
 
 # STOCK DTOs
@@ -46,6 +47,15 @@ class StockStatusResponse(BaseModel):
     min_stock_level: int
     is_low_stock: bool
     is_out_of_stock: bool
+    reserved_quantity: int = 0
+    available_quantity: int = 0  # stock minus the units reserved for carts
+
+
+class StockAsOfResponse(BaseModel):
+    product_id: int
+    name: str
+    at: datetime
+    stock_quantity: int
 
 
 class LowStockProductResponse(BaseModel):
@@ -70,6 +80,29 @@ class RestockResponse(BaseModel):
     message: str
 
 
+class BatchRestockInput(BaseModel):
+    items: list[RestockInput]
+
+
+class BatchSetMinStockInput(BaseModel):
+    items: list[SetMinStockInput]
+
+
+class BatchStockItemResult(BaseModel):
+    product_id: int
+    success: bool
+    stock_quantity: Optional[int] = None
+    min_stock_level: Optional[int] = None
+    message: str
+
+
+class BatchStockResponse(BaseModel):
+    updated_count: int
+    failed_count: int
+    results: list[BatchStockItemResult]  # in input order
+    message: str
+
+
 class CreateProductResponse(BaseModel):
     id: int
     name: str
@@ -107,6 +140,71 @@ class ProductInStockResponse(BaseModel):
     min_stock_level: int
 
 
+class ReorderSuggestion(BaseModel):
+    product_id: int
+    name: str
+    current_stock: int
+    available_quantity: int
+    min_stock_level: int
+    daily_velocity: float
+    days_until_stockout: float
+    suggested_min_stock_level: int
+    suggested_reorder_quantity: int
+
+
+# products closest to running out first
+class ReorderReportResponse(BaseModel):
+    window_days: int
+    lead_time_days: int
+    coverage_days: int
+    products: list[ReorderSuggestion]
+
+
+# one keyset-paginated page of products; pass next_cursor back to get the next page
+class ProductPageResponse(BaseModel):
+    items: list[dict]  # only the requested fields
+    next_cursor: Optional[str] = None
+
+
+class ReserveStockInput(BaseModel):
+    cart_id: str = Field(..., min_length=1, max_length=255)
+    user_id: int  # the cart's owner; only they may add to or check it out
+    product_id: int
+    quantity: int
+    ttl_seconds: Optional[int] = None  # default reservation TTL if omitted
+
+
+class ReservationItem(BaseModel):
+    product_id: int
+    quantity: int
+    expires_at: datetime
+
+
+class ReservationResponse(BaseModel):
+    cart_id: str
+    product_id: int
+    quantity: int
+    expires_at: datetime
+    available_quantity: int  # left for other carts and sales
+
+
+class CartReservationsResponse(BaseModel):
+    cart_id: str
+    items: list[ReservationItem]
+
+
+class ImportRowError(BaseModel):
+    row: int  # 1-based position of the record in the input, header excluded
+    error: str
+
+
+class ImportProductsResponse(BaseModel):
+    imported_count: int
+    failed_count: int
+    errors: list[ImportRowError]
+    message: str
+
+
 # TAG DTOs
 
 
@@ -120,6 +218,19 @@ class RemoveTagsFromProductInput(BaseModel):
     tag_names: list[str]
 
 
+class BulkProductTagsInput(BaseModel):
+    product_ids: list[int]
+    add_tag_names: list[str] = []
+    remove_tag_names: list[str] = []
+
+
+class BulkProductTagsResponse(BaseModel):
+    product_count: int
+    added_count: int
+    removed_count: int
+    message: str
+
+
 class ProductTagsResponse(BaseModel):
     product_id: int
     tag_names: list[str]
@@ -128,6 +239,17 @@ class ProductTagsResponse(BaseModel):
 class ProductsByTagResponse(BaseModel):
     tag_name: str
     products: list[dict]  # Simplified product info
+    next_cursor: Optional[str] = None
+
+
+class RelatedTagsResponse(BaseModel):
+    tag_name: str
+    related_tags: list[dict]  # tag name and co-occurrence count
+
+
+class TagQueryResponse(BaseModel):
+    expression: str
+    products: list[dict]  # Simplified product info
 
 
 class AddFavoriteTagInput(BaseModel):
@@ -159,6 +281,46 @@ class CleanupResponse(BaseModel):
     removed_count: int
 
 
+class MaintenanceJobResponse(BaseModel):
+    name: str
+    interval_seconds: float
+    queued: bool
+    running: bool
+    last_started_at: Optional[datetime] = None
+    last_duration_seconds: Optional[float] = None
+    last_result: Optional[int] = None
+    last_error: Optional[str] = None
+
+
+# CATALOG DTOs
+
+
+class FacetCountsResponse(BaseModel):
+    total: int
+    tags: dict[str, int]
+    brands: dict[str, int]
+    types: dict[str, int]
+
+
+class SearchResultItem(BaseModel):
+    id: int
+    name: str
+    brand: str
+    product_type: str
+    price: float
+    stock_quantity: int
+    highlighted_name: str
+    score: float
+
+
+class SearchResponse(BaseModel):
+    query: str
+    total: int
+    limit: int
+    offset: int
+    results: list[SearchResultItem]
+
+
 # SALES DTOs
 
 
@@ -177,6 +339,65 @@ class SimpleSaleRequest(BaseModel):
         }
 
 
+class CreateCartRequest(BaseModel):
+    user_id: int
+
+
+class CartItemRequest(BaseModel):
+    product_id: int
+    quantity: int = 1
+
+
+class CartCheckoutRequest(BaseModel):
+    user_id: int
+
+
+class CartLineQuote(BaseModel):
+    product_id: int
+    name: Optional[str] = None
+    quantity: int
+    unit_price: float
+    line_total: float
+
+
+# running totals of a server-side cart; the member discount is already applied
+class CartQuoteResponse(BaseModel):
+    cart_id: str
+    user_id: int
+    is_member: bool
+    lines: list[CartLineQuote]
+    item_count: int
+    subtotal: float
+    discount: float
+    total: float
+
+
+class BatchSaleOrder(BaseModel):
+    user_id: int
+    product_ids: list[int]
+    quantities: list[int]
+
+
+class BatchSaleInput(BaseModel):
+    orders: list[BatchSaleOrder]
+    all_or_nothing: bool = True  # False creates the orders that can be sold
+
+
+class BatchSaleOrderResult(BaseModel):
+    user_id: int
+    success: bool
+    order_id: Optional[int] = None
+    total_price: Optional[float] = None
+    message: str
+
+
+class BatchSaleResponse(BaseModel):
+    created_count: int
+    failed_count: int
+    results: list[BatchSaleOrderResult]  # in input order
+    message: str
+
+
 class SaleResponse(BaseModel):
     order_id: int
     user_id: int
@@ -193,6 +414,75 @@ class SaleResult(BaseModel):
     products_sold: list[dict]
 
 
+class OrderLineItem(BaseModel):
+    product_id: int
+    product_name: Optional[str] = None
+    quantity: int
+
+
+class OrderHistoryItem(BaseModel):
+    id: int
+    user_id: int
+    date: datetime
+    final_price: Optional[float] = None
+    lines: list[OrderLineItem]
+
+
+# one keyset-paginated page of orders, newest first
+class OrderHistoryResponse(BaseModel):
+    items: list[OrderHistoryItem]
+    next_cursor: Optional[str] = None
+
+
+class FrequentlyBoughtTogetherResponse(BaseModel):
+    product_id: int
+    products: list[dict]  # Simplified product info
+
+
+# ANALYTICS DTOs
+
+
+class DailySalesItem(BaseModel):
+    day: date
+    order_count: int
+    units: int
+    revenue: float
+
+
+class DailySalesResponse(BaseModel):
+    start: date
+    end: date
+    order_count: int
+    units: int
+    revenue: float
+    days: list[DailySalesItem]
+
+
+class ProductSalesItem(BaseModel):
+    product_id: int
+    name: str
+    units: int
+    revenue: float
+
+
+class TopProductsResponse(BaseModel):
+    start: date
+    end: date
+    products: list[ProductSalesItem]
+
+
+class BrandSalesItem(BaseModel):
+    brand: str
+    units: int
+    revenue: float
+
+
+class BrandSalesResponse(BaseModel):
+    start: date
+    end: date
+    brands: list[BrandSalesItem]
+
+
 # CHAT DTOs
 
 
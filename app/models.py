@@ -1,5 +1,5 @@
-from sqlmodel import SQLModel, Field, Relationship
-from datetime import datetime
+from sqlmodel import SQLModel, Field, Relationship, Index
+from datetime import date, datetime
 
 
 # tag
@@ -36,8 +36,13 @@ class UserFavoriteTag(SQLModel, table=True):
 
 # order products
 class OrderProduct(SQLModel, table=True):
+    # order history by product walks (product_id, order_id) without the table
+    __table_args__ = (
+        Index("ix_orderproduct_product_id_order_id", "product_id", "order_id"),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
-    order_id: int = Field(default=None, foreign_key="order.id")
+    order_id: int = Field(default=None, foreign_key="order.id", index=True)
     product_id: int = Field(default=None, foreign_key="product.id")
     quantity: int = Field(default=0)
 
@@ -47,9 +52,11 @@ class OrderProduct(SQLModel, table=True):
 
 # product tags (many-to-many relationship)
 class ProductTag(SQLModel, table=True):
+    __table_args__ = (Index("ix_producttag_product_id_tag_id", "product_id", "tag_id"),)
+
     id: int | None = Field(default=None, primary_key=True)
     product_id: int = Field(foreign_key="product.id")
-    tag_id: int = Field(foreign_key="tag.id")
+    tag_id: int = Field(foreign_key="tag.id", index=True)
 
     # relationships
     product: "Product" = Relationship(back_populates="tags")
@@ -73,10 +80,86 @@ class Product(SQLModel, table=True):
 
 # order
 class Order(SQLModel, table=True):
+    # order history by user seeks (user_id, date, id) in the index; the date
+    # index alone serves date ranges, id being the rowid every index ends with
+    __table_args__ = (Index("ix_order_user_id_date", "user_id", "date"),)
+
     id: int | None = Field(default=None, primary_key=True)
     user_id: int = Field(default=None, foreign_key="user.id")
     final_price: float | None = Field(default=None)
-    date: datetime = Field(default=datetime.now())
+    date: datetime = Field(default=datetime.now(), index=True)
 
     user: "User" = Relationship(back_populates="orders")
     order_products: list["OrderProduct"] = Relationship(back_populates="order")
+
+
+# stock movements (append-only ledger of every stock change, written in the
+# same transaction as the change)
+class StockMovement(SQLModel, table=True):
+    __table_args__ = (Index("ix_stockmovement_product_id_id", "product_id", "id"),)
+
+    id: int | None = Field(default=None, primary_key=True)
+    product_id: int = Field(foreign_key="product.id")
+    quantity_change: int = Field(default=0)
+    reason: str = Field(default="")
+    order_id: int | None = Field(default=None, foreign_key="order.id")
+    created_at: datetime = Field(default_factory=datetime.now, index=True)
+
+
+# stock snapshots (stock of a product once every movement up to movement_id
+# was applied)
+class StockSnapshot(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_stocksnapshot_product_id_taken_at", "product_id", "taken_at"),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    product_id: int = Field(foreign_key="product.id")
+    stock_quantity: int = Field(default=0)
+    movement_id: int = Field(default=0)
+    taken_at: datetime = Field(default_factory=datetime.now)
+
+
+# sales rollups (units and revenue per day, per day and product, per day and
+# brand), kept up to date with every order and rebuildable from the raw orders
+class DailySales(SQLModel, table=True):
+    day: date = Field(primary_key=True)
+    order_count: int = Field(default=0)
+    units: int = Field(default=0)
+    revenue: float = Field(default=0.0)
+
+
+class DailyProductSales(SQLModel, table=True):
+    day: date = Field(primary_key=True)
+    product_id: int = Field(primary_key=True, foreign_key="product.id")
+    units: int = Field(default=0)
+    revenue: float = Field(default=0.0)
+
+
+class DailyBrandSales(SQLModel, table=True):
+    day: date = Field(primary_key=True)
+    brand: str = Field(primary_key=True)
+    units: int = Field(default=0)
+    revenue: float = Field(default=0.0)
+
+
+# idempotency keys of sale submissions (the request fingerprint and the stored
+# response, written in the sale transaction and purged once past their TTL)
+class IdempotencyKey(SQLModel, table=True):
+    # keys are chosen by clients, so each user has their own key space
+    user_id: int = Field(primary_key=True, foreign_key="user.id")
+    key: str = Field(primary_key=True, max_length=255)
+    request_hash: str = Field(default="")
+    response: str = Field(default="")
+    created_at: datetime = Field(default_factory=datetime.now, index=True)
+
+
+# stock held for a cart until expires_at; the in-memory reservation book is
+# rebuilt from the unexpired rows after a restart
+class StockReservation(SQLModel, table=True):
+    cart_id: str = Field(primary_key=True, max_length=255)
+    product_id: int = Field(primary_key=True, foreign_key="product.id")
+    user_id: int = Field(foreign_key="user.id")  # every hold of a cart is one user's
+    quantity: int = Field(default=0)
+    expires_at: datetime = Field(index=True)
+    created_at: datetime = Field(default_factory=datetime.now)
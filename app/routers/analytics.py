@@ -0,0 +1,53 @@
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException
+from app.core.use_cases.analytics_use import AnalyticsUseCase, DEFAULT_TOP_PRODUCTS
+from app.core.factories import get_analytics_use_case
+from app.dtos import DailySalesResponse, TopProductsResponse, BrandSalesResponse
+
+router = APIRouter(prefix="/analytics")
+
+
+# revenue, units and orders per day (defaults to the last 30 days)
+@router.get("/sales/daily")
+def get_daily_sales(
+    start: date | None = None,
+    end: date | None = None,
+    analytics_use_case: AnalyticsUseCase = Depends(get_analytics_use_case),
+) -> DailySalesResponse:
+    try:
+        return analytics_use_case.get_daily_sales(start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# best selling products by revenue
+@router.get("/sales/products")
+def get_top_products(
+    start: date | None = None,
+    end: date | None = None,
+    limit: int = DEFAULT_TOP_PRODUCTS,
+    analytics_use_case: AnalyticsUseCase = Depends(get_analytics_use_case),
+) -> TopProductsResponse:
+    try:
+        return analytics_use_case.get_top_products(start, end, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# sales per brand by revenue
+@router.get("/sales/brands")
+def get_brand_sales(
+    start: date | None = None,
+    end: date | None = None,
+    analytics_use_case: AnalyticsUseCase = Depends(get_analytics_use_case),
+) -> BrandSalesResponse:
+    try:
+        return analytics_use_case.get_brand_sales(start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.core.use_cases.catalog_use import CatalogUseCase
+from app.core.factories import get_catalog_use_case
+from app.dtos import FacetCountsResponse, SearchResponse
+
+router = APIRouter(prefix="/catalog")
+
+
+# counts per tag, brand and type for the currently filtered products
+@router.get("/facets", response_model=FacetCountsResponse)
+def get_facets(
+    tags: list[str] = Query(default=[]),
+    brand: str | None = None,
+    product_type: str | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    in_stock_only: bool = False,
+    catalog_use_case: CatalogUseCase = Depends(get_catalog_use_case),
+) -> FacetCountsResponse:
+    try:
+        return catalog_use_case.get_facets(
+            tags, brand, product_type, min_price, max_price, in_stock_only
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# full-text product search with prefix matching, BM25 ranking and highlighting
+@router.get("/search", response_model=SearchResponse)
+def search_products(
+    q: str,
+    limit: int = 20,
+    offset: int = 0,
+    catalog_use_case: CatalogUseCase = Depends(get_catalog_use_case),
+) -> SearchResponse:
+    try:
+        return catalog_use_case.search_products(q, limit, offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
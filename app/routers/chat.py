@@ -7,6 +7,7 @@ from sqlmodel import select
 from app.adapters.instructor_adapter import InstructorAdapter
 from app.adapters.jinja2_adapter import Jinja2Adapter
 from app.core.services.tag_service import TagService
+from app.core.cache.catalog import catalog_snapshot
 from app.core.workflows.intention_models import InfoIntention
 from app.dtos import ComboProductResponse, ProductInfoResponse
 
@@ -48,24 +49,22 @@ async def get_combo(brand: str = None, tag: str = None) -> list[ComboProductResp
 
     if brand:
         # Get products by brand that are in stock
-        products = list(
-            session.exec(
-                select(Product).where(
-                    Product.brand == brand, Product.stock_quantity > 0
-                )
-            ).all()
+        products = catalog_snapshot.get_rows(
+            session, catalog_snapshot.filter(session, brand=brand, in_stock_only=True)
         )
     elif tag:
         # Get products by tag that are in stock
         tag_service = TagService(session)
-        try:
-            all_products = tag_service.get_products_by_tag(tag)
-            # Filter for products in stock
-            products = [p for p in all_products if p.stock_quantity > 0]
-        except ValueError:
+        tag_id = tag_service.cache.get_id(session, tag)
+        if tag_id is None:
             # Tag doesn't exist, return empty list
             print(f"Warning: Tag '{tag}' not found in database")
             products = []
+        else:
+            in_stock = catalog_snapshot.filter(session, in_stock_only=True)
+            products = catalog_snapshot.get_rows(
+                session, in_stock & tag_service.index.get(session, tag_id)
+            )
     else:
         products = []
 
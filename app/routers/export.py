@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from app.core.use_cases.export_use import ExportUseCase
+from app.core.factories import get_export_use_case
+
+router = APIRouter(prefix="/export")
+
+
+def _attachment(
+    export_use_case: ExportUseCase, name: str, format: str, gzip: bool, body
+) -> StreamingResponse:
+    filename = export_use_case.filename(name, format, gzip)
+    return StreamingResponse(
+        body,
+        media_type=export_use_case.media_type(format, gzip),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# streams every product with its tags as NDJSON or CSV
+@router.get("/products")
+def export_products(
+    format: str = "ndjson",
+    gzip: bool = False,
+    export_use_case: ExportUseCase = Depends(get_export_use_case),
+) -> StreamingResponse:
+    try:
+        body = export_use_case.export_products(format, gzip)
+        return _attachment(export_use_case, "products", format, gzip, body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# streams every order with its lines as NDJSON or CSV
+@router.get("/orders")
+def export_orders(
+    format: str = "ndjson",
+    gzip: bool = False,
+    export_use_case: ExportUseCase = Depends(get_export_use_case),
+) -> StreamingResponse:
+    try:
+        body = export_use_case.export_orders(format, gzip)
+        return _attachment(export_use_case, "orders", format, gzip, body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,14 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from app.core.use_cases.sales_use import SalesUseCase
 from app.core.factories import get_sales_use_case
-from app.dtos import SimpleSaleRequest, SaleResponse
+from app.dtos import (
+    SimpleSaleRequest,
+    CartCheckoutRequest,
+    CreateCartRequest,
+    CartItemRequest,
+    CartQuoteResponse,
+    BatchSaleInput,
+    BatchSaleResponse,
+    SaleResponse,
+    FrequentlyBoughtTogetherResponse,
+    ProductPageResponse,
+    OrderHistoryResponse,
+)
+from app.core.pagination import DEFAULT_PAGE_SIZE
+from datetime import date
 
 router = APIRouter(prefix="/sale")
 
 
 @router.post("/", response_model=SaleResponse)
-async def sell_products(
+def sell_products(
     request: SimpleSaleRequest,
+    idempotency_key: str | None = Header(
+        default=None,
+        description="Retries with the same key replay the first response",
+    ),
     sales_use_case: SalesUseCase = Depends(get_sales_use_case),
 ):
     try:
@@ -43,7 +61,10 @@ async def sell_products(
 
         # Process the sale
         result = sales_use_case.simple_sale(
-            user_id=request.user_id, product_ids=product_ids, quantities=quantities
+            user_id=request.user_id,
+            product_ids=product_ids,
+            quantities=quantities,
+            idempotency_key=idempotency_key,
         )
 
         return result
@@ -54,14 +75,182 @@ async def sell_products(
         raise HTTPException(status_code=500, detail=f"Sale failed: {str(e)}")
 
 
+# Sell many orders in one transaction
+@router.post("/batch", response_model=BatchSaleResponse)
+def batch_sale(
+    request: BatchSaleInput,
+    sales_use_case: SalesUseCase = Depends(get_sales_use_case),
+):
+    """Sell many orders at once, all or nothing unless all_or_nothing is false"""
+    try:
+        return sales_use_case.batch_sale(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch sale failed: {str(e)}")
+
+
+# Open a server-side cart
+@router.post("/carts", response_model=CartQuoteResponse)
+def create_cart(
+    request: CreateCartRequest,
+    sales_use_case: SalesUseCase = Depends(get_sales_use_case),
+):
+    """Open an empty cart for a user"""
+    try:
+        return sales_use_case.create_cart(request.user_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Add units of a product to a cart
+@router.post("/carts/{cart_id}/items", response_model=CartQuoteResponse)
+def add_to_cart(
+    cart_id: str,
+    request: CartItemRequest,
+    sales_use_case: SalesUseCase = Depends(get_sales_use_case),
+):
+    """Add units of a product to a cart and get the new quote"""
+    try:
+        return sales_use_case.add_to_cart(cart_id, request.product_id, request.quantity)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Remove units of a product from a cart
+@router.delete("/carts/{cart_id}/items/{product_id}", response_model=CartQuoteResponse)
+def remove_from_cart(
+    cart_id: str,
+    product_id: int,
+    quantity: int | None = None,
+    sales_use_case: SalesUseCase = Depends(get_sales_use_case),
+):
+    """Remove units of a product (all of them without quantity) from a cart"""
+    try:
+        return sales_use_case.remove_from_cart(cart_id, product_id, quantity)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Price a cart
+@router.get("/carts/{cart_id}/quote", response_model=CartQuoteResponse)
+def get_cart_quote(
+    cart_id: str,
+    sales_use_case: SalesUseCase = Depends(get_sales_use_case),
+):
+    """Get the line totals, member discount and total of a cart"""
+    try:
+        return sales_use_case.get_cart_quote(cart_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Turn a cart, or the stock reserved for it, into an order
+@router.post("/carts/{cart_id}/checkout", response_model=SaleResponse)
+def checkout_cart(
+    cart_id: str,
+    request: CartCheckoutRequest,
+    sales_use_case: SalesUseCase = Depends(get_sales_use_case),
+):
+    """Sell a cart, or the units reserved for it, to a user"""
+    try:
+        return sales_use_case.checkout_cart(request.user_id, cart_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Checkout failed: {str(e)}")
+
+
 # Get available products for purchase
-@router.get("/products")
-async def get_available_products(
+@router.get("/products", response_model=ProductPageResponse)
+def get_available_products(
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    fields: str | None = None,
+    sales_use_case: SalesUseCase = Depends(get_sales_use_case),
+):
+    """Get one page of the products that are in stock for purchase"""
+    try:
+        return sales_use_case.get_available_products(cursor, limit, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Get products frequently bought together with a product
+@router.get(
+    "/products/{product_id}/bought-together",
+    response_model=FrequentlyBoughtTogetherResponse,
+)
+def get_frequently_bought_together(
+    product_id: int,
+    limit: int = 5,
+    sales_use_case: SalesUseCase = Depends(get_sales_use_case),
+):
+    """Get the products most often bought in the same order"""
+    try:
+        return sales_use_case.get_frequently_bought_together(product_id, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Get the order history, optionally within a date range
+@router.get("/orders", response_model=OrderHistoryResponse)
+def get_orders(
+    start: date | None = None,
+    end: date | None = None,
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    sales_use_case: SalesUseCase = Depends(get_sales_use_case),
+):
+    """Get one page of orders, newest first"""
+    try:
+        return sales_use_case.get_orders(start, end, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Get the order history of a user
+@router.get("/orders/users/{user_id}", response_model=OrderHistoryResponse)
+def get_user_orders(
+    user_id: int,
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    sales_use_case: SalesUseCase = Depends(get_sales_use_case),
+):
+    """Get one page of the orders of a user, newest first"""
+    try:
+        return sales_use_case.get_user_orders(user_id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Get the orders that include a product
+@router.get("/orders/products/{product_id}", response_model=OrderHistoryResponse)
+def get_product_orders(
+    product_id: int,
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
     sales_use_case: SalesUseCase = Depends(get_sales_use_case),
 ):
-    """Get all products that are in stock for purchase"""
+    """Get one page of the orders that include a product, newest first"""
     try:
-        return sales_use_case.get_available_products()
+        return sales_use_case.get_product_orders(product_id, cursor, limit)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -1,25 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException
+import tempfile
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from app.core.use_cases.stock_use import (
     StockUseCase,
     RestockInput,
     SetMinStockInput,
+    BatchRestockInput,
+    BatchSetMinStockInput,
+    BatchStockResponse,
     CreateProductInput,
     UpdateProductInput,
     DeleteProductInput,
     StockStatusResponse,
-    LowStockProductResponse,
-    OutOfStockProductResponse,
-    ProductInStockResponse,  # Add this import
+    StockAsOfResponse,
+    ReorderReportResponse,
+    ReserveStockInput,
+    ReservationResponse,
+    CartReservationsResponse,
+    ProductPageResponse,
     SetMinStockResponse,
     RestockResponse,
     CreateProductResponse,
     UpdateProductResponse,
     DeleteProductResponse,
 )
-from app.core.factories import get_stock_use_case
+from app.core.use_cases.import_use import ImportUseCase, ImportProductsResponse
+from app.core.factories import get_stock_use_case, get_import_use_case
+from app.core.pagination import DEFAULT_PAGE_SIZE
+from app.core.services.forecast_service import VELOCITY_WINDOW_DAYS
+from app.core.use_cases.stock_use import DEFAULT_LEAD_TIME_DAYS, DEFAULT_COVERAGE_DAYS
+from app.core.alerts import AlertSubscription, ALERT_HEARTBEAT_SECONDS, format_sse
 
 router = APIRouter(prefix="/stock")
 
+# uploads larger than this are spooled to disk while being imported
+IMPORT_SPOOL_SIZE = 8 * 1024 * 1024
+
 
 # creates a new product
 @router.post("/products")
@@ -35,6 +53,28 @@ def create_product(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# imports products in bulk from a CSV or NDJSON request body
+@router.post("/products/import")
+async def import_products(
+    request: Request,
+    format: str = "csv",
+    import_use_case: ImportUseCase = Depends(get_import_use_case),
+) -> ImportProductsResponse:
+    try:
+        with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_SIZE) as body:
+            async for chunk in request.stream():
+                body.write(chunk)
+            body.seek(0)
+            # the import itself blocks on the database, off the event loop
+            return await run_in_threadpool(
+                import_use_case.import_products, body, format
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # updates an existing product
 @router.put("/products/{product_id}")
 def update_product(
@@ -68,13 +108,50 @@ def delete_product(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Helper: server-sent events of a subscription, with keep-alive comments while idle
+async def _alert_events(subscription: AlertSubscription):
+    try:
+        while True:
+            event = await subscription.get(ALERT_HEARTBEAT_SECONDS)
+            if event is not None:
+                yield format_sse(event)
+            elif subscription.dropped:
+                return
+            else:
+                yield ": keep-alive\n\n"
+    finally:
+        subscription.close()
+
+
+# pushes an event whenever a product becomes low stock, out of stock or back in
+# stock; clients that fall too far behind are disconnected
+@router.get("/alerts/stream")
+async def stream_stock_alerts(
+    stock_use_case: StockUseCase = Depends(get_stock_use_case),
+) -> StreamingResponse:
+    try:
+        # a no-op once loaded; the first load runs off the event loop
+        await run_in_threadpool(stock_use_case.prepare_stock_alerts)
+        subscription = stock_use_case.subscribe_stock_alerts()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(
+        _alert_events(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # returns products with stock below minimum
 @router.get("/low-stock")
 def get_low_stock_products(
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    fields: str | None = None,
     stock_use_case: StockUseCase = Depends(get_stock_use_case),
-) -> list[LowStockProductResponse]:
+) -> ProductPageResponse:
     try:
-        return stock_use_case.get_low_stock_products()
+        return stock_use_case.get_low_stock_products(cursor, limit, fields)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -84,10 +161,13 @@ def get_low_stock_products(
 # returns products with zero stock
 @router.get("/out-of-stock")
 def get_out_of_stock_products(
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    fields: str | None = None,
     stock_use_case: StockUseCase = Depends(get_stock_use_case),
-) -> list[OutOfStockProductResponse]:
+) -> ProductPageResponse:
     try:
-        return stock_use_case.get_out_of_stock_products()
+        return stock_use_case.get_out_of_stock_products(cursor, limit, fields)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -121,6 +201,34 @@ def set_min_stock_level(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# restocks many products in one transaction
+@router.post("/restock/batch")
+def restock_products(
+    request: BatchRestockInput,
+    stock_use_case: StockUseCase = Depends(get_stock_use_case),
+) -> BatchStockResponse:
+    try:
+        return stock_use_case.restock_products(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# sets many minimum stock levels in one transaction
+@router.post("/set-min-level/batch")
+def set_min_stock_levels(
+    request: BatchSetMinStockInput,
+    stock_use_case: StockUseCase = Depends(get_stock_use_case),
+) -> BatchStockResponse:
+    try:
+        return stock_use_case.set_min_stock_levels(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # returns stock status
 @router.get("/status/{product_id}")
 def get_stock_status(
@@ -135,12 +243,91 @@ def get_stock_status(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# days until stockout and reorder suggestions from recent sales velocity
+@router.get("/reorder-report")
+def get_reorder_report(
+    window_days: int = VELOCITY_WINDOW_DAYS,
+    lead_time_days: int = DEFAULT_LEAD_TIME_DAYS,
+    coverage_days: int = DEFAULT_COVERAGE_DAYS,
+    limit: int = DEFAULT_PAGE_SIZE,
+    stock_use_case: StockUseCase = Depends(get_stock_use_case),
+) -> ReorderReportResponse:
+    try:
+        return stock_use_case.get_reorder_report(
+            window_days, lead_time_days, coverage_days, limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# returns the stock a product had at the given time
+@router.get("/history/{product_id}")
+def get_stock_as_of(
+    product_id: int,
+    at: datetime,
+    stock_use_case: StockUseCase = Depends(get_stock_use_case),
+) -> StockAsOfResponse:
+    try:
+        return stock_use_case.get_stock_as_of(product_id, at)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# reserves stock of a product for a cart until the TTL runs out
+@router.post("/reservations")
+def reserve_stock(
+    request: ReserveStockInput,
+    stock_use_case: StockUseCase = Depends(get_stock_use_case),
+) -> ReservationResponse:
+    try:
+        return stock_use_case.reserve_stock(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# returns the active reservations of a cart
+@router.get("/reservations/{cart_id}")
+def get_cart_reservations(
+    cart_id: str, stock_use_case: StockUseCase = Depends(get_stock_use_case)
+) -> CartReservationsResponse:
+    try:
+        return stock_use_case.get_cart_reservations(cart_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# releases every reservation of a cart
+@router.delete("/reservations/{cart_id}")
+def release_reservations(
+    cart_id: str, stock_use_case: StockUseCase = Depends(get_stock_use_case)
+) -> CartReservationsResponse:
+    try:
+        return stock_use_case.release_reservations(cart_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # gets all products in stock
-@router.get("/products/in-stock", response_model=list[ProductInStockResponse])
+@router.get("/products/in-stock", response_model=ProductPageResponse)
 def get_all_products_in_stock(
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    fields: str | None = None,
     stock_use_case: StockUseCase = Depends(get_stock_use_case),
-) -> list[ProductInStockResponse]:
+) -> ProductPageResponse:
     try:
-        return stock_use_case.get_all_products_in_stock()
+        return stock_use_case.get_all_products_in_stock(cursor, limit, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
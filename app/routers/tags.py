@@ -3,16 +3,21 @@ from app.core.use_cases.tag_use import (
     TagUseCase,
     AddTagsToProductInput,
     RemoveTagsFromProductInput,
+    BulkProductTagsInput,
+    BulkProductTagsResponse,
     ProductTagsResponse,
     AddFavoriteTagInput,
     RemoveFavoriteTagInput,
     UserFavoriteTagsResponse,
     RecommendedProductsResponse,
     ProductsByTagResponse,
+    TagQueryResponse,
+    RelatedTagsResponse,
     AllTagsResponse,
-    CleanupResponse,
+    MaintenanceJobResponse,
 )
 from app.core.factories import get_tag_use_case
+from app.core.pagination import DEFAULT_PAGE_SIZE
 
 router = APIRouter(prefix="/tags")
 
@@ -44,6 +49,18 @@ def remove_tags_from_product(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/products/bulk", response_model=BulkProductTagsResponse)
+def bulk_update_product_tags(
+    input: BulkProductTagsInput, tag_use_case: TagUseCase = Depends(get_tag_use_case)
+) -> BulkProductTagsResponse:
+    try:
+        return tag_use_case.bulk_update_product_tags(input)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/products", response_model=ProductTagsResponse)
 def get_product_tags(
     product_id: int, tag_use_case: TagUseCase = Depends(get_tag_use_case)
@@ -56,12 +73,45 @@ def get_product_tags(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/products", response_model=ProductsByTagResponse)
+@router.get("/products/by-tag", response_model=ProductsByTagResponse)
 def get_products_by_tag(
-    tag_name: str, tag_use_case: TagUseCase = Depends(get_tag_use_case)
+    tag_name: str,
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    fields: str | None = None,
+    tag_use_case: TagUseCase = Depends(get_tag_use_case),
 ) -> ProductsByTagResponse:
     try:
-        return tag_use_case.get_products_by_tag(tag_name)
+        return tag_use_case.get_products_by_tag(tag_name, cursor, limit, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/products/query", response_model=TagQueryResponse)
+def query_products_by_tags(
+    expression: str,
+    in_stock_only: bool = True,
+    limit: int = 100,
+    tag_use_case: TagUseCase = Depends(get_tag_use_case),
+) -> TagQueryResponse:
+    try:
+        return tag_use_case.query_products_by_tags(expression, in_stock_only, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/related", response_model=RelatedTagsResponse)
+def get_related_tags(
+    tag_name: str, limit: int = 10, tag_use_case: TagUseCase = Depends(get_tag_use_case)
+) -> RelatedTagsResponse:
+    try:
+        return tag_use_case.get_related_tags(tag_name, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -105,10 +155,14 @@ def get_user_favorite_tags(
 
 @router.get("/users/recommendations", response_model=RecommendedProductsResponse)
 def get_recommended_products(
-    limit: int = 10, tag_use_case: TagUseCase = Depends(get_tag_use_case)
+    user_id: int,
+    limit: int = 10,
+    tag_use_case: TagUseCase = Depends(get_tag_use_case),
 ) -> RecommendedProductsResponse:
     try:
-        return tag_use_case.get_recommended_products(limit)
+        return tag_use_case.get_recommended_products(user_id, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -126,11 +180,23 @@ def get_all_tags(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/cleanup", response_model=CleanupResponse)
+@router.post("/cleanup", response_model=MaintenanceJobResponse, status_code=202)
 def cleanup_unused_tags(
     tag_use_case: TagUseCase = Depends(get_tag_use_case),
-) -> CleanupResponse:
+) -> MaintenanceJobResponse:
     try:
-        return tag_use_case.cleanup_unused_tags()
+        return tag_use_case.schedule_cleanup_unused_tags()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/cleanup", response_model=MaintenanceJobResponse)
+def get_cleanup_status(
+    tag_use_case: TagUseCase = Depends(get_tag_use_case),
+) -> MaintenanceJobResponse:
+    try:
+        return tag_use_case.get_cleanup_status()
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,197 @@
+"""Measures order history page latency at increasing depths, keyset vs OFFSET.
+
+Usage: python -m benchmarks.bench_orders [order_line_count]
+"""
+
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, create_engine, select
+
+from app.adapters.type_adapter import TypeAdapter
+from app.database import init_database
+from app.models import User, Product, Order, OrderProduct
+from app.core.services.analytics_service import AnalyticsService
+from app.core.services.idempotency_service import IdempotencyService
+from app.core.services.reservation_service import ReservationService
+from app.core.services.ledger_service import StockLedgerService
+from app.core.services.order_service import OrderService
+from app.core.services.setup_service import SetupService
+from app.core.services.stock_service import StockService
+from app.core.use_cases.sales_use import SalesUseCase
+
+USER_COUNT = 10_000
+PRODUCT_COUNT = 100_000
+LINES_PER_ORDER = 4
+HISTORY_DAYS = 365
+PAGE_SIZE = 50
+# share of the orders and lines going to user 1 and product 1, so deep pages exist
+HOT_SHARE = 0.01
+DEPTHS = [1, 10, 100]
+REPEATS = 5
+
+
+def hot_or_random(count: int) -> int:
+    return 1 if random.random() < HOT_SHARE else random.randint(1, count)
+
+
+def populate(session: Session, line_count: int) -> None:
+    session.exec(
+        insert(User), params=[{"name": f"user {i}"} for i in range(USER_COUNT)]
+    )
+    session.exec(
+        insert(Product),
+        params=[
+            {"name": f"product {i}", "price": round(random.uniform(5, 500), 2)}
+            for i in range(PRODUCT_COUNT)
+        ],
+    )
+    order_count = line_count // LINES_PER_ORDER
+    started_at = datetime.now() - timedelta(days=HISTORY_DAYS)
+    step = timedelta(days=HISTORY_DAYS) / order_count
+    chunk_size = 50_000
+    for first in range(1, order_count + 1, chunk_size):
+        ids = range(first, min(first + chunk_size, order_count + 1))
+        session.exec(
+            insert(Order.__table__),
+            params=[
+                {
+                    "id": order_id,
+                    "user_id": hot_or_random(USER_COUNT),
+                    "date": started_at + step * order_id,
+                    "final_price": 1.0,
+                }
+                for order_id in ids
+            ],
+        )
+        session.exec(
+            insert(OrderProduct.__table__),
+            params=[
+                {
+                    "order_id": order_id,
+                    "product_id": hot_or_random(PRODUCT_COUNT),
+                    "quantity": 1,
+                }
+                for order_id in ids
+                for _ in range(LINES_PER_ORDER)
+            ],
+        )
+    session.commit()
+
+
+# median latency of fetching the page at each depth by following cursors
+def keyset_latencies(session: Session, fetch_page) -> list[float]:
+    latencies = []
+    cursor = None
+    for page in range(1, DEPTHS[-1] + 1):
+        if page in DEPTHS:
+            timings = []
+            for _ in range(REPEATS):
+                started = time.perf_counter()
+                result = fetch_page(cursor)
+                timings.append(time.perf_counter() - started)
+                session.expire_all()
+            latencies.append(statistics.median(timings) * 1000)
+        else:
+            result = fetch_page(cursor)
+        cursor = result.next_cursor
+        if cursor is None:
+            break
+    return latencies
+
+
+def offset_latencies(session: Session, condition) -> list[float]:
+    latencies = []
+    for page in DEPTHS:
+        statement = (
+            select(Order)
+            .options(selectinload(Order.order_products))
+            .where(condition)
+            .order_by(Order.date.desc(), Order.id.desc())
+            .offset((page - 1) * PAGE_SIZE)
+            .limit(PAGE_SIZE)
+        )
+        timings = []
+        for _ in range(REPEATS):
+            started = time.perf_counter()
+            session.exec(statement).all()
+            session.expire_all()
+            timings.append(time.perf_counter() - started)
+        latencies.append(statistics.median(timings) * 1000)
+    return latencies
+
+
+def main() -> None:
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    database = Path(tempfile.mkdtemp()) / "bench_orders.db"
+    engine = create_engine(f"sqlite:///{database}")
+    init_database(engine)
+
+    with Session(engine) as session:
+        started = time.perf_counter()
+        populate(session, line_count)
+        print(
+            f"populated {line_count} order lines in {time.perf_counter() - started:.1f}s"
+        )
+
+        sales_use_case = SalesUseCase(
+            session,
+            OrderService(session),
+            SetupService(session),
+            StockService(session),
+            TypeAdapter(),
+            StockLedgerService(session),
+            AnalyticsService(session),
+            IdempotencyService(session),
+            ReservationService(session),
+        )
+        user_id = product_id = 1
+        start = (datetime.now() - timedelta(days=30)).date()
+
+        scenarios = [
+            (
+                "by date range",
+                lambda cursor: sales_use_case.get_orders(
+                    start, None, cursor, PAGE_SIZE
+                ),
+                Order.date >= start,
+            ),
+            (
+                "by user",
+                lambda cursor: sales_use_case.get_user_orders(
+                    user_id, cursor, PAGE_SIZE
+                ),
+                Order.user_id == user_id,
+            ),
+            (
+                "by product",
+                lambda cursor: sales_use_case.get_product_orders(
+                    product_id, cursor, PAGE_SIZE
+                ),
+                Order.id.in_(
+                    select(OrderProduct.order_id).where(
+                        OrderProduct.product_id == product_id
+                    )
+                ),
+            ),
+        ]
+        header = " ".join(f"{f'page {depth}':>10}" for depth in DEPTHS)
+        print(f"{'lookup':<24} {header}")
+        for name, fetch_page, condition in scenarios:
+            for method, latencies in (
+                ("keyset", keyset_latencies(session, fetch_page)),
+                ("offset", offset_latencies(session, condition)),
+            ):
+                row = " ".join(f"{latency:>8.2f}ms" for latency in latencies)
+                print(f"{name + ' ' + method:<24} {row}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Measures the latency of one sale by number of order lines, for simple_sale
+and the legacy create_order.
+
+Usage: python -m benchmarks.bench_sales [repeats]
+"""
+
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from sqlalchemy import insert
+from sqlmodel import Session, create_engine
+
+from app.adapters.type_adapter import TypeAdapter
+from app.database import init_database
+from app.models import User, Product
+from app.core.services.analytics_service import AnalyticsService
+from app.core.services.idempotency_service import IdempotencyService
+from app.core.services.ledger_service import StockLedgerService
+from app.core.services.order_service import OrderService
+from app.core.services.reservation_service import ReservationService
+from app.core.services.setup_service import SetupService
+from app.core.services.stock_service import StockService
+from app.core.use_cases.sales_use import SalesUseCase
+
+LINE_COUNTS = [1, 10, 100, 1000]
+PRODUCT_COUNT = max(LINE_COUNTS)
+STOCK_PER_PRODUCT = 1_000_000
+
+
+def populate(session: Session) -> None:
+    session.exec(insert(User), params=[{"name": "bench user", "is_member": True}])
+    session.exec(
+        insert(Product),
+        params=[
+            {
+                "name": f"product {i}",
+                "brand": f"brand {i % 20}",
+                "price": 1.0 + i % 100,
+                "stock_quantity": STOCK_PER_PRODUCT,
+            }
+            for i in range(PRODUCT_COUNT)
+        ],
+    )
+    session.commit()
+
+
+# median seconds of sell(product_ids) over repeats runs
+def median_latency(sell, line_count: int, repeats: int) -> float:
+    product_ids = list(range(1, line_count + 1))
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        sell(product_ids)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    database = Path(tempfile.mkdtemp()) / "bench_sales.db"
+    engine = create_engine(f"sqlite:///{database}")
+    init_database(engine)
+
+    with Session(engine) as session:
+        populate(session)
+        sales_use_case = SalesUseCase(
+            session,
+            OrderService(session),
+            SetupService(session),
+            StockService(session),
+            TypeAdapter(),
+            StockLedgerService(session),
+            AnalyticsService(session),
+            IdempotencyService(session),
+            ReservationService(session),
+        )
+        methods = [
+            (
+                "simple_sale",
+                lambda product_ids: sales_use_case.simple_sale(
+                    1, product_ids, [1] * len(product_ids)
+                ),
+            ),
+            (
+                "create_order",
+                lambda product_ids: sales_use_case.create_order(
+                    SimpleNamespace(
+                        user_id=1,
+                        name=None,
+                        products=[
+                            SimpleNamespace(product_id=product_id, quantity=1)
+                            for product_id in product_ids
+                        ],
+                    )
+                ),
+            ),
+        ]
+        # warms up the catalog snapshot and the connection
+        methods[0][1]([1])
+
+        header = " ".join(f"{f'{count} lines':>12}" for count in LINE_COUNTS)
+        print(f"{'method':<14} {header}")
+        for name, sell in methods:
+            latencies = [
+                median_latency(sell, count, repeats) * 1000 for count in LINE_COUNTS
+            ]
+            row = " ".join(f"{latency:>10.2f}ms" for latency in latencies)
+            print(f"{name:<14} {row}")
+
+
+if __name__ == "__main__":
+    main()
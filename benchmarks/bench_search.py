@@ -0,0 +1,97 @@
+"""Compares FTS5 product search against LIKE scans on a generated catalog.
+
+Usage: python -m benchmarks.bench_search [product_count]
+"""
+
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import insert, text
+from sqlmodel import Session, create_engine, select, func
+
+from app.database import init_database
+from app.models import Product
+from app.core.services.search_service import SearchService
+
+BRANDS = ["Logitech", "Razer", "Corsair", "SteelSeries", "HyperX", "ASUS", "MSI"]
+TYPES = ["Mouse", "Keyboard", "Headset", "Monitor", "Webcam", "Microphone"]
+WORDS = ["Pro", "Ultra", "Wireless", "Gaming", "Silent", "Compact", "Elite", "Max"]
+QUERIES = ["wireless", "razer key", "gam", "elite headset"]
+REPEATS = 5
+
+
+def populate(session: Session, product_count: int) -> None:
+    chunk = []
+    for index in range(product_count):
+        brand = random.choice(BRANDS)
+        product_type = random.choice(TYPES)
+        words = " ".join(random.sample(WORDS, 2))
+        chunk.append(
+            {
+                "name": f"{brand} {words} {product_type} {index}",
+                "brand": brand,
+                "type": product_type,
+                "price": round(random.uniform(10, 500), 2),
+                "stock_quantity": random.randint(0, 50),
+            }
+        )
+        if len(chunk) == 10_000:
+            session.exec(insert(Product), params=chunk)
+            chunk = []
+    if chunk:
+        session.exec(insert(Product), params=chunk)
+    session.commit()
+
+
+def timed(func) -> tuple[float, object]:
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, result
+
+
+def like_search(session: Session, query: str, limit: int = 20):
+    conditions = [
+        (Product.name.like(f"%{term}%")) | (Product.brand.like(f"%{term}%"))
+        for term in query.split()
+    ]
+    count = session.exec(select(func.count(Product.id)).where(*conditions)).one()
+    rows = session.exec(
+        select(Product).where(*conditions).order_by(Product.name).limit(limit)
+    ).all()
+    return count, rows
+
+
+def main() -> None:
+    product_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    database = Path(tempfile.mkdtemp()) / "bench_search.db"
+    engine = create_engine(f"sqlite:///{database}")
+    init_database(engine)
+
+    with Session(engine) as session:
+        started = time.perf_counter()
+        populate(session, product_count)
+        print(
+            f"populated {product_count} products in {time.perf_counter() - started:.1f}s"
+        )
+        session.exec(
+            text("INSERT INTO product_search (product_search) VALUES ('optimize')")
+        )
+        session.commit()
+
+        search_service = SearchService(session)
+        print(f"{'query':<16} {'fts5 ms':>10} {'like ms':>10} {'matches':>10}")
+        for query in QUERIES:
+            fts_ms, (total, _) = timed(lambda: search_service.search_products(query))
+            like_ms, _ = timed(lambda: like_search(session, query))
+            print(f"{query:<16} {fts_ms:>10.2f} {like_ms:>10.2f} {total:>10}")
+
+
+if __name__ == "__main__":
+    main()
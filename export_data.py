@@ -0,0 +1,34 @@
+import argparse
+import sys
+from app.core.use_cases.export_use import ExportUseCase, EXPORT_FORMATS
+
+
+def export_data():
+    parser = argparse.ArgumentParser(
+        description="Stream a full dump of the products or the orders"
+    )
+    parser.add_argument("table", choices=["products", "orders"])
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    parser.add_argument("--gzip", action="store_true", help="gzip the output")
+    parser.add_argument(
+        "--output", "-o", help="file to write to (defaults to standard output)"
+    )
+    args = parser.parse_args()
+
+    export_use_case = ExportUseCase()
+    if args.table == "products":
+        chunks = export_use_case.export_products(args.format, args.gzip)
+    else:
+        chunks = export_use_case.export_orders(args.format, args.gzip)
+
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+
+
+if __name__ == "__main__":
+    export_data()
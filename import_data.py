@@ -0,0 +1,52 @@
+import argparse
+import sys
+from sqlmodel import Session
+from app.database import engine, init_database
+from app.adapters.type_adapter import TypeAdapter
+from app.core.services.stock_service import StockService
+from app.core.services.tag_service import TagService
+from app.core.services.search_service import SearchService
+from app.core.services.ledger_service import StockLedgerService
+from app.core.use_cases.import_use import (
+    ImportUseCase,
+    IMPORT_FORMATS,
+    IMPORT_BATCH_SIZE,
+)
+
+
+def import_data():
+    parser = argparse.ArgumentParser(
+        description="Bulk import products from a CSV or NDJSON file"
+    )
+    parser.add_argument("input", help="file to read from ('-' for standard input)")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, default="csv")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    init_database()
+    with Session(engine) as session:
+        import_use_case = ImportUseCase(
+            session=session,
+            stock_service=StockService(session=session),
+            tag_service=TagService(session=session),
+            search_service=SearchService(session=session),
+            type_adapter=TypeAdapter(),
+            ledger_service=StockLedgerService(session=session),
+        )
+        if args.input == "-":
+            result = import_use_case.import_products(
+                sys.stdin.buffer, args.format, args.batch_size
+            )
+        else:
+            with open(args.input, "rb") as stream:
+                result = import_use_case.import_products(
+                    stream, args.format, args.batch_size
+                )
+
+    for error in result.errors:
+        print(f"row {error.row}: {error.error}", file=sys.stderr)
+    print(result.message)
+
+
+if __name__ == "__main__":
+    import_data()
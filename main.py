@@ -1,13 +1,27 @@
 from fastapi import FastAPI
 from app.database import init_database
-from app.routers import sales, stock, tags, chat
+from app.core.jobs import register_maintenance_jobs
+from app.core.scheduler import maintenance_scheduler
+from app.routers import sales, stock, tags, chat, catalog, export, analytics
 
-app = FastAPI(on_startup=[init_database])
+
+def start_maintenance():
+    register_maintenance_jobs(maintenance_scheduler)
+    maintenance_scheduler.start()
+
+
+app = FastAPI(
+    on_startup=[init_database, start_maintenance],
+    on_shutdown=[maintenance_scheduler.stop],
+)
 
 app.include_router(sales.router)
 app.include_router(stock.router)
 app.include_router(tags.router)
 app.include_router(chat.router)
+app.include_router(catalog.router)
+app.include_router(export.router)
+app.include_router(analytics.router)
 
 @app.get("/")
 async def health_check():
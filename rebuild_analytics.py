@@ -0,0 +1,25 @@
+import argparse
+from sqlmodel import Session
+from app.database import engine, init_database
+from app.core.services.analytics_service import AnalyticsService
+from app.core.use_cases.analytics_use import AnalyticsUseCase
+
+
+def rebuild_analytics():
+    parser = argparse.ArgumentParser(
+        description="Recompute the sales rollup tables from the raw orders"
+    )
+    parser.parse_args()
+
+    init_database()
+    with Session(engine) as session:
+        analytics_use_case = AnalyticsUseCase(
+            session=session, analytics_service=AnalyticsService(session=session)
+        )
+        counts = analytics_use_case.rebuild()
+    for table, count in counts.items():
+        print(f"{table}: {count} rows")
+
+
+if __name__ == "__main__":
+    rebuild_analytics()
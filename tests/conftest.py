@@ -0,0 +1,132 @@
+import threading
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import Session, create_engine
+from app.database import get_db, init_database
+from app.models import Product, User
+from app.core.cache.carts import cart_store
+from app.core.cache.catalog import catalog_snapshot
+from app.core.cache.copurchase import co_purchase_index
+from app.core.cache.idempotency import idempotency_cache
+from app.core.cache.recommendations import recommendation_engine
+from app.core.cache.reservations import reservation_book
+from app.core.cache.tag_cache import tag_cache
+from app.core.cache.tag_cooccurrence import tag_cooccurrence
+from app.core.cache.tag_index import tag_index
+
+
+# process-wide caches start empty for every test, as after a restart
+PROCESS_CACHES = [
+    tag_cache,
+    tag_index,
+    tag_cooccurrence,
+    recommendation_engine,
+    catalog_snapshot,
+    co_purchase_index,
+    idempotency_cache,
+    reservation_book,
+    cart_store,
+]
+
+
+@pytest.fixture(autouse=True)
+def clear_process_caches():
+    for cache in PROCESS_CACHES:
+        cache.clear()
+    yield
+    for cache in PROCESS_CACHES:
+        cache.clear()
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    init_database(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session(engine):
+    with Session(engine) as session:
+        yield session
+
+
+# creates a committed product; fields default to an in-stock mouse
+@pytest.fixture
+def make_product(session):
+    def make(name: str = "Mouse", **fields) -> Product:
+        values = {
+            "type": "mouse",
+            "brand": "Acme",
+            "price": 10.0,
+            "stock_quantity": 10,
+            "min_stock_level": 2,
+        }
+        values.update(fields)
+        product = Product(name=name, **values)
+        session.add(product)
+        session.commit()
+        session.refresh(product)
+        return product
+
+    return make
+
+
+@pytest.fixture
+def make_user(session):
+    def make(name: str = "Ada", is_member: bool = False) -> User:
+        user = User(name=name, is_member=is_member)
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        return user
+
+    return make
+
+
+# serves one router over the test database, a session per request as in the app
+@pytest.fixture
+def make_client(engine):
+    def make(router: APIRouter) -> TestClient:
+        app = FastAPI()
+        app.include_router(router)
+
+        def test_db():
+            with Session(engine) as session:
+                yield session
+
+        app.dependency_overrides[get_db] = test_db
+        return TestClient(app)
+
+    return make
+
+
+class _Rows(list):
+    def all(self) -> list:
+        return list(self)
+
+
+# holds the nth read of a session, once its rows are fetched, until released;
+# lets a test commit a write while a cache is being loaded from that session
+@pytest.fixture
+def pause_read():
+    def pause(session: Session, nth: int = 1):
+        reached = threading.Event()
+        release = threading.Event()
+        read = session.exec
+        calls = []
+
+        def exec(statement, *args, **kwargs):
+            rows = _Rows(read(statement, *args, **kwargs).all())
+            calls.append(statement)
+            if len(calls) == nth:
+                reached.set()
+                release.wait(5)
+            return rows
+
+        session.exec = exec
+        return reached, release
+
+    return pause
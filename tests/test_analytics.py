@@ -0,0 +1,62 @@
+from datetime import date, timedelta
+import pytest
+from app.core.factories import get_analytics_use_case, get_sales_use_case
+
+
+@pytest.fixture
+def sales(session, make_product, make_user):
+    mouse = make_product("Mouse", brand="Logi", price=20.0)
+    pad = make_product("Pad", brand="Acme", price=5.0)
+    cable = make_product("Cable", brand="Acme", price=2.0)
+    sales_use_case = get_sales_use_case(session)
+    sales_use_case.simple_sale(make_user("Ada").id, [mouse.id, pad.id], [1, 2])
+    # members pay 70%, spread over the lines of the order
+    member = make_user("Bob", is_member=True)
+    sales_use_case.simple_sale(member.id, [mouse.id, cable.id], [2, 5])
+    with pytest.raises(ValueError):
+        sales_use_case.simple_sale(member.id, [pad.id], [1000])
+    return mouse, pad, cable
+
+
+def reports(analytics_use_case) -> tuple:
+    daily = analytics_use_case.get_daily_sales()
+    top = analytics_use_case.get_top_products()
+    brands = analytics_use_case.get_brand_sales()
+    return (
+        [(day.day, day.order_count, day.units, day.revenue) for day in daily.days],
+        [(item.name, item.units, item.revenue) for item in top.products],
+        [(item.brand, item.units, item.revenue) for item in brands.brands],
+    )
+
+
+def test_sales_update_the_rollups_in_their_transaction(session, sales):
+    daily, top, brands = reports(get_analytics_use_case(session))
+
+    assert daily == [(date.today(), 2, 10, 30.0 + 35.0)]
+    assert top == [("Mouse", 3, 48.0), ("Pad", 2, 10.0), ("Cable", 5, 7.0)]
+    assert brands == [("Logi", 3, 48.0), ("Acme", 7, 17.0)]
+
+
+def test_rebuild_recomputes_the_same_rollups_from_the_orders(session, sales):
+    analytics_use_case = get_analytics_use_case(session)
+    incremental = reports(analytics_use_case)
+
+    counts = analytics_use_case.rebuild()
+    assert counts == {
+        "dailysales": 1,
+        "dailyproductsales": 3,
+        "dailybrandsales": 2,
+    }
+    assert reports(analytics_use_case) == incremental
+
+
+def test_reports_only_cover_their_date_range(session, sales):
+    analytics_use_case = get_analytics_use_case(session)
+    yesterday = date.today() - timedelta(days=1)
+
+    response = analytics_use_case.get_daily_sales(end=yesterday)
+    assert (response.order_count, response.revenue, response.days) == (0, 0, [])
+    top = analytics_use_case.get_top_products(start=date.today(), limit=1)
+    assert [item.name for item in top.products] == ["Mouse"]
+    with pytest.raises(ValueError, match="Start date cannot be after end date"):
+        analytics_use_case.get_brand_sales(start=date.today(), end=yesterday)
@@ -0,0 +1,226 @@
+import pytest
+from sqlmodel import Session, func, select
+from app.models import Order, OrderProduct, Product
+from app.core.cache.catalog import catalog_snapshot
+from app.core.factories import get_sales_use_case, get_stock_use_case
+from app.dtos import BatchSaleInput, ReserveStockInput
+from app.routers.sales import router
+
+
+def stock(session, product_id: int) -> int:
+    session.expire_all()
+    return session.get(Product, product_id).stock_quantity
+
+
+def order_count(session) -> int:
+    return session.exec(select(func.count()).select_from(Order)).one()
+
+
+def batch(*orders, all_or_nothing: bool = True) -> BatchSaleInput:
+    return BatchSaleInput(
+        orders=[
+            {"user_id": user_id, "product_ids": ids, "quantities": quantities}
+            for user_id, ids, quantities in orders
+        ],
+        all_or_nothing=all_or_nothing,
+    )
+
+
+def test_a_batch_creates_every_order_and_takes_the_stock(
+    session, make_product, make_user
+):
+    ada = make_user("Ada")
+    bob = make_user("Bob", is_member=True)
+    mouse = make_product("Mouse", price=10.0, stock_quantity=5)
+    cable = make_product("Cable", price=2.0, stock_quantity=5)
+    catalog_snapshot.load(session)
+
+    response = get_sales_use_case(session).batch_sale(
+        batch(
+            (ada.id, [mouse.id, cable.id], [1, 2]),
+            (bob.id, [mouse.id, mouse.id], [1, 2]),
+        )
+    )
+    assert (response.created_count, response.failed_count) == (2, 0)
+    assert [result.total_price for result in response.results] == pytest.approx(
+        [14.0, 21.0]
+    )
+    assert (stock(session, mouse.id), stock(session, cable.id)) == (1, 3)
+    lines = session.exec(
+        select(OrderProduct.order_id, OrderProduct.product_id, OrderProduct.quantity)
+    ).all()
+    assert len(lines) == 4
+    second = response.results[1].order_id
+    assert sum(qty for order_id, _, qty in lines if order_id == second) == 3
+    snapshot = catalog_snapshot.get_rows(session, 1 << mouse.id)
+    assert [row.stock_quantity for row in snapshot] == [1]
+
+
+def test_all_or_nothing_creates_no_order_when_one_fails(
+    session, make_product, make_user
+):
+    user = make_user()
+    mouse = make_product(stock_quantity=3)
+
+    response = get_sales_use_case(session).batch_sale(
+        batch(
+            (user.id, [mouse.id], [2]),
+            # only 1 unit is left after the first order
+            (user.id, [mouse.id], [2]),
+            (user.id + 100, [mouse.id], [1]),
+        )
+    )
+    assert (response.created_count, response.failed_count) == (0, 3)
+    assert [result.message for result in response.results] == [
+        "Not created: another order in the batch failed",
+        f"Insufficient stock for product ID {mouse.id} 'Mouse'. "
+        "Available: 1, requested: 2",
+        f"User with ID {user.id + 100} not found",
+    ]
+    assert (order_count(session), stock(session, mouse.id)) == (0, 3)
+
+
+def test_partial_mode_creates_the_orders_that_can_be_sold(
+    session, make_product, make_user
+):
+    user = make_user()
+    mouse = make_product(stock_quantity=3)
+
+    response = get_sales_use_case(session).batch_sale(
+        batch(
+            (user.id, [mouse.id], [2]),
+            (user.id, [mouse.id], [2]),
+            (user.id, [mouse.id + 100], [1]),
+            (user.id, [mouse.id], [1]),
+            (user.id, [mouse.id], [0]),
+            (user.id, [mouse.id], [1, 1]),
+            all_or_nothing=False,
+        )
+    )
+    assert [result.success for result in response.results] == [
+        True,
+        False,
+        False,
+        True,
+        False,
+        False,
+    ]
+    messages = [result.message for result in response.results]
+    assert "Available: 1, requested: 2" in messages[1]
+    assert messages[2] == f"Products not found: [{mouse.id + 100}]"
+    assert messages[4] == "All quantities must be positive numbers"
+    assert messages[5] == "Number of product IDs must match number of quantities"
+    assert (order_count(session), stock(session, mouse.id)) == (2, 0)
+
+
+def test_a_batch_leaves_stock_reserved_by_carts_alone(session, make_product, make_user):
+    user = make_user()
+    mouse = make_product(stock_quantity=3)
+    get_stock_use_case(session).reserve_stock(
+        ReserveStockInput(
+            cart_id="cart-1", user_id=user.id, product_id=mouse.id, quantity=2
+        )
+    )
+
+    response = get_sales_use_case(session).batch_sale(
+        batch(
+            (user.id, [mouse.id], [1]), (user.id, [mouse.id], [1]), all_or_nothing=False
+        )
+    )
+    assert [result.success for result in response.results] == [True, False]
+    assert stock(session, mouse.id) == 2
+
+
+@pytest.fixture
+def stock_taken_before_the_insert(engine, monkeypatch):
+    # another sale takes units of a product after the batch read its stock
+    def take(sales_use_case, product_id: int, units: int):
+        insert_batch = sales_use_case._insert_batch
+        calls = []
+
+        def take_then_insert(accepted, reserved):
+            calls.append(accepted)
+            if len(calls) == 1:
+                with Session(engine) as other:
+                    product = other.get(Product, product_id)
+                    product.stock_quantity -= units
+                    other.commit()
+            return insert_batch(accepted, reserved)
+
+        monkeypatch.setattr(sales_use_case, "_insert_batch", take_then_insert)
+        return calls
+
+    return take
+
+
+def test_partial_mode_replans_orders_when_stock_moved_before_the_insert(
+    session, make_product, make_user, stock_taken_before_the_insert
+):
+    user = make_user()
+    mouse = make_product(stock_quantity=5)
+    sales_use_case = get_sales_use_case(session)
+    calls = stock_taken_before_the_insert(sales_use_case, mouse.id, 2)
+
+    response = sales_use_case.batch_sale(
+        batch(
+            (user.id, [mouse.id], [2]),
+            (user.id, [mouse.id], [2]),
+            (user.id, [mouse.id], [1]),
+            all_or_nothing=False,
+        )
+    )
+    assert len(calls) == 2
+    assert [result.success for result in response.results] == [True, False, True]
+    assert "Available: 1, requested: 2" in response.results[1].message
+    assert (order_count(session), stock(session, mouse.id)) == (2, 0)
+
+
+def test_all_or_nothing_fails_every_order_when_stock_moved_before_the_insert(
+    session, make_product, make_user, stock_taken_before_the_insert
+):
+    user = make_user()
+    mouse = make_product(stock_quantity=4)
+    sales_use_case = get_sales_use_case(session)
+    stock_taken_before_the_insert(sales_use_case, mouse.id, 1)
+
+    response = sales_use_case.batch_sale(
+        batch((user.id, [mouse.id], [2]), (user.id, [mouse.id], [2]))
+    )
+    assert (response.created_count, response.failed_count) == (0, 2)
+    assert "Available: 1, requested: 2" in response.results[1].message
+    assert (order_count(session), stock(session, mouse.id)) == (0, 3)
+
+
+def test_a_batch_gives_up_when_stock_keeps_moving(
+    session, make_product, make_user, monkeypatch
+):
+    user = make_user()
+    mouse = make_product(stock_quantity=10)
+    sales_use_case = get_sales_use_case(session)
+    # every conditional update finds the stock taken by another sale
+    monkeypatch.setattr(
+        sales_use_case.stock_service, "sell_stock", lambda totals, floors: []
+    )
+
+    with pytest.raises(ValueError, match="stock kept changing"):
+        sales_use_case.batch_sale(batch((user.id, [mouse.id], [1])))
+    assert (order_count(session), stock(session, mouse.id)) == (0, 10)
+
+
+def test_a_batch_must_hold_orders(session):
+    with pytest.raises(ValueError, match="Orders cannot be empty"):
+        get_sales_use_case(session).batch_sale(BatchSaleInput(orders=[]))
+
+
+def test_batch_route_reports_each_order(make_product, make_user, make_client):
+    user = make_user()
+    mouse = make_product(stock_quantity=1)
+    client = make_client(router)
+    body = batch(
+        (user.id, [mouse.id], [1]), (user.id, [mouse.id], [1]), all_or_nothing=False
+    ).model_dump()
+
+    response = client.post("/sale/batch", json=body)
+    assert response.status_code == 200
+    assert response.json()["message"] == "1 orders created, 1 failed"
+    assert client.post("/sale/batch", json={"orders": []}).status_code == 400
@@ -0,0 +1,158 @@
+import pytest
+from sqlalchemy import event
+from sqlmodel import select
+from app.database import MAX_IN_CLAUSE
+from app.models import Product, StockMovement
+from app.core.factories import get_sales_use_case, get_stock_use_case
+from app.dtos import (
+    BatchRestockInput,
+    BatchSetMinStockInput,
+    RestockInput,
+    SetMinStockInput,
+)
+from app.routers.stock import router
+
+
+def outcomes(response) -> list[tuple[int, bool, int | None]]:
+    return [
+        (result.product_id, result.success, result.stock_quantity)
+        for result in response.results
+    ]
+
+
+def test_batch_restock_adds_up_repeated_ids_and_reports_each_item(
+    session, make_product
+):
+    mouse = make_product("Mouse", stock_quantity=1)
+    pad = make_product("Pad", stock_quantity=0)
+    stock_use_case = get_stock_use_case(session)
+
+    response = stock_use_case.restock_products(
+        BatchRestockInput(
+            items=[
+                {"product_id": mouse.id, "quantity": 4},
+                {"product_id": pad.id, "quantity": -2},
+                {"product_id": 999, "quantity": 1},
+                {"product_id": mouse.id, "quantity": 5},
+            ]
+        )
+    )
+    assert (response.updated_count, response.failed_count) == (2, 2)
+    # repeated ids report the stock after the whole batch
+    assert outcomes(response) == [
+        (mouse.id, True, 10),
+        (pad.id, False, None),
+        (999, False, None),
+        (mouse.id, True, 10),
+    ]
+    assert "cannot be negative" in response.results[1].message
+    assert response.results[2].message == "Product with id 999 not found"
+
+    session.expire_all()
+    assert session.get(Product, mouse.id).stock_quantity == 10
+    assert session.get(Product, pad.id).stock_quantity == 0
+    movements = session.exec(select(StockMovement.product_id, StockMovement.reason))
+    assert movements.all() == [(mouse.id, "restock")]
+
+
+def test_batch_min_levels_keep_the_last_level_of_an_id(session, make_product):
+    mouse = make_product("Mouse")
+    stock_use_case = get_stock_use_case(session)
+
+    response = stock_use_case.set_min_stock_levels(
+        BatchSetMinStockInput(
+            items=[
+                {"product_id": mouse.id, "min_level": 7},
+                {"product_id": mouse.id, "min_level": 3},
+            ]
+        )
+    )
+    assert [result.min_stock_level for result in response.results] == [3, 3]
+    session.expire_all()
+    assert session.get(Product, mouse.id).min_stock_level == 3
+
+
+def test_batches_update_products_beyond_one_in_clause(
+    session, make_product, monkeypatch
+):
+    monkeypatch.setattr("app.core.services.stock_service.MAX_IN_CLAUSE", 2)
+    products = [make_product(f"Item {i}", stock_quantity=i) for i in range(5)]
+    stock_use_case = get_stock_use_case(session)
+
+    response = stock_use_case.restock_products(
+        BatchRestockInput(
+            items=[{"product_id": p.id, "quantity": 10} for p in products]
+        )
+    )
+    stock = [result.stock_quantity for result in response.results]
+    assert stock == [10, 11, 12, 13, 14]
+
+
+def test_bulk_stock_updates_bind_at_most_max_in_clause_variables(
+    engine, session, make_product, make_user
+):
+    user = make_user()
+    products = [make_product(f"Item {i}", stock_quantity=5) for i in range(300)]
+    product_ids = [product.id for product in products]
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE product"):
+            statements.append(len(parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        get_stock_use_case(session).restock_products(
+            BatchRestockInput(
+                items=[{"product_id": pid, "quantity": 1} for pid in product_ids]
+            )
+        )
+        get_sales_use_case(session).simple_sale(
+            user.id, product_ids, [1] * len(product_ids)
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert len(statements) > 2
+    assert max(statements) <= MAX_IN_CLAUSE
+    session.expire_all()
+    assert {session.get(Product, pid).stock_quantity for pid in product_ids} == {5}
+
+
+def test_single_item_operations_wrap_the_batch_path(session, make_product):
+    mouse = make_product("Mouse", stock_quantity=1)
+    stock_use_case = get_stock_use_case(session)
+
+    response = stock_use_case.restock_product(
+        RestockInput(product_id=mouse.id, quantity=2)
+    )
+    assert response.message == f"Successfully restocked 2 units of product {mouse.id}"
+    stock_use_case.set_min_stock_level(
+        SetMinStockInput(product_id=mouse.id, min_level=4)
+    )
+    session.expire_all()
+    assert session.get(Product, mouse.id).stock_quantity == 3
+    assert session.get(Product, mouse.id).min_stock_level == 4
+
+    with pytest.raises(ValueError, match="Product with id 999 not found"):
+        stock_use_case.restock_product(RestockInput(product_id=999, quantity=1))
+    with pytest.raises(ValueError, match="cannot be negative"):
+        stock_use_case.set_min_stock_level(
+            SetMinStockInput(product_id=mouse.id, min_level=-1)
+        )
+
+
+def test_batch_routes_return_per_item_results(make_product, make_client):
+    mouse = make_product("Mouse", stock_quantity=1)
+    client = make_client(router)
+
+    response = client.post(
+        "/stock/restock/batch",
+        json={"items": [{"product_id": mouse.id, "quantity": 2}]},
+    )
+    assert response.status_code == 200
+    assert response.json()["results"][0]["stock_quantity"] == 3
+
+    response = client.post("/stock/set-min-level/batch", json={"items": []})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Items cannot be empty"
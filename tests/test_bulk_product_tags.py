@@ -0,0 +1,119 @@
+import pytest
+from sqlmodel import select
+from app.models import ProductTag, Tag
+from app.core.cache.tag_cache import tag_cache
+from app.core.cache.tag_cooccurrence import tag_cooccurrence
+from app.core.cache.tag_index import ids_from_bitmap, tag_index
+from app.core.factories import get_stock_use_case, get_tag_use_case
+from app.core.services.tag_service import TagService
+from app.dtos import BulkProductTagsInput, UpdateProductInput
+
+
+def tag_pairs(session) -> set[tuple[int, str]]:
+    rows = session.exec(
+        select(ProductTag.product_id, Tag.name).join(Tag, Tag.id == ProductTag.tag_id)
+    )
+    return set(rows)
+
+
+def test_bulk_update_adds_and_removes_tags_across_products(session, make_product):
+    products = [make_product(f"Mouse {i}") for i in range(3)]
+    ids = [product.id for product in products]
+    service = TagService(session)
+    service.add_tags_to_product(ids[0], ["Wired", "Gaming"])
+
+    added, removed = service.bulk_update_product_tags(
+        ids + [ids[0]], ["Wireless", "Gaming"], ["Wired"]
+    )
+
+    # the existing Gaming pair is not inserted twice, the repeated id counts once
+    assert (added, removed) == (5, 1)
+    assert tag_pairs(session) == {
+        (pid, name) for pid in ids for name in ("Wireless", "Gaming")
+    }
+
+
+def test_bulk_update_use_case_validates_its_input(session, make_product):
+    tag_use_case = get_tag_use_case(session)
+    product = make_product()
+
+    with pytest.raises(ValueError, match="Product IDs cannot be empty"):
+        tag_use_case.bulk_update_product_tags(
+            BulkProductTagsInput(product_ids=[], add_tag_names=["A"])
+        )
+    with pytest.raises(ValueError, match="cannot both be empty"):
+        tag_use_case.bulk_update_product_tags(
+            BulkProductTagsInput(product_ids=[product.id])
+        )
+    with pytest.raises(ValueError, match="added and removed at the same time"):
+        tag_use_case.bulk_update_product_tags(
+            BulkProductTagsInput(
+                product_ids=[product.id], add_tag_names=["A"], remove_tag_names=["A"]
+            )
+        )
+
+
+def test_uncommitted_bulk_update_leaves_the_indexes_alone_on_rollback(
+    session, make_product
+):
+    product = make_product()
+    service = TagService(session)
+    service.add_tags_to_product(product.id, ["Wired", "Gaming"])
+    wired = tag_cache.get_id(session, "Wired")
+    gaming = tag_cache.get_id(session, "Gaming")
+    tag_index.all_products(session)
+    assert tag_cooccurrence.related(session, gaming, 10) == [(wired, 1)]
+
+    service.bulk_update_product_tags([product.id], ["Wireless"], ["Wired"], False)
+    session.rollback()
+
+    assert ids_from_bitmap(tag_index.get(session, wired)) == [product.id]
+    assert tag_cooccurrence.related(session, gaming, 10) == [(wired, 1)]
+    assert tag_pairs(session) == {(product.id, "Wired"), (product.id, "Gaming")}
+
+
+def test_uncommitted_bulk_update_reaches_the_indexes_once_committed(
+    session, make_product
+):
+    product = make_product()
+    service = TagService(session)
+    service.add_tags_to_product(product.id, ["Wired", "Gaming"])
+    wired = tag_cache.get_id(session, "Wired")
+    gaming = tag_cache.get_id(session, "Gaming")
+    tag_index.all_products(session)
+    tag_cooccurrence.related(session, gaming, 10)
+
+    service.bulk_update_product_tags([product.id], ["Wireless"], ["Wired"], False)
+    assert ids_from_bitmap(tag_index.get(session, wired)) == [product.id]
+    session.commit()
+
+    wireless = tag_cache.get_id(session, "Wireless")
+    assert tag_index.get(session, wired) == 0
+    assert ids_from_bitmap(tag_index.get(session, wireless)) == [product.id]
+    assert tag_cooccurrence.related(session, gaming, 10) == [(wireless, 1)]
+
+
+def test_failed_product_update_does_not_change_the_tag_index(
+    session, make_product, monkeypatch
+):
+    product = make_product()
+    stock_use_case = get_stock_use_case(session)
+    stock_use_case.tag_service.add_tags_to_product(product.id, ["Wired"])
+    wired = tag_cache.get_id(session, "Wired")
+    tag_index.all_products(session)
+
+    def fail():
+        raise RuntimeError("database is locked")
+
+    # the tags are written with commit=False, then the product commit fails
+    monkeypatch.setattr(session, "commit", fail)
+    with pytest.raises(RuntimeError):
+        stock_use_case.update_product(
+            UpdateProductInput(product_id=product.id, tag_names=["Wireless"])
+        )
+    monkeypatch.undo()
+    session.rollback()
+
+    assert ids_from_bitmap(tag_index.get(session, wired)) == [product.id]
+    assert tag_cache.get_id(session, "Wireless") is None
+    assert tag_pairs(session) == {(product.id, "Wired")}
@@ -0,0 +1,167 @@
+import pytest
+from sqlmodel import select
+from app.models import Order, OrderProduct, Product
+from app.core.cache.carts import cart_store
+from app.core.cache.catalog import catalog_snapshot
+from app.core.factories import get_sales_use_case
+from app.routers.sales import router
+
+
+def stock(session, product_id: int) -> int:
+    session.expire_all()
+    return session.get(Product, product_id).stock_quantity
+
+
+def test_quotes_keep_a_running_total_with_the_member_discount(
+    session, make_product, make_user
+):
+    user = make_user(is_member=True)
+    mouse = make_product("Mouse", price=10.0)
+    cable = make_product("Cable", price=2.5)
+    sales_use_case = get_sales_use_case(session)
+
+    cart_id = sales_use_case.create_cart(user.id).cart_id
+    sales_use_case.add_to_cart(cart_id, mouse.id, 2)
+    quote = sales_use_case.add_to_cart(cart_id, cable.id, 4)
+    assert [(line.name, line.line_total) for line in quote.lines] == [
+        ("Mouse", 20.0),
+        ("Cable", 10.0),
+    ]
+    assert quote.item_count == 6
+    assert (quote.subtotal, quote.discount, quote.total) == (30.0, 9.0, 21.0)
+
+    quote = sales_use_case.remove_from_cart(cart_id, cable.id, 3)
+    assert (quote.item_count, quote.subtotal) == (3, 22.5)
+    quote = sales_use_case.remove_from_cart(cart_id, cable.id)
+    assert [line.product_id for line in quote.lines] == [mouse.id]
+    assert sales_use_case.get_cart_quote(cart_id) == quote
+
+
+def test_a_price_change_reprices_the_line_in_the_next_quote(
+    session, make_product, make_user
+):
+    user = make_user()
+    mouse = make_product(price=10.0)
+    sales_use_case = get_sales_use_case(session)
+    cart_id = sales_use_case.create_cart(user.id).cart_id
+    sales_use_case.add_to_cart(cart_id, mouse.id, 3)
+
+    mouse.price = 12.0
+    session.add(mouse)
+    session.commit()
+    catalog_snapshot.refresh(session, [mouse.id])
+    quote = sales_use_case.get_cart_quote(cart_id)
+    assert quote.lines[0].unit_price == 12.0
+    assert (quote.subtotal, quote.total) == (36.0, 36.0)
+
+
+def test_a_cart_cannot_hold_more_than_the_available_stock(
+    session, make_product, make_user
+):
+    user = make_user()
+    mouse = make_product(stock_quantity=3)
+    sales_use_case = get_sales_use_case(session)
+    cart_id = sales_use_case.create_cart(user.id).cart_id
+
+    sales_use_case.add_to_cart(cart_id, mouse.id, 2)
+    with pytest.raises(ValueError, match="Only 3 units"):
+        sales_use_case.add_to_cart(cart_id, mouse.id, 2)
+    with pytest.raises(ValueError, match="Invalid quantity"):
+        sales_use_case.add_to_cart(cart_id, mouse.id, 0)
+    with pytest.raises(ValueError, match="not found"):
+        sales_use_case.add_to_cart(cart_id, mouse.id + 100, 1)
+    with pytest.raises(ValueError, match="not found or expired"):
+        sales_use_case.get_cart_quote("missing")
+    with pytest.raises(ValueError, match="User with ID"):
+        sales_use_case.create_cart(user.id + 100)
+
+
+def test_checkout_sells_at_the_quoted_prices_and_discards_the_cart(
+    session, make_product, make_user
+):
+    user = make_user(is_member=True)
+    mouse = make_product("Mouse", price=10.0, stock_quantity=5)
+    cable = make_product("Cable", price=4.0, stock_quantity=5)
+    sales_use_case = get_sales_use_case(session)
+    cart_id = sales_use_case.create_cart(user.id).cart_id
+    sales_use_case.add_to_cart(cart_id, mouse.id, 2)
+    quote = sales_use_case.add_to_cart(cart_id, cable.id, 1)
+
+    result = sales_use_case.checkout_cart(user.id, cart_id)
+    assert result.total_price == pytest.approx(quote.total)
+    assert (stock(session, mouse.id), stock(session, cable.id)) == (3, 4)
+    lines = session.exec(
+        select(OrderProduct.product_id, OrderProduct.quantity).where(
+            OrderProduct.order_id == result.order_id
+        )
+    ).all()
+    assert sorted(lines) == sorted([(mouse.id, 2), (cable.id, 1)])
+    assert cart_store.get(cart_id) is None
+
+
+def test_checkout_after_a_price_change_is_rejected_with_the_new_total(
+    session, make_product, make_user
+):
+    user = make_user()
+    mouse = make_product(price=10.0, stock_quantity=5)
+    sales_use_case = get_sales_use_case(session)
+    cart_id = sales_use_case.create_cart(user.id).cart_id
+    sales_use_case.add_to_cart(cart_id, mouse.id, 3)
+
+    mouse.price = 12.0
+    session.add(mouse)
+    session.commit()
+    catalog_snapshot.refresh(session, [mouse.id])
+    with pytest.raises(ValueError, match="the new total is 36.00"):
+        sales_use_case.checkout_cart(user.id, cart_id)
+    assert stock(session, mouse.id) == 5
+
+    # the cart now holds the new price, and sells at it
+    assert sales_use_case.get_cart_quote(cart_id).total == 36.0
+    assert sales_use_case.checkout_cart(user.id, cart_id).total_price == 36.0
+
+
+def test_checkout_rejects_another_users_cart_and_an_empty_cart(
+    session, make_product, make_user
+):
+    owner = make_user("Ada")
+    other = make_user("Bob")
+    mouse = make_product(stock_quantity=5)
+    sales_use_case = get_sales_use_case(session)
+    cart_id = sales_use_case.create_cart(owner.id).cart_id
+
+    with pytest.raises(ValueError, match="is empty"):
+        sales_use_case.checkout_cart(owner.id, cart_id)
+    sales_use_case.add_to_cart(cart_id, mouse.id, 2)
+    with pytest.raises(ValueError, match="belongs to another user"):
+        sales_use_case.checkout_cart(other.id, cart_id)
+
+    # the cart is left untouched for its owner
+    assert session.exec(select(Order)).all() == []
+    assert stock(session, mouse.id) == 5
+    assert sales_use_case.checkout_cart(owner.id, cart_id).user_id == owner.id
+
+
+def test_cart_routes_quote_and_check_out(make_product, make_user, make_client):
+    user = make_user()
+    other = make_user("Bob")
+    mouse = make_product(price=10.0, stock_quantity=2)
+    client = make_client(router)
+
+    cart_id = client.post("/sale/carts", json={"user_id": user.id}).json()["cart_id"]
+    item = {"product_id": mouse.id, "quantity": 2}
+    added = client.post(f"/sale/carts/{cart_id}/items", json=item)
+    assert added.json()["total"] == 20.0
+    too_many = client.post(f"/sale/carts/{cart_id}/items", json=item)
+    assert too_many.status_code == 400
+
+    removed = client.delete(f"/sale/carts/{cart_id}/items/{mouse.id}?quantity=1")
+    assert removed.json()["item_count"] == 1
+    assert client.get(f"/sale/carts/{cart_id}/quote").json() == removed.json()
+
+    checkout = f"/sale/carts/{cart_id}/checkout"
+    assert client.post(checkout, json={"user_id": other.id}).status_code == 400
+    sold = client.post(checkout, json={"user_id": user.id})
+    assert sold.status_code == 200
+    assert sold.json()["total_price"] == 10.0
+    assert client.get(f"/sale/carts/{cart_id}/quote").status_code == 400
@@ -0,0 +1,95 @@
+import threading
+import time
+from sqlmodel import Session
+from app.models import Product
+from app.core.cache.catalog import CatalogSnapshot, catalog_snapshot
+from app.core.factories import get_sales_use_case, get_stock_use_case
+from app.dtos import BatchRestockInput, BatchSetMinStockInput
+
+
+def snapshot_levels(session, product_ids) -> dict[int, tuple[int, int]]:
+    bitmap = sum(1 << pid for pid in product_ids)
+    return {
+        row.id: (row.stock_quantity, row.min_stock_level)
+        for row in catalog_snapshot.get_rows(session, bitmap, order_by_name=False)
+    }
+
+
+def db_levels(session, product_ids) -> dict[int, tuple[int, int]]:
+    session.expire_all()
+    return {
+        pid: (product.stock_quantity, product.min_stock_level)
+        for pid in product_ids
+        if (product := session.get(Product, pid)) is not None
+    }
+
+
+def test_sales_and_stock_writes_keep_the_snapshot_equal_to_the_database(
+    session, make_product, make_user
+):
+    user = make_user()
+    mouse = make_product("Mouse", stock_quantity=5)
+    cable = make_product("Cable", stock_quantity=3)
+    ids = [mouse.id, cable.id]
+    catalog_snapshot.load(session)
+
+    get_sales_use_case(session).simple_sale(user.id, [mouse.id, cable.id], [2, 3])
+    assert db_levels(session, ids) == {mouse.id: (3, 2), cable.id: (0, 2)}
+    assert snapshot_levels(session, ids) == db_levels(session, ids)
+    assert catalog_snapshot.out_of_stock_products(session) == 1 << cable.id
+
+    stock_use_case = get_stock_use_case(session)
+    stock_use_case.restock_products(
+        BatchRestockInput(items=[{"product_id": cable.id, "quantity": 4}])
+    )
+    stock_use_case.set_min_stock_levels(
+        BatchSetMinStockInput(items=[{"product_id": mouse.id, "min_level": 5}])
+    )
+    assert db_levels(session, ids) == {mouse.id: (3, 5), cable.id: (4, 2)}
+    assert snapshot_levels(session, ids) == db_levels(session, ids)
+    assert catalog_snapshot.low_stock_products(session) == 1 << mouse.id
+    assert catalog_snapshot.out_of_stock_products(session) == 0
+
+
+def test_refresh_is_a_no_op_until_the_snapshot_is_loaded(session, make_product):
+    product = make_product()
+    snapshot = CatalogSnapshot()
+    assert snapshot.refresh(session, [product.id]) == []
+    assert not snapshot._loaded
+
+
+def test_refresh_during_the_initial_load_is_not_lost(engine, make_product):
+    product = make_product(stock_quantity=5)
+    snapshot = CatalogSnapshot()
+    loaded_rows = threading.Event()
+    resume_load = threading.Event()
+
+    class SlowResult:
+        def __init__(self, rows):
+            self.rows = rows
+
+        def all(self):
+            # the load has read the old stock; hold it before applying
+            loaded_rows.set()
+            resume_load.wait(5)
+            return self.rows
+
+    with Session(engine) as loader, Session(engine) as writer:
+        read = loader.exec
+        loader.exec = lambda statement: SlowResult(read(statement).all())
+        load = threading.Thread(target=snapshot.load, args=(loader,))
+        load.start()
+        assert loaded_rows.wait(5)
+
+        # a sale commits while the load is in flight and refreshes the product
+        writer.get(Product, product.id).stock_quantity = 1
+        writer.commit()
+        refresh = threading.Thread(target=snapshot.refresh, args=(writer, [product.id]))
+        refresh.start()
+        time.sleep(0.1)
+        resume_load.set()
+        load.join(5)
+        refresh.join(5)
+
+        rows = snapshot.get_rows(writer, 1 << product.id)
+    assert [row.stock_quantity for row in rows] == [1]
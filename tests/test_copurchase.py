@@ -0,0 +1,88 @@
+import math
+import threading
+import time
+import pytest
+from sqlmodel import Session
+from app.core.cache.copurchase import CoPurchaseIndex, co_purchase_index
+from app.core.factories import get_sales_use_case
+
+
+@pytest.fixture
+def shop(session, make_product, make_user):
+    products = [make_product(name) for name in ("Mouse", "Pad", "Cable", "Dock")]
+    return [product.id for product in products], make_user().id
+
+
+def sell(session, user_id: int, *product_ids: int) -> None:
+    get_sales_use_case(session).simple_sale(
+        user_id, list(product_ids), [1] * len(product_ids)
+    )
+
+
+def test_neighbours_are_ranked_by_cosine_similarity(session, shop):
+    (mouse, pad, cable, dock), user_id = shop
+    sell(session, user_id, mouse, pad)
+    sell(session, user_id, mouse, pad)
+    sell(session, user_id, mouse, cable)
+    sell(session, user_id, dock)
+
+    neighbours = CoPurchaseIndex().neighbours(session, mouse, 10)
+    assert [product_id for product_id, _ in neighbours] == [pad, cable]
+    assert neighbours[0][1] == pytest.approx(2 / math.sqrt(3 * 2))
+    assert neighbours[1][1] == pytest.approx(1 / math.sqrt(3 * 1))
+    assert CoPurchaseIndex().neighbours(session, dock, 10) == []
+
+
+def test_sales_after_loading_are_folded_in(session, shop):
+    (mouse, pad, cable, dock), user_id = shop
+    sell(session, user_id, mouse, pad)
+    assert co_purchase_index.neighbours(session, mouse, 10)[0][0] == pad
+
+    sell(session, user_id, mouse, cable)
+    sell(session, user_id, mouse, cable)
+
+    incremental = co_purchase_index.neighbours(session, mouse, 10)
+    assert incremental == CoPurchaseIndex().neighbours(session, mouse, 10)
+    assert [product_id for product_id, _ in incremental] == [cable, pad]
+
+
+def test_bought_together_lists_neighbour_products(session, shop):
+    (mouse, pad, cable, dock), user_id = shop
+    sell(session, user_id, mouse, pad, cable)
+    sell(session, user_id, mouse, pad)
+    sales_use_case = get_sales_use_case(session)
+
+    response = sales_use_case.get_frequently_bought_together(mouse, limit=1)
+    assert [product["id"] for product in response.products] == [pad]
+    assert response.products[0]["name"] == "Pad"
+
+    with pytest.raises(ValueError, match="Limit must be positive"):
+        sales_use_case.get_frequently_bought_together(mouse, limit=0)
+    with pytest.raises(ValueError, match="not found"):
+        sales_use_case.get_frequently_bought_together(999)
+
+
+def test_a_sale_committed_during_the_initial_load_is_not_lost(
+    engine, session, shop, pause_read
+):
+    (mouse, pad, cable, dock), user_id = shop
+    sell(session, user_id, mouse, pad)
+
+    with Session(engine) as loader, Session(engine) as writer:
+        # the load has read the order lines of the first sale only
+        reached, release = pause_read(loader)
+        load = threading.Thread(
+            target=co_purchase_index.neighbours, args=(loader, mouse, 10)
+        )
+        load.start()
+        assert reached.wait(5)
+
+        sale = threading.Thread(target=sell, args=(writer, user_id, mouse, cable))
+        sale.start()
+        time.sleep(0.1)
+        release.set()
+        load.join(5)
+        sale.join(5)
+
+        neighbours = co_purchase_index.neighbours(writer, mouse, 10)
+    assert sorted(product_id for product_id, _ in neighbours) == sorted([pad, cable])
@@ -0,0 +1,138 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+import pytest
+from sqlmodel import Session, create_engine
+from app.models import Order, Product
+from app.core.factories import get_export_use_case, get_sales_use_case
+from app.core.services.export_service import ExportService, _merge_children
+from app.core.services.tag_service import TagService
+from app.core.use_cases.export_use import ORDER_CSV_COLUMNS, ExportUseCase
+from app.routers.export import router
+
+
+def read(chunks) -> str:
+    return b"".join(chunks).decode()
+
+
+@pytest.fixture
+def catalog(session, make_product):
+    mouse = make_product("Mouse")
+    cable = make_product("Cable, 2m", price=4.5)
+    pad = make_product("Pad")
+    TagService(session).add_tags_to_product(mouse.id, ["Wireless", "Gaming"])
+    TagService(session).add_tags_to_product(pad.id, ["Gaming"])
+    return mouse, cable, pad
+
+
+def test_merge_children_pairs_parents_with_their_sorted_children():
+    parents = iter([(1,), (2,), (4,), (5,)])
+    children = iter([(0, "orphan"), (1, "a"), (1, "b"), (3, "lost"), (4, "c")])
+    assert [
+        (parent[0], [child[0] for child in rows])
+        for parent, rows in _merge_children(parents, children)
+    ] == [(1, ["a", "b"]), (2, []), (4, ["c"]), (5, [])]
+
+
+def test_products_export_as_ndjson_with_their_tags(engine, catalog):
+    mouse, cable, pad = catalog
+    export_use_case = ExportUseCase(engine, batch_size=2)
+
+    lines = read(export_use_case.export_products("ndjson")).splitlines()
+    products = [json.loads(line) for line in lines]
+    assert [product["id"] for product in products] == [mouse.id, cable.id, pad.id]
+    assert [product["tags"] for product in products] == [
+        ["Wireless", "Gaming"],
+        [],
+        ["Gaming"],
+    ]
+    assert products[1] == {
+        "id": cable.id,
+        "name": "Cable, 2m",
+        "type": "mouse",
+        "brand": "Acme",
+        "price": 4.5,
+        "stock_quantity": 10,
+        "min_stock_level": 2,
+        "tags": [],
+    }
+
+
+def test_products_export_as_gzipped_csv(engine, catalog):
+    export_use_case = ExportUseCase(engine, batch_size=2)
+
+    data = gzip.decompress(b"".join(export_use_case.export_products("csv", True)))
+    rows = list(csv.DictReader(io.StringIO(data.decode())))
+    assert [(row["name"], row["tags"]) for row in rows] == [
+        ("Mouse", "Wireless|Gaming"),
+        ("Cable, 2m", ""),
+        ("Pad", "Gaming"),
+    ]
+
+
+def test_orders_export_one_csv_line_per_order_line(engine, session, catalog, make_user):
+    mouse, cable, _ = catalog
+    user = make_user()
+    sale = get_sales_use_case(session).simple_sale(
+        user.id, [mouse.id, cable.id], [1, 2]
+    )
+    empty = Order(user_id=user.id, final_price=0.0, date=datetime(2026, 1, 1))
+    session.add(empty)
+    session.commit()
+    export_use_case = ExportUseCase(engine, batch_size=1)
+
+    rows = list(csv.reader(io.StringIO(read(export_use_case.export_orders("csv")))))
+    assert rows[0] == ORDER_CSV_COLUMNS
+    assert [row[:1] + row[4:] for row in rows[1:]] == [
+        [str(sale.order_id), str(mouse.id), "1"],
+        [str(sale.order_id), str(cable.id), "2"],
+        [str(empty.id), "", ""],
+    ]
+
+    orders = [
+        json.loads(line)
+        for line in read(export_use_case.export_orders("ndjson", False)).splitlines()
+    ]
+    assert orders[1] == {
+        "id": empty.id,
+        "user_id": user.id,
+        "date": "2026-01-01T00:00:00",
+        "final_price": 0.0,
+        "lines": [],
+    }
+
+
+def test_a_paused_export_does_not_block_commits(engine, catalog):
+    mouse, cable, pad = catalog
+    with Session(engine) as reader:
+        products = ExportService(reader, batch_size=1).iter_products()
+        assert next(products)["id"] == mouse.id
+
+        # a writer that gives up at once instead of waiting for the lock
+        writer_engine = create_engine(engine.url, connect_args={"timeout": 0})
+        with Session(writer_engine) as writer:
+            writer.get(Product, pad.id).stock_quantity = 3
+            writer.commit()
+        writer_engine.dispose()
+
+        rest = list(products)
+    assert [product["id"] for product in rest] == [cable.id, pad.id]
+    assert rest[1]["stock_quantity"] == 3
+
+
+def test_export_routes_stream_attachments_and_reject_unknown_formats(
+    engine, catalog, make_client
+):
+    client = make_client(router)
+    client.app.dependency_overrides[get_export_use_case] = lambda: ExportUseCase(engine)
+
+    response = client.get("/export/products", params={"format": "csv", "gzip": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert 'filename="products.csv.gz"' in response.headers["content-disposition"]
+
+    response = client.get("/export/orders", params={"format": "xml"})
+    assert response.status_code == 400
+    assert "Unsupported export format" in response.json()["detail"]
@@ -0,0 +1,62 @@
+import pytest
+from app.core.factories import get_catalog_use_case, get_sales_use_case
+from app.core.services.tag_service import TagService
+
+
+@pytest.fixture
+def catalog(session, make_product):
+    service = TagService(session)
+    mouse = make_product("Mouse", brand="Acme", type="mouse", price=20.0)
+    trackball = make_product("Trackball", brand="Zeta", type="mouse", price=60.0)
+    keyboard = make_product(
+        "Keyboard", brand="Acme", type="keyboard", price=80.0, stock_quantity=0
+    )
+    service.add_tags_to_product(mouse.id, ["Wireless", "Gaming"])
+    service.add_tags_to_product(trackball.id, ["Wireless"])
+    service.add_tags_to_product(keyboard.id, ["Wireless", "Gaming"])
+    return mouse, trackball, keyboard
+
+
+def test_facets_count_the_whole_catalog(session, catalog):
+    facets = get_catalog_use_case(session).get_facets([])
+    assert facets.total == 3
+    assert facets.tags == {"Wireless": 3, "Gaming": 2}
+    assert facets.brands == {"Acme": 2, "Zeta": 1}
+    assert facets.types == {"mouse": 2, "keyboard": 1}
+
+
+def test_facets_count_what_remains_after_the_filters(session, catalog):
+    catalog_use_case = get_catalog_use_case(session)
+
+    facets = catalog_use_case.get_facets(["Gaming"], in_stock_only=True)
+    assert facets.total == 1
+    # the selected tag is not offered again
+    assert facets.tags == {"Wireless": 1}
+    assert facets.brands == {"Acme": 1}
+
+    facets = catalog_use_case.get_facets([], product_type="mouse", min_price=50)
+    assert (facets.total, facets.brands) == (1, {"Zeta": 1})
+
+    facets = catalog_use_case.get_facets([], brand="Acme", max_price=50)
+    assert (facets.total, facets.types) == (1, {"mouse": 1})
+
+    facets = catalog_use_case.get_facets(["Unknown"])
+    assert (facets.total, facets.tags, facets.brands) == (0, {}, {})
+
+
+def test_facets_follow_stock_and_tag_writes(session, catalog, make_user):
+    mouse, trackball, keyboard = catalog
+    catalog_use_case = get_catalog_use_case(session)
+    assert catalog_use_case.get_facets([], in_stock_only=True).total == 2
+
+    get_sales_use_case(session).simple_sale(make_user().id, [trackball.id], [10])
+    TagService(session).add_tags_to_product(keyboard.id, ["RGB"])
+
+    facets = catalog_use_case.get_facets([], in_stock_only=True)
+    assert (facets.total, facets.brands) == (1, {"Acme": 1})
+    assert catalog_use_case.get_facets(["RGB"]).total == 1
+
+
+def test_facets_reject_an_inverted_price_range(session, catalog):
+    with pytest.raises(ValueError, match="Minimum price cannot be greater"):
+        get_catalog_use_case(session).get_facets([], min_price=10, max_price=5)
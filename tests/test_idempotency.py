@@ -0,0 +1,158 @@
+import threading
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import text
+from sqlmodel import Session, create_engine, func, select
+from app.database import init_database
+from app.models import IdempotencyKey, Order, Product
+from app.core.cache.idempotency import idempotency_cache
+from app.core.factories import get_sales_use_case
+from app.routers.sales import router
+
+
+def order_count(session) -> int:
+    return session.exec(select(func.count()).select_from(Order)).one()
+
+
+def stock(session, product_id: int) -> int:
+    session.expire_all()
+    return session.get(Product, product_id).stock_quantity
+
+
+def test_a_retried_sale_replays_the_first_response(session, make_product, make_user):
+    user = make_user()
+    mouse = make_product(stock_quantity=5)
+    sales_use_case = get_sales_use_case(session)
+
+    first = sales_use_case.simple_sale(user.id, [mouse.id], [2], "key-1")
+    retry = sales_use_case.simple_sale(user.id, [mouse.id], [2], "key-1")
+    assert retry == first
+    # after a restart the response is replayed from the database
+    idempotency_cache.clear()
+    assert sales_use_case.simple_sale(user.id, [mouse.id], [2], "key-1") == first
+    assert (order_count(session), stock(session, mouse.id)) == (1, 3)
+
+
+def test_a_key_reused_for_a_different_sale_is_rejected(
+    session, make_product, make_user
+):
+    user = make_user()
+    mouse = make_product(stock_quantity=5)
+    sales_use_case = get_sales_use_case(session)
+    sales_use_case.simple_sale(user.id, [mouse.id], [2], "key-1")
+
+    with pytest.raises(ValueError, match="already used for a different sale"):
+        sales_use_case.simple_sale(user.id, [mouse.id], [1], "key-1")
+    idempotency_cache.clear()
+    with pytest.raises(ValueError, match="already used for a different sale"):
+        sales_use_case.simple_sale(user.id, [mouse.id], [1], "key-1")
+    assert stock(session, mouse.id) == 3
+
+
+def test_keys_are_scoped_per_user(session, make_product, make_user):
+    ada, bob = make_user("Ada"), make_user("Bob")
+    mouse = make_product(stock_quantity=5)
+    sales_use_case = get_sales_use_case(session)
+
+    first = sales_use_case.simple_sale(ada.id, [mouse.id], [1], "checkout")
+    other = sales_use_case.simple_sale(bob.id, [mouse.id], [1], "checkout")
+    assert other.order_id != first.order_id
+    assert other.user_id == bob.id
+    keys = session.exec(select(IdempotencyKey.user_id, IdempotencyKey.key)).all()
+    assert sorted(keys) == [(ada.id, "checkout"), (bob.id, "checkout")]
+
+
+def test_failed_and_expired_sales_do_not_block_a_retry(
+    session, make_product, make_user
+):
+    user = make_user()
+    mouse = make_product(stock_quantity=1)
+    sales_use_case = get_sales_use_case(session)
+
+    with pytest.raises(ValueError, match="Insufficient stock"):
+        sales_use_case.simple_sale(user.id, [mouse.id], [2], "key-1")
+    mouse.stock_quantity = 4
+    session.add(mouse)
+    session.commit()
+    first = sales_use_case.simple_sale(user.id, [mouse.id], [2], "key-1")
+
+    # past the TTL the key starts over
+    row = session.get(IdempotencyKey, (user.id, "key-1"))
+    row.created_at = datetime.now() - timedelta(days=2)
+    session.add(row)
+    session.commit()
+    idempotency_cache.clear()
+    again = sales_use_case.simple_sale(user.id, [mouse.id], [2], "key-1")
+    assert again.order_id != first.order_id
+    assert stock(session, mouse.id) == 0
+
+
+def test_keys_must_fit_the_column(session, make_product, make_user):
+    sales_use_case = get_sales_use_case(session)
+    for key in ["", "k" * 256]:
+        with pytest.raises(ValueError, match="Idempotency key must be 1 to 255"):
+            sales_use_case.simple_sale(make_user().id, [make_product().id], [1], key)
+
+
+def test_concurrent_duplicates_sell_once(engine, make_product, make_user):
+    user_id = make_user().id
+    product_id = make_product(stock_quantity=10).id
+    barrier = threading.Barrier(4)
+    results = []
+
+    def sell():
+        with Session(engine) as session:
+            barrier.wait()
+            sale = get_sales_use_case(session).simple_sale(
+                user_id, [product_id], [3], "double-click"
+            )
+            results.append(sale.order_id)
+
+    threads = [threading.Thread(target=sell) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 4 and len(set(results)) == 1
+    with Session(engine) as session:
+        assert (order_count(session), stock(session, product_id)) == (1, 7)
+
+
+def test_sale_route_replays_by_idempotency_key_header(
+    make_product, make_user, make_client
+):
+    user = make_user()
+    mouse = make_product(stock_quantity=5)
+    client = make_client(router)
+    body = {"user_id": user.id, "product_ids": str(mouse.id), "quantities": "2"}
+
+    first = client.post("/sale/", json=body, headers={"Idempotency-Key": "abc"})
+    retry = client.post("/sale/", json=body, headers={"Idempotency-Key": "abc"})
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+
+    body["quantities"] = "1"
+    mismatch = client.post("/sale/", json=body, headers={"Idempotency-Key": "abc"})
+    assert mismatch.status_code == 400
+
+
+def test_init_database_recreates_an_idempotency_table_without_users(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE idempotencykey (key VARCHAR(255) PRIMARY KEY, "
+                "request_hash VARCHAR, response VARCHAR, created_at DATETIME)"
+            )
+        )
+        connection.execute(
+            text("INSERT INTO idempotencykey VALUES ('k', '', '', '2026-01-01')")
+        )
+
+    init_database(engine)
+    init_database(engine)
+    with engine.connect() as connection:
+        columns = connection.execute(text("PRAGMA table_info(idempotencykey)"))
+        assert [row.name for row in columns][:2] == ["user_id", "key"]
+    engine.dispose()
@@ -0,0 +1,187 @@
+import io
+import json
+import pytest
+from sqlmodel import select
+from app.models import Product, StockMovement
+from app.core.cache.catalog import catalog_snapshot
+from app.core.cache.tag_cache import tag_cache
+from app.core.cache.tag_index import ids_from_bitmap, tag_index
+from app.core.factories import get_catalog_use_case, get_import_use_case
+from app.core.services.tag_service import TagService
+from app.core.use_cases.export_use import ExportUseCase
+from app.routers.stock import router
+
+CSV_HEADER = "name,product_type,price,stock_quantity,min_stock_level,tag_names\n"
+
+
+def import_csv(session, rows: list[str], **options):
+    body = io.BytesIO((CSV_HEADER + "".join(rows)).encode())
+    return get_import_use_case(session).import_products(body, "csv", **options)
+
+
+def errors(response) -> list[tuple[int, str]]:
+    return [(error.row, error.error) for error in response.errors]
+
+
+def test_csv_rows_are_imported_with_their_ids_stock_and_tags(session):
+    # the catalog and the tag index are loaded, so they must follow the import
+    catalog_snapshot.load(session)
+    tag_index.all_products(session)
+
+    response = import_csv(
+        session,
+        [
+            "Mouse,mouse,10,5,1,Wireless|Gaming\n",
+            "Cable,cable,2.5,,,\n",
+            "Headset,audio,30,0,2, Wireless \n",
+        ],
+        batch_size=2,
+    )
+    assert (response.imported_count, response.failed_count) == (3, 0)
+
+    products = session.exec(select(Product).order_by(Product.id)).all()
+    assert [
+        (p.name, p.type, p.stock_quantity, p.min_stock_level) for p in products
+    ] == [
+        ("Mouse", "mouse", 5, 1),
+        ("Cable", "cable", 0, 5),
+        ("Headset", "audio", 0, 2),
+    ]
+    ids = {product.name: product.id for product in products}
+    movements = session.exec(
+        select(StockMovement.product_id, StockMovement.quantity_change)
+    )
+    # only non-zero initial stock is recorded in the ledger
+    assert movements.all() == [(ids["Mouse"], 5)]
+
+    wireless = tag_cache.get_id(session, "Wireless")
+    assert ids_from_bitmap(tag_index.get(session, wireless)) == [
+        ids["Mouse"],
+        ids["Headset"],
+    ]
+    assert ids_from_bitmap(catalog_snapshot.filter(session, in_stock_only=True)) == [
+        ids["Mouse"]
+    ]
+    results = get_catalog_use_case(session).search_products("gaming").results
+    assert [result.id for result in results] == [ids["Mouse"]]
+
+
+def test_invalid_csv_rows_are_reported_and_skipped(session):
+    response = import_csv(
+        session,
+        [
+            "Mouse,mouse,10,5,1,\n",
+            "Cable,cable,cheap,1,1,\n",
+            "Pad,,3,1,1,\n",
+            "Hub,hub,-4,1,1,\n",
+            "Dock,dock,50,1,1,\n",
+        ],
+    )
+    assert (response.imported_count, response.failed_count) == (2, 3)
+    assert [row for row, _ in errors(response)] == [2, 3, 4]
+    assert "price" in errors(response)[0][1]
+    assert "product_type" in errors(response)[1][1]
+    assert "Price cannot be negative" in errors(response)[2][1]
+    assert session.exec(select(Product.name).order_by(Product.id)).all() == [
+        "Mouse",
+        "Dock",
+    ]
+
+
+def test_ndjson_lines_that_are_not_product_objects_are_reported(session):
+    lines = [
+        json.dumps({"name": "Mouse", "product_type": "mouse", "price": 10}),
+        "",
+        "{not json",
+        "[1, 2]",
+        json.dumps({"name": "Pad", "price": 3}),
+        json.dumps(
+            {"name": "Hub", "product_type": "hub", "price": 5, "tag_names": ["USB"]}
+        ),
+    ]
+    body = io.BytesIO("\n".join(lines).encode())
+
+    response = get_import_use_case(session).import_products(body, "ndjson")
+    assert response.imported_count == 2
+    # blank lines are skipped and not counted as rows
+    assert [row for row, _ in errors(response)] == [2, 3, 4]
+    assert errors(response)[0][1].startswith("Invalid JSON")
+    assert errors(response)[1][1] == "Expected a JSON object"
+    assert "product_type" in errors(response)[2][1]
+
+
+def test_a_failed_batch_is_rolled_back_and_leaves_the_caches_alone(
+    session, monkeypatch
+):
+    catalog_snapshot.load(session)
+    tag_index.all_products(session)
+    import_use_case = get_import_use_case(session)
+    record = import_use_case.ledger_service.record_movements
+    calls = []
+
+    def fail_second_batch(*args):
+        calls.append(args)
+        if len(calls) == 2:
+            raise RuntimeError("disk I/O error")
+        return record(*args)
+
+    monkeypatch.setattr(
+        import_use_case.ledger_service, "record_movements", fail_second_batch
+    )
+    body = io.BytesIO(
+        (CSV_HEADER + "Mouse,mouse,10,5,1,Old\nPad,pad,3,5,1,New\n").encode()
+    )
+    response = import_use_case.import_products(body, "csv", batch_size=1)
+
+    assert response.imported_count == 1
+    assert errors(response) == [(2, "Batch failed: disk I/O error")]
+    assert session.exec(select(Product.name)).all() == ["Mouse"]
+    assert tag_cache.get_id(session, "New") is None
+    assert len(ids_from_bitmap(tag_index.all_products(session))) == 1
+    assert len(ids_from_bitmap(catalog_snapshot.filter(session))) == 1
+    assert get_catalog_use_case(session).search_products("pad").total == 0
+
+
+@pytest.mark.parametrize("format", ["csv", "ndjson"])
+def test_an_exported_catalog_imports_back_unchanged(
+    engine, session, make_product, format
+):
+    mouse = make_product("Mouse", brand="", stock_quantity=5)
+    make_product("USB Cable", type="cable", brand="", price=4.5)
+    TagService(session).add_tags_to_product(mouse.id, ["Wireless", "Gaming"])
+    export_use_case = ExportUseCase(engine)
+
+    exported = b"".join(export_use_case.export_products(format))
+    response = get_import_use_case(session).import_products(
+        io.BytesIO(exported), format
+    )
+    assert (response.imported_count, response.failed_count) == (2, 0)
+
+    # the copies differ from the originals in their ids only
+    products = [
+        json.loads(line)
+        for line in b"".join(export_use_case.export_products()).splitlines()
+    ]
+    for product in products:
+        del product["id"]
+    assert products[2:] == products[:2]
+    assert products[0]["type"] == "mouse"
+    assert products[0]["tags"] == ["Wireless", "Gaming"]
+
+
+def test_import_route_reads_the_body_and_rejects_unknown_formats(make_client):
+    client = make_client(router)
+
+    response = client.post(
+        "/stock/products/import",
+        params={"format": "csv"},
+        content=CSV_HEADER + "Mouse,mouse,10,5,1,\n",
+    )
+    assert response.status_code == 200
+    assert response.json()["imported_count"] == 1
+
+    response = client.post(
+        "/stock/products/import", params={"format": "xlsx"}, content=b""
+    )
+    assert response.status_code == 400
+    assert "Unsupported import format" in response.json()["detail"]
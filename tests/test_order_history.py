@@ -0,0 +1,96 @@
+from datetime import date, datetime, timedelta
+import pytest
+from app.models import Order, OrderProduct
+from app.core.factories import get_sales_use_case
+
+DAY = datetime(2026, 3, 10, 12, 0)
+
+
+@pytest.fixture
+def orders(session, make_product, make_user):
+    ada, bob = make_user("Ada"), make_user("Bob")
+    mouse, pad = make_product("Mouse"), make_product("Pad")
+    placed = []
+    # two orders share each timestamp, so pages split ties by id
+    for age, user, lines in [
+        (0, ada, [(mouse, 1)]),
+        (0, bob, [(pad, 2)]),
+        (1, ada, [(mouse, 1), (pad, 1)]),
+        (1, ada, [(pad, 3)]),
+        (2, bob, [(mouse, 4)]),
+    ]:
+        order = Order(user_id=user.id, final_price=1.0, date=DAY - timedelta(age))
+        session.add(order)
+        session.flush()
+        for product, quantity in lines:
+            session.add(
+                OrderProduct(
+                    order_id=order.id, product_id=product.id, quantity=quantity
+                )
+            )
+        placed.append(order.id)
+    session.commit()
+    return placed, (ada, bob), (mouse, pad)
+
+
+def walk(list_page, limit: int, *args, **filters) -> list[list[int]]:
+    pages, cursor = [], None
+    while True:
+        page = list_page(*args, cursor=cursor, limit=limit, **filters)
+        pages.append([order.id for order in page.items])
+        cursor = page.next_cursor
+        if cursor is None:
+            return pages
+
+
+def test_orders_page_newest_first_with_ties_broken_by_id(session, orders):
+    placed, _, _ = orders
+    sales_use_case = get_sales_use_case(session)
+
+    pages = walk(sales_use_case.get_orders, 2)
+    assert pages == [
+        [placed[1], placed[0]],
+        [placed[3], placed[2]],
+        [placed[4]],
+    ]
+
+
+def test_orders_filter_by_user_product_and_days(session, orders):
+    placed, (ada, bob), (mouse, pad) = orders
+    sales_use_case = get_sales_use_case(session)
+
+    assert walk(sales_use_case.get_user_orders, 1, ada.id) == [
+        [placed[0]],
+        [placed[3]],
+        [placed[2]],
+    ]
+    assert walk(sales_use_case.get_product_orders, 10, mouse.id) == [
+        [placed[0], placed[2], placed[4]]
+    ]
+    # both ends of the range are whole days
+    yesterday = (DAY - timedelta(1)).date()
+    page = sales_use_case.get_orders(start=yesterday, end=yesterday)
+    assert [order.id for order in page.items] == [placed[3], placed[2]]
+
+
+def test_orders_come_with_their_lines_and_product_names(session, orders):
+    placed, _, (mouse, pad) = orders
+    page = get_sales_use_case(session).get_orders(start=DAY.date() - timedelta(1))
+
+    order = next(item for item in page.items if item.id == placed[2])
+    assert [(line.product_name, line.quantity) for line in order.lines] == [
+        ("Mouse", 1),
+        ("Pad", 1),
+    ]
+
+
+def test_order_history_rejects_bad_requests(session, orders):
+    sales_use_case = get_sales_use_case(session)
+    with pytest.raises(ValueError, match="Invalid pagination cursor"):
+        sales_use_case.get_orders(cursor="bm9wZQ==")
+    with pytest.raises(ValueError, match="Start date cannot be after end date"):
+        sales_use_case.get_orders(start=date(2026, 3, 2), end=date(2026, 3, 1))
+    with pytest.raises(ValueError, match="User with ID 999 not found"):
+        sales_use_case.get_user_orders(999)
+    with pytest.raises(ValueError, match="Product with id 999 not found"):
+        sales_use_case.get_product_orders(999)
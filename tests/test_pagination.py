@@ -0,0 +1,125 @@
+import itertools
+from datetime import datetime
+import pytest
+from app.core.cache.catalog import catalog_snapshot
+from app.core.factories import get_sales_use_case, get_stock_use_case
+from app.core.pagination import (
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    decode_date_cursor,
+    encode_cursor,
+    encode_date_cursor,
+    parse_fields,
+    validate_page_size,
+)
+
+
+def all_pages(list_page, limit: int, **params) -> list[list[dict]]:
+    pages, cursor = [], None
+    while True:
+        page = list_page(cursor=cursor, limit=limit, **params)
+        pages.append(page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            return pages
+
+
+def test_cursors_round_trip_their_sort_keys():
+    assert decode_cursor(encode_cursor("Mouse é", 42)) == ("Mouse é", 42)
+    date = datetime(2026, 1, 2, 3, 4, 5, 600)
+    assert decode_date_cursor(encode_date_cursor(date, 7)) == (date, 7)
+    assert decode_cursor(None) is None
+    assert decode_cursor("") is None
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    ["not base64 json!", encode_date_cursor(datetime(2026, 1, 1), 1)[:-2], "W10="],
+)
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid pagination cursor"):
+        decode_cursor(cursor)
+
+
+def test_a_product_cursor_is_not_a_date_cursor():
+    with pytest.raises(ValueError, match="Invalid pagination cursor"):
+        decode_date_cursor(encode_cursor("Mouse", 1))
+
+
+def test_fields_and_page_sizes_are_validated():
+    allowed = ("id", "name", "price")
+    assert parse_fields(None, allowed) == allowed
+    assert parse_fields(" name, id,name ", allowed) == ("name", "id")
+    with pytest.raises(ValueError, match="Unknown fields"):
+        parse_fields("name,secret", allowed)
+    assert validate_page_size(MAX_PAGE_SIZE + 1) == MAX_PAGE_SIZE
+    with pytest.raises(ValueError, match="Limit must be positive"):
+        validate_page_size(0)
+
+
+def test_in_stock_pages_cover_the_listing_once_in_name_order(session, make_product):
+    for name in ["Mouse", "Cable", "Mouse", "Pad", "Hub", "Cable", "Dock"]:
+        make_product(name)
+    make_product("Empty", stock_quantity=0)
+    stock_use_case = get_stock_use_case(session)
+
+    pages = all_pages(stock_use_case.get_all_products_in_stock, 3)
+    assert [len(page) for page in pages] == [3, 3, 1]
+    items = list(itertools.chain(*pages))
+    # equal names are ordered by id
+    assert [(item["name"], item["id"]) for item in items] == sorted(
+        (item["name"], item["id"]) for item in items
+    )
+    assert [item["name"] for item in items] == [
+        "Cable",
+        "Cable",
+        "Dock",
+        "Hub",
+        "Mouse",
+        "Mouse",
+        "Pad",
+    ]
+
+
+def test_pages_select_only_the_requested_fields(session, make_product):
+    make_product("Mouse")
+    sales_use_case = get_sales_use_case(session)
+
+    page = sales_use_case.get_available_products(fields="name,price")
+    assert page.items == [{"name": "Mouse", "price": 10.0}]
+    assert page.next_cursor is None
+    with pytest.raises(ValueError, match="Unknown fields"):
+        sales_use_case.get_available_products(fields="brand")
+
+
+def test_a_cursor_stays_valid_across_writes(session, make_product):
+    for name in ["Cable", "Hub", "Mouse", "Pad"]:
+        make_product(name)
+    stock_use_case = get_stock_use_case(session)
+    first = stock_use_case.get_all_products_in_stock(limit=2, fields="name")
+    assert first.items == [{"name": "Cable"}, {"name": "Hub"}]
+
+    # products sorting before the cursor do not shift the next page
+    make_product("Adapter")
+    catalog_snapshot.clear()
+    rest = stock_use_case.get_all_products_in_stock(
+        cursor=first.next_cursor, limit=2, fields="name"
+    )
+    assert rest.items == [{"name": "Mouse"}, {"name": "Pad"}]
+    assert rest.next_cursor is None
+
+
+@pytest.mark.parametrize("matching", [[0], [1, 4], list(range(12))])
+def test_sparse_and_dense_pages_agree_with_a_sort(session, make_product, matching):
+    products = [make_product(f"Item {i % 5}") for i in range(12)]
+    bitmap = sum(1 << products[i].id for i in matching)
+    expected = sorted((products[i].name, products[i].id) for i in matching)
+
+    seen, after = [], None
+    while True:
+        rows = catalog_snapshot.get_page(session, bitmap, after, 2)
+        if not rows:
+            break
+        seen += [(row.name, row.id) for row in rows]
+        after = seen[-1]
+    assert seen == expected
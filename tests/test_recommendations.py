@@ -0,0 +1,173 @@
+import threading
+import time
+import pytest
+from sqlmodel import Session
+from app.core.cache.recommendations import RecommendationEngine, recommendation_engine
+from app.core.factories import (
+    get_sales_use_case,
+    get_stock_use_case,
+    get_tag_use_case,
+)
+from app.core.services.tag_service import TagService
+from app.dtos import AddFavoriteTagInput, BatchRestockInput
+
+
+@pytest.fixture
+def catalog(session, make_product, make_user):
+    service = TagService(session)
+    products = {
+        "mouse": make_product("Mouse"),
+        "headset": make_product("Headset"),
+        "keyboard": make_product("Keyboard", stock_quantity=0),
+        "cable": make_product("Cable"),
+    }
+    service.add_tags_to_product(products["mouse"].id, ["Wireless", "Gaming"])
+    service.add_tags_to_product(products["headset"].id, ["Wireless"])
+    service.add_tags_to_product(products["keyboard"].id, ["Wireless", "Gaming"])
+    service.add_tags_to_product(products["cable"].id, ["Wired"])
+    user = make_user()
+    service.add_favorite_tag(user.id, "Wireless")
+    service.add_favorite_tag(user.id, "Gaming")
+    return products, user
+
+
+def recommended(session, user_id: int) -> list[str]:
+    response = get_tag_use_case(session).get_recommended_products(user_id)
+    return [product["name"] for product in response.products]
+
+
+# counts full builds of the shared engine
+@pytest.fixture
+def builds(monkeypatch):
+    calls = []
+    build = recommendation_engine._build
+
+    def counting_build(session):
+        calls.append(session)
+        build(session)
+
+    monkeypatch.setattr(recommendation_engine, "_build", counting_build)
+    return calls
+
+
+def test_ranks_by_tag_overlap_then_stock(session, catalog):
+    products, user = catalog
+    response = get_tag_use_case(session).get_recommended_products(user.id)
+
+    # Mouse and Keyboard share both tags, the in-stock one ranks first
+    names = [product["name"] for product in response.products]
+    assert names == ["Mouse", "Keyboard", "Headset"]
+    scores = [product["score"] for product in response.products]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_rarer_tags_weigh_more(session, catalog, make_user):
+    products, _ = catalog
+    service = TagService(session)
+    user = make_user("Grace")
+    service.add_favorite_tag(user.id, "Wireless")
+    service.add_favorite_tag(user.id, "Wired")
+
+    # one product is Wired, three are Wireless: Cable outranks the others
+    assert recommended(session, user.id)[0] == "Cable"
+
+
+def test_tag_writes_update_rankings_without_a_full_rebuild(session, catalog, builds):
+    products, user = catalog
+    service = TagService(session)
+    assert recommended(session, user.id) == ["Mouse", "Keyboard", "Headset"]
+
+    service.add_tags_to_product(products["cable"].id, ["Gaming", "Wireless"])
+    service.remove_tags_from_product(products["mouse"].id, ["Gaming"])
+    service.bulk_update_product_tags([products["headset"].id], ["Gaming"], [])
+
+    ranked = recommendation_engine.recommend(session, user.id, 10)
+    assert ranked == RecommendationEngine().recommend(session, user.id, 10)
+    assert recommended(session, user.id) == ["Headset", "Cable", "Keyboard", "Mouse"]
+    assert len(builds) == 1
+
+
+def test_favorite_changes_rerank_the_user(session, catalog, builds):
+    products, user = catalog
+    tag_use_case = get_tag_use_case(session)
+    assert recommended(session, user.id) == ["Mouse", "Keyboard", "Headset"]
+
+    tag_use_case.add_favorite_tag(
+        AddFavoriteTagInput(user_id=user.id, tag_name="Wired")
+    )
+    assert "Cable" in recommended(session, user.id)
+    TagService(session).remove_favorite_tag(user.id, "Wireless")
+    TagService(session).remove_favorite_tag(user.id, "Wired")
+    assert recommended(session, user.id) == ["Mouse", "Keyboard"]
+    assert len(builds) == 1
+
+
+def test_removed_products_leave_the_rankings(session, catalog, builds):
+    products, user = catalog
+    assert recommended(session, user.id) == ["Mouse", "Keyboard", "Headset"]
+
+    recommendation_engine.remove_product(products["mouse"].id)
+    assert recommended(session, user.id) == ["Keyboard", "Headset"]
+    assert len(builds) == 1
+
+
+def test_restocks_and_sales_rerank_without_a_rebuild(session, catalog, builds):
+    products, user = catalog
+    keyboard = products["keyboard"]
+    assert recommended(session, user.id) == ["Mouse", "Keyboard", "Headset"]
+
+    # back in stock, Keyboard ties with Mouse; the lower id ranks first
+    get_stock_use_case(session).restock_products(
+        BatchRestockInput(items=[{"product_id": keyboard.id, "quantity": 5}])
+    )
+    scores = recommendation_engine.recommend(session, user.id, 2)
+    assert scores[0][1] == scores[1][1]
+
+    # its recent sales now put it ahead
+    get_sales_use_case(session).simple_sale(user.id, [keyboard.id], [2])
+    assert recommended(session, user.id) == ["Keyboard", "Mouse", "Headset"]
+    assert len(builds) == 1
+
+
+def test_concurrent_readers_share_one_build(engine, session, catalog):
+    _, user = catalog
+    # read on this thread: the session and its objects are not shared with readers
+    user_id = user.id
+    recommendations = RecommendationEngine()
+    build = recommendations._build
+    calls = []
+
+    def slow_build(session):
+        calls.append(session)
+        time.sleep(0.05)
+        build(session)
+
+    recommendations._build = slow_build
+    barrier = threading.Barrier(4)
+    results = []
+
+    def read():
+        with Session(engine) as reader_session:
+            barrier.wait()
+            results.append(recommendations.recommend(reader_session, user_id, 10))
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 4 and all(result == results[0] for result in results)
+
+
+def test_matrices_are_rebuilt_once_stale(session, catalog, builds):
+    _, user = catalog
+    recommended(session, user.id)
+    recommendation_engine.refresh_seconds = 0
+    try:
+        time.sleep(0.01)
+        recommended(session, user.id)
+    finally:
+        recommendation_engine.refresh_seconds = 300
+    assert len(builds) == 2
@@ -0,0 +1,78 @@
+from datetime import date, datetime, time, timedelta
+import pytest
+from app.models import Order, OrderProduct
+from app.core.factories import get_stock_use_case
+from app.dtos import ReserveStockInput
+
+
+# sells units_per_day of a product on each of the last days, today included
+def sell_daily(session, user, product, units_per_day: int, days: int) -> None:
+    today = datetime.combine(date.today(), time(hour=0, minute=30))
+    for age in range(days):
+        order = Order(user_id=user.id, final_price=0.0, date=today - timedelta(age))
+        session.add(order)
+        session.flush()
+        session.add(
+            OrderProduct(
+                order_id=order.id, product_id=product.id, quantity=units_per_day
+            )
+        )
+    session.commit()
+
+
+def suggestions(response) -> dict[str, tuple]:
+    return {
+        item.name: (
+            item.available_quantity,
+            item.days_until_stockout,
+            item.suggested_min_stock_level,
+            item.suggested_reorder_quantity,
+        )
+        for item in response.products
+    }
+
+
+def test_report_projects_stockout_from_the_sales_velocity(
+    session, make_product, make_user
+):
+    user = make_user()
+    mouse = make_product("Mouse", stock_quantity=20)
+    pad = make_product("Pad", stock_quantity=30)
+    make_product("Idle", stock_quantity=1)
+    sell_daily(session, user, mouse, 4, 28)
+    sell_daily(session, user, pad, 1, 28)
+
+    response = get_stock_use_case(session).get_reorder_report(
+        lead_time_days=5, coverage_days=10
+    )
+    # most urgent first, products without sales are left out
+    assert [item.name for item in response.products] == ["Mouse", "Pad"]
+    assert response.products[0].daily_velocity == pytest.approx(4)
+    assert suggestions(response) == {
+        "Mouse": (20, 5.0, 20, 40),
+        "Pad": (30, 30.0, 5, 0),
+    }
+
+
+def test_reserved_units_count_as_gone(session, make_product, make_user):
+    user = make_user()
+    mouse = make_product("Mouse", stock_quantity=20)
+    sell_daily(session, user, mouse, 4, 28)
+    stock_use_case = get_stock_use_case(session)
+    stock_use_case.reserve_stock(
+        ReserveStockInput(
+            cart_id="cart-1", user_id=user.id, product_id=mouse.id, quantity=12
+        )
+    )
+
+    response = stock_use_case.get_reorder_report(lead_time_days=5, coverage_days=10)
+    assert response.products[0].current_stock == 20
+    assert suggestions(response) == {"Mouse": (8, 2.0, 20, 52)}
+
+
+def test_report_validates_its_windows(session):
+    stock_use_case = get_stock_use_case(session)
+    with pytest.raises(ValueError, match="Window must be between"):
+        stock_use_case.get_reorder_report(window_days=0)
+    with pytest.raises(ValueError, match="cannot be negative"):
+        stock_use_case.get_reorder_report(lead_time_days=-1)
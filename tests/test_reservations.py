@@ -0,0 +1,184 @@
+import time
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import text
+from sqlmodel import create_engine, select
+from app.database import init_database
+from app.models import Product, StockReservation
+from app.core.cache.reservations import ReservationBook, reservation_book
+from app.core.factories import get_sales_use_case, get_stock_use_case
+from app.core.services.reservation_service import ReservationService
+from app.dtos import ReserveStockInput
+
+
+def reserve(
+    session, user_id: int, cart_id: str, product_id: int, quantity: int, **fields
+):
+    return get_stock_use_case(session).reserve_stock(
+        ReserveStockInput(
+            cart_id=cart_id,
+            user_id=user_id,
+            product_id=product_id,
+            quantity=quantity,
+            **fields,
+        )
+    )
+
+
+def stock(session, product_id: int) -> int:
+    session.expire_all()
+    return session.get(Product, product_id).stock_quantity
+
+
+def test_reserved_units_are_kept_from_sales_and_other_carts(
+    session, make_product, make_user
+):
+    user = make_user()
+    mouse = make_product(stock_quantity=5)
+    response = reserve(session, user.id, "cart-1", mouse.id, 3)
+    assert response.available_quantity == 2
+
+    sales_use_case = get_sales_use_case(session)
+    with pytest.raises(ValueError, match="Available: 2, requested: 3"):
+        sales_use_case.simple_sale(user.id, [mouse.id], [3])
+    with pytest.raises(ValueError, match="Only 2 units of product"):
+        reserve(session, user.id, "cart-2", mouse.id, 3)
+    # a cart may replace its own hold with up to all the unreserved stock
+    assert reserve(session, user.id, "cart-1", mouse.id, 5).available_quantity == 0
+
+    status = get_stock_use_case(session).get_stock_status(mouse.id)
+    assert (status.reserved_quantity, status.available_quantity) == (5, 0)
+    assert stock(session, mouse.id) == 5
+
+
+def test_checkout_sells_the_held_units_and_consumes_the_holds(
+    session, make_product, make_user
+):
+    user = make_user()
+    mouse = make_product("Mouse", stock_quantity=4)
+    pad = make_product("Pad", stock_quantity=2)
+    reserve(session, user.id, "cart-1", mouse.id, 3)
+    reserve(session, user.id, "cart-1", pad.id, 1)
+    reserve(session, user.id, "cart-2", pad.id, 1)
+
+    result = get_sales_use_case(session).checkout_cart(user.id, "cart-1")
+    assert sorted((p["name"], p["quantity"]) for p in result.products_sold) == [
+        ("Mouse", 3),
+        ("Pad", 1),
+    ]
+    assert (stock(session, mouse.id), stock(session, pad.id)) == (1, 1)
+    assert reservation_book.cart(session, "cart-1") == {}
+    assert reservation_book.reserved(session, pad.id) == 1
+    carts = session.exec(select(StockReservation.cart_id)).all()
+    assert carts == ["cart-2"]
+    with pytest.raises(ValueError, match="has no active reservations"):
+        get_sales_use_case(session).checkout_cart(user.id, "cart-1")
+
+
+def test_released_holds_free_the_stock(session, make_product, make_user):
+    user = make_user()
+    mouse = make_product(stock_quantity=5)
+    reserve(session, user.id, "cart-1", mouse.id, 5)
+
+    released = get_stock_use_case(session).release_reservations("cart-1")
+    assert [(item.product_id, item.quantity) for item in released.items] == [
+        (mouse.id, 5)
+    ]
+    assert reserve(session, user.id, "cart-2", mouse.id, 5).available_quantity == 0
+
+
+def test_holds_expire_after_their_ttl(session, make_product):
+    mouse = make_product(stock_quantity=5)
+    book = ReservationBook()
+    book.load(session)
+    expires_at = datetime.now() + timedelta(seconds=0.2)
+    book.reserve(session, "cart-1", 1, mouse.id, 3, 5, expires_at)
+    book.reserve(session, "cart-2", 1, mouse.id, 1, 5, expires_at + timedelta(hours=1))
+    assert book.reserved(session, mouse.id) == 4
+
+    time.sleep(0.3)
+    assert book.reserved(session, mouse.id) == 1
+    assert book.cart(session, "cart-1") == {}
+
+
+def test_a_replaced_hold_keeps_its_new_expiry(session, make_product):
+    mouse = make_product(stock_quantity=5)
+    book = ReservationBook()
+    book.load(session)
+    soon = datetime.now() + timedelta(seconds=0.2)
+    book.reserve(session, "cart-1", 1, mouse.id, 1, 5, soon)
+    book.reserve(session, "cart-1", 1, mouse.id, 2, 5, soon + timedelta(hours=1))
+
+    # the heap entry of the replaced hold comes due and is skipped
+    time.sleep(0.3)
+    assert book.reserved(session, mouse.id) == 2
+
+
+def test_the_book_is_rebuilt_from_unexpired_rows(session, make_product, make_user):
+    user = make_user()
+    mouse = make_product(stock_quantity=5)
+    reserve(session, user.id, "cart-1", mouse.id, 2)
+    reserve(session, user.id, "cart-2", mouse.id, 1)
+    stale = session.get(StockReservation, ("cart-2", mouse.id))
+    stale.expires_at = datetime.now() - timedelta(minutes=1)
+    session.add(stale)
+    session.commit()
+
+    # a restart: only the unexpired hold is loaded
+    reservation_book.clear()
+    assert reservation_book.reserved(session, mouse.id) == 2
+    assert ReservationService(session).purge_expired() == 1
+    assert session.exec(select(StockReservation.cart_id)).all() == ["cart-1"]
+
+
+def test_reservations_validate_quantity_and_ttl(session, make_product, make_user):
+    user = make_user()
+    mouse = make_product()
+    with pytest.raises(ValueError, match="Invalid quantity: 0"):
+        reserve(session, user.id, "cart-1", mouse.id, 0)
+    with pytest.raises(ValueError, match="TTL must be between"):
+        reserve(session, user.id, "cart-1", mouse.id, 1, ttl_seconds=0)
+    with pytest.raises(ValueError, match="Product with id 999 not found"):
+        reserve(session, user.id, "cart-1", 999, 1)
+    with pytest.raises(ValueError, match="User with ID 999 not found"):
+        reserve(session, 999, "cart-1", mouse.id, 1)
+
+
+def test_only_the_owner_may_add_to_or_check_out_a_cart(
+    session, make_product, make_user
+):
+    owner = make_user("Ada")
+    other = make_user("Bob")
+    mouse = make_product(stock_quantity=5)
+    reserve(session, owner.id, "cart-1", mouse.id, 2)
+
+    with pytest.raises(ValueError, match="belongs to another user"):
+        reserve(session, other.id, "cart-1", mouse.id, 3)
+    with pytest.raises(ValueError, match="belongs to another user"):
+        get_sales_use_case(session).checkout_cart(other.id, "cart-1")
+    assert stock(session, mouse.id) == 5
+
+    # the owner survives a restart of the book
+    reservation_book.clear()
+    with pytest.raises(ValueError, match="belongs to another user"):
+        get_sales_use_case(session).checkout_cart(other.id, "cart-1")
+    result = get_sales_use_case(session).checkout_cart(owner.id, "cart-1")
+    assert (result.user_id, stock(session, mouse.id)) == (owner.id, 3)
+
+
+def test_init_database_recreates_a_reservation_table_without_owners(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE stockreservation (cart_id VARCHAR(255), "
+                "product_id INTEGER, quantity INTEGER, expires_at DATETIME, "
+                "created_at DATETIME, PRIMARY KEY (cart_id, product_id))"
+            )
+        )
+
+    init_database(engine)
+    with engine.connect() as connection:
+        columns = connection.execute(text("PRAGMA table_info(stockreservation)"))
+        assert "user_id" in [row.name for row in columns]
+    engine.dispose()
@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy import text
+from app.database import init_search_index
+from app.core.factories import get_catalog_use_case
+from app.core.services.search_service import SearchService
+from app.core.services.tag_service import TagService
+
+
+def names(response) -> list[str]:
+    return [result.name for result in response.results]
+
+
+def test_match_queries_quote_every_word_as_a_prefix():
+    assert SearchService.build_match_query('wire* "mouse" AND') == (
+        '"wire"* "mouse"* "AND"*'
+    )
+    assert SearchService.build_match_query("  -- ") is None
+
+
+def test_search_matches_prefixes_across_name_brand_type_and_tags(session, make_product):
+    mouse = make_product("Wireless Mouse", brand="Logi")
+    make_product("Keyboard", type="keyboard", brand="Keychron")
+    make_product("Cable", type="cable", brand="Anker")
+    TagService(session).add_tags_to_product(mouse.id, ["Ergonomic"])
+    catalog_use_case = get_catalog_use_case(session)
+
+    assert names(catalog_use_case.search_products("wire")) == ["Wireless Mouse"]
+    assert names(catalog_use_case.search_products("keych")) == ["Keyboard"]
+    assert names(catalog_use_case.search_products("cable anker")) == ["Cable"]
+    assert names(catalog_use_case.search_products("ergo")) == ["Wireless Mouse"]
+    assert names(catalog_use_case.search_products("mouse keyboard")) == []
+
+
+def test_search_ranks_name_matches_first_and_highlights_them(session, make_product):
+    make_product("Pad", brand="Gaming Co")
+    make_product("Gaming Mouse", brand="Acme")
+    catalog_use_case = get_catalog_use_case(session)
+
+    response = catalog_use_case.search_products("gaming")
+    assert names(response) == ["Gaming Mouse", "Pad"]
+    assert response.results[0].highlighted_name == "<mark>Gaming</mark> Mouse"
+    assert response.results[0].score > response.results[1].score
+
+
+def test_search_pages_with_limit_and_offset(session, make_product):
+    for i in range(5):
+        make_product(f"Mouse {i}")
+    catalog_use_case = get_catalog_use_case(session)
+
+    first = catalog_use_case.search_products("mouse", limit=2)
+    second = catalog_use_case.search_products("mouse", limit=2, offset=2)
+    assert first.total == second.total == 5
+    assert len(first.results) == len(second.results) == 2
+    assert not set(names(first)) & set(names(second))
+
+
+def test_index_follows_product_and_tag_writes(session, make_product):
+    product = make_product("Mouse", type="pointer")
+    service = TagService(session)
+    catalog_use_case = get_catalog_use_case(session)
+
+    service.add_tags_to_product(product.id, ["Bluetooth"])
+    assert names(catalog_use_case.search_products("bluetooth")) == ["Mouse"]
+    service.remove_tags_from_product(product.id, ["Bluetooth"])
+    assert names(catalog_use_case.search_products("bluetooth")) == []
+
+    product.name = "Trackball"
+    session.add(product)
+    session.commit()
+    assert names(catalog_use_case.search_products("mouse")) == []
+    assert names(catalog_use_case.search_products("track")) == ["Trackball"]
+
+    session.delete(product)
+    session.commit()
+    assert catalog_use_case.search_products("track").total == 0
+
+
+def test_missing_index_is_rebuilt_from_the_products(engine, session, make_product):
+    make_product("Mouse")
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE product_search_sync"))
+        connection.execute(text("DELETE FROM product_search"))
+
+    init_search_index(engine)
+    assert names(get_catalog_use_case(session).search_products("mouse")) == ["Mouse"]
+
+
+def test_search_validates_its_input(session):
+    catalog_use_case = get_catalog_use_case(session)
+    with pytest.raises(ValueError, match="cannot be empty"):
+        catalog_use_case.search_products("  ")
+    with pytest.raises(ValueError, match="Limit must be positive"):
+        catalog_use_case.search_products("mouse", limit=0)
+    with pytest.raises(ValueError, match="Offset cannot be negative"):
+        catalog_use_case.search_products("mouse", offset=-1)
+    # punctuation only: no terms to match, not an FTS5 syntax error
+    assert catalog_use_case.search_products('"*').total == 0
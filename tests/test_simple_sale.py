@@ -0,0 +1,123 @@
+from types import SimpleNamespace
+import pytest
+from sqlmodel import Session, func, select
+from app.models import Order, OrderProduct, Product
+from app.core.cache.catalog import catalog_snapshot
+from app.core.factories import get_sales_use_case
+
+
+def stock(session, product_id: int) -> int:
+    session.expire_all()
+    return session.get(Product, product_id).stock_quantity
+
+
+def order_lines(session, order_id: int) -> list[tuple[int, int]]:
+    return session.exec(
+        select(OrderProduct.product_id, OrderProduct.quantity)
+        .where(OrderProduct.order_id == order_id)
+        .order_by(OrderProduct.id)
+    ).all()
+
+
+def test_unordered_ids_are_priced_by_product(session, make_product, make_user):
+    user = make_user()
+    mouse = make_product("Mouse", price=10.0)
+    cable = make_product("Cable", price=2.0)
+
+    result = get_sales_use_case(session).simple_sale(
+        user.id, [cable.id, mouse.id], [3, 1]
+    )
+    assert [(p["name"], p["total"]) for p in result.products_sold] == [
+        ("Cable", 6.0),
+        ("Mouse", 10.0),
+    ]
+    assert result.total_price == 16.0
+    assert order_lines(session, result.order_id) == [(cable.id, 3), (mouse.id, 1)]
+
+
+def test_a_repeated_product_takes_its_stock_once_for_all_lines(
+    session, make_product, make_user
+):
+    user = make_user(is_member=True)
+    mouse = make_product(price=10.0, stock_quantity=5)
+    sales_use_case = get_sales_use_case(session)
+
+    result = sales_use_case.simple_sale(user.id, [mouse.id, mouse.id], [1, 3])
+    assert result.total_price == pytest.approx(28.0)
+    assert order_lines(session, result.order_id) == [(mouse.id, 1), (mouse.id, 3)]
+    assert stock(session, mouse.id) == 1
+
+    # the repeated lines are checked against the stock together
+    with pytest.raises(ValueError, match="Available: 1, requested: 2"):
+        sales_use_case.simple_sale(user.id, [mouse.id, mouse.id], [1, 1])
+
+
+def test_stock_sold_meanwhile_fails_the_whole_sale(
+    engine, session, make_product, make_user, monkeypatch
+):
+    user = make_user()
+    mouse = make_product("Mouse", stock_quantity=5)
+    cable = make_product("Cable", stock_quantity=5)
+    sales_use_case = get_sales_use_case(session)
+    check_stock = sales_use_case._check_stock
+
+    # another sale takes the cables between the stock check and the update
+    def check_then_sell_elsewhere(product_map, cart_id):
+        check_stock(product_map, cart_id)
+        with Session(engine) as other:
+            other.get(Product, cable.id).stock_quantity = 1
+            other.commit()
+
+    monkeypatch.setattr(sales_use_case, "_check_stock", check_then_sell_elsewhere)
+    with pytest.raises(ValueError, match="Insufficient stock for product ID"):
+        sales_use_case.simple_sale(user.id, [mouse.id, cable.id], [2, 2])
+
+    assert session.exec(select(func.count()).select_from(Order)).one() == 0
+    assert session.exec(select(func.count()).select_from(OrderProduct)).one() == 0
+    assert (stock(session, mouse.id), stock(session, cable.id)) == (5, 1)
+
+
+def test_create_order_shares_the_sale_path(session, make_product, make_user):
+    user = make_user()
+    mouse = make_product("Mouse", price=10.0, stock_quantity=5)
+    cable = make_product("Cable", price=2.0, stock_quantity=5)
+    sales_use_case = get_sales_use_case(session)
+    order = SimpleNamespace(
+        user_id=user.id,
+        name=None,
+        products=[
+            SimpleNamespace(product_id=cable.id, quantity=2),
+            SimpleNamespace(product_id=mouse.id, quantity=1),
+        ],
+    )
+
+    invoice = sales_use_case.create_order(order)
+    assert "Cable" in invoice
+    assert (stock(session, mouse.id), stock(session, cable.id)) == (4, 3)
+    order_id = session.exec(select(Order.id)).one()
+    assert order_lines(session, order_id) == [(cable.id, 2), (mouse.id, 1)]
+
+    order.products = [SimpleNamespace(product_id=mouse.id + 100, quantity=1)]
+    with pytest.raises(ValueError, match="Order creation failed: Products not found"):
+        sales_use_case.create_order(order)
+
+
+def test_a_committed_sale_returns_its_result_when_publishing_fails(
+    session, make_product, make_user, monkeypatch, caplog
+):
+    user = make_user()
+    mouse = make_product(stock_quantity=5)
+    catalog_snapshot.load(session)
+    sales_use_case = get_sales_use_case(session)
+
+    def fail(product_ids):
+        raise RuntimeError("index unavailable")
+
+    monkeypatch.setattr(sales_use_case.co_purchase, "add_order", fail)
+    result = sales_use_case.simple_sale(user.id, [mouse.id], [2])
+
+    assert order_lines(session, result.order_id) == [(mouse.id, 2)]
+    assert "Publishing the sale" in caplog.text
+    # the snapshot that missed the sale is reloaded from the database
+    rows = catalog_snapshot.get_rows(session, 1 << mouse.id)
+    assert [row.stock_quantity for row in rows] == [3]
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import threading
+import pytest
+from app.core.alerts import StockAlertHub, format_sse
+from app.core.cache.catalog import IN_STOCK, LOW_STOCK, OUT_OF_STOCK, StockLevelChange
+from app.core.factories import get_sales_use_case, get_stock_use_case
+from app.routers.stock import _alert_events
+
+
+def change(product_id: int, status: str = LOW_STOCK) -> StockLevelChange:
+    return StockLevelChange(product_id, f"Product {product_id}", IN_STOCK, status, 1, 2)
+
+
+async def drain(subscription) -> list[int]:
+    events = []
+    while (event := await subscription.get(0.05)) is not None:
+        events.append(event["product_id"])
+    return events
+
+
+def test_sse_frames_name_the_event_after_the_new_status():
+    event = {"id": 7, "status": OUT_OF_STOCK, "product_id": 1}
+    frame = format_sse(event)
+    assert frame.startswith("id: 7\nevent: out_of_stock\ndata: ")
+    assert frame.endswith("\n\n")
+    assert json.loads(frame.split("data: ")[1]) == event
+
+
+@pytest.mark.asyncio
+async def test_changes_published_from_worker_threads_reach_every_subscriber():
+    hub = StockAlertHub()
+    first, second = hub.subscribe(), hub.subscribe()
+
+    publisher = threading.Thread(target=hub.publish, args=([change(1), change(2)],))
+    publisher.start()
+    publisher.join()
+    hub.publish([])
+
+    assert await drain(first) == [1, 2]
+    assert await drain(second) == [1, 2]
+    first.close()
+    assert hub.subscriber_count() == 1
+
+
+@pytest.mark.asyncio
+async def test_subscribers_that_fall_behind_are_dropped():
+    hub = StockAlertHub(queue_size=2)
+    slow, fast = hub.subscribe(), hub.subscribe()
+
+    hub.publish([change(1)])
+    assert await fast.get(1) is not None
+    hub.publish([change(2)])
+    assert await fast.get(1) is not None
+    hub.publish([change(3)])
+    await asyncio.sleep(0)
+
+    # the slow subscriber's buffer overflowed: it gets the end-of-stream marker
+    assert slow.dropped
+    assert await slow.get(1) is None
+    assert not fast.dropped
+    assert await drain(fast) == [3]
+    assert hub.subscriber_count() == 1
+
+
+@pytest.mark.asyncio
+async def test_sales_publish_stock_status_changes(session, make_product, make_user):
+    user = make_user()
+    mouse = make_product("Mouse", stock_quantity=3, min_stock_level=1)
+    pad = make_product("Pad", stock_quantity=9)
+    subscription = get_stock_use_case(session).subscribe_stock_alerts()
+    try:
+        sales_use_case = get_sales_use_case(session)
+        sales_use_case.simple_sale(user.id, [mouse.id, pad.id], [2, 1])
+        sales_use_case.simple_sale(user.id, [mouse.id], [1])
+
+        first = await subscription.get(1)
+        second = await subscription.get(1)
+        assert await subscription.get(0.05) is None
+    finally:
+        subscription.close()
+    assert (first["product_id"], first["previous_status"], first["status"]) == (
+        mouse.id,
+        IN_STOCK,
+        LOW_STOCK,
+    )
+    assert (second["status"], second["stock_quantity"]) == (OUT_OF_STOCK, 0)
+    assert second["id"] > first["id"]
+
+
+@pytest.mark.asyncio
+async def test_the_stream_ends_once_its_subscriber_is_dropped():
+    hub = StockAlertHub()
+    subscription = hub.subscribe()
+    events = _alert_events(subscription)
+
+    hub.publish([change(1, OUT_OF_STOCK)])
+    assert (await anext(events)).startswith("id: 1\nevent: out_of_stock\n")
+    subscription.close()
+    with pytest.raises(StopAsyncIteration):
+        await anext(events)
+    assert hub.subscriber_count() == 0
@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import func
+from sqlmodel import select
+from app.models import Product, StockMovement, StockSnapshot
+from app.core.factories import get_sales_use_case, get_stock_use_case
+from app.core.services.ledger_service import (
+    RESTOCK,
+    SALE,
+    StockLedgerService,
+)
+from app.dtos import BatchRestockInput
+from app.routers.stock import router
+
+NOW = datetime.now()
+
+
+def days_ago(days: float) -> datetime:
+    return NOW - timedelta(days=days)
+
+
+# moves a product's stock with movements at the given times, as the writes would
+def move(session, product: Product, changes: list[tuple[datetime, int]]) -> None:
+    for created_at, quantity_change in changes:
+        session.add(
+            StockMovement(
+                product_id=product.id,
+                quantity_change=quantity_change,
+                reason=RESTOCK,
+                created_at=created_at,
+            )
+        )
+        product.stock_quantity += quantity_change
+    session.add(product)
+    session.commit()
+
+
+def test_stock_writes_append_movements_in_their_transaction(
+    session, make_product, make_user
+):
+    user = make_user()
+    mouse = make_product("Mouse", stock_quantity=5)
+    sale = get_sales_use_case(session).simple_sale(user.id, [mouse.id], [2])
+    get_stock_use_case(session).restock_products(
+        BatchRestockInput(items=[{"product_id": mouse.id, "quantity": 4}])
+    )
+    with pytest.raises(ValueError):
+        get_sales_use_case(session).simple_sale(user.id, [mouse.id], [100])
+
+    movements = session.exec(
+        select(
+            StockMovement.quantity_change, StockMovement.reason, StockMovement.order_id
+        ).order_by(StockMovement.id)
+    ).all()
+    assert movements == [(-2, SALE, sale.order_id), (4, RESTOCK, None)]
+
+
+def test_stock_as_of_walks_back_from_the_current_stock(session, make_product):
+    mouse = make_product("Mouse", stock_quantity=0)
+    move(session, mouse, [(days_ago(3), 10), (days_ago(2), -4), (days_ago(1), 5)])
+    ledger = StockLedgerService(session)
+
+    assert ledger.stock_as_of(mouse, days_ago(3)) == 10
+    assert ledger.stock_as_of(mouse, days_ago(2.5)) == 10
+    assert ledger.stock_as_of(mouse, days_ago(1.5)) == 6
+    assert ledger.stock_as_of(mouse, NOW) == 11
+
+
+def test_stock_before_the_product_history_is_not_found(
+    session, make_product, make_client
+):
+    mouse = make_product("Mouse", stock_quantity=0)
+    move(session, mouse, [(days_ago(3), 10)])
+    # seeded rows never moved through the ledger
+    pad = make_product("Pad", stock_quantity=4)
+    client = make_client(router)
+
+    response = client.get(f"/stock/history/{mouse.id}", params={"at": days_ago(1)})
+    assert response.json()["stock_quantity"] == 10
+    response = client.get(f"/stock/history/{mouse.id}", params={"at": "2020-01-01"})
+    assert response.status_code == 404
+    assert "No stock history for product" in response.json()["detail"]
+    response = client.get(f"/stock/history/{pad.id}", params={"at": NOW})
+    assert response.status_code == 404
+
+
+def test_snapshots_cover_only_products_that_moved(session, make_product):
+    mouse = make_product("Mouse", stock_quantity=0)
+    pad = make_product("Pad", stock_quantity=0)
+    move(session, mouse, [(days_ago(3), 10)])
+    move(session, pad, [(days_ago(3), 1)])
+    ledger = StockLedgerService(session)
+
+    assert ledger.take_snapshots() == 2
+    assert ledger.take_snapshots() == 0
+    move(session, mouse, [(datetime.now(), -3)])
+    assert ledger.take_snapshots() == 1
+
+    snapshots = session.exec(
+        select(StockSnapshot.product_id, StockSnapshot.stock_quantity).order_by(
+            StockSnapshot.id
+        )
+    ).all()
+    assert snapshots == [(mouse.id, 10), (pad.id, 1), (mouse.id, 7)]
+    assert ledger.stock_as_of(mouse, datetime.now()) == 7
+
+
+def test_stock_as_of_starts_from_the_last_snapshot_before_the_time(
+    session, make_product
+):
+    mouse = make_product("Mouse", stock_quantity=0)
+    move(session, mouse, [(days_ago(5), 10)])
+    snapshot_id = session.exec(select(StockMovement.id)).one()
+    session.add(
+        StockSnapshot(
+            product_id=mouse.id,
+            stock_quantity=10,
+            movement_id=snapshot_id,
+            taken_at=days_ago(4),
+        )
+    )
+    session.commit()
+    move(session, mouse, [(days_ago(3), -2), (days_ago(1), -3)])
+    ledger = StockLedgerService(session)
+
+    assert ledger.stock_as_of(mouse, days_ago(4)) == 10
+    assert ledger.stock_as_of(mouse, days_ago(2)) == 8
+    assert ledger.stock_as_of(mouse, NOW) == 5
+
+
+def test_compaction_keeps_what_the_snapshots_do_not_cover(session, make_product):
+    mouse = make_product("Mouse", stock_quantity=0)
+    move(session, mouse, [(days_ago(100), 10), (days_ago(95), -1)])
+    covered = session.exec(select(func.max(StockMovement.id))).one()
+    session.add(
+        StockSnapshot(
+            product_id=mouse.id,
+            stock_quantity=9,
+            movement_id=covered,
+            taken_at=days_ago(94),
+        )
+    )
+    session.commit()
+    # old but taken after the snapshot, and recent movements are kept
+    move(session, mouse, [(days_ago(93), -2), (days_ago(1), 4)])
+    ledger = StockLedgerService(session)
+
+    assert ledger.compact_movements(retention_days=90) == 2
+    remaining = session.exec(
+        select(StockMovement.quantity_change).order_by(StockMovement.id)
+    ).all()
+    assert remaining == [-2, 4]
+    assert ledger.stock_as_of(mouse, days_ago(50)) == 7
+    assert ledger.stock_as_of(mouse, NOW) == 11
+    assert ledger.compact_movements(retention_days=90) == 0
@@ -0,0 +1,53 @@
+from app.core.factories import get_sales_use_case, get_stock_use_case
+from app.dtos import BatchRestockInput, BatchSetMinStockInput
+
+
+def names(page) -> list[str]:
+    return [item["name"] for item in page.items]
+
+
+def test_low_and_out_of_stock_sets_follow_every_stock_write(
+    session, make_product, make_user
+):
+    user = make_user()
+    mouse = make_product("Mouse", stock_quantity=5, min_stock_level=2)
+    cable = make_product("Cable", stock_quantity=2, min_stock_level=2)
+    make_product("Pad", stock_quantity=0)
+    stock_use_case = get_stock_use_case(session)
+    # at the minimum level is low stock, at zero only out of stock
+    assert names(stock_use_case.get_low_stock_products()) == ["Cable"]
+    assert names(stock_use_case.get_out_of_stock_products()) == ["Pad"]
+
+    get_sales_use_case(session).simple_sale(user.id, [mouse.id, cable.id], [3, 2])
+    assert names(stock_use_case.get_low_stock_products()) == ["Mouse"]
+    assert names(stock_use_case.get_out_of_stock_products()) == ["Cable", "Pad"]
+
+    stock_use_case.restock_products(
+        BatchRestockInput(items=[{"product_id": cable.id, "quantity": 1}])
+    )
+    stock_use_case.set_min_stock_levels(
+        BatchSetMinStockInput(items=[{"product_id": mouse.id, "min_level": 1}])
+    )
+    assert names(stock_use_case.get_low_stock_products()) == ["Cable"]
+    assert names(stock_use_case.get_out_of_stock_products()) == ["Pad"]
+
+
+def test_stock_level_listings_page_by_cursor(session, make_product):
+    for name in ["Pad", "Hub", "Cable", "Dock", "Mouse"]:
+        make_product(name, stock_quantity=0)
+    stock_use_case = get_stock_use_case(session)
+
+    first = stock_use_case.get_out_of_stock_products(limit=2, fields="name")
+    second = stock_use_case.get_out_of_stock_products(
+        cursor=first.next_cursor, limit=2, fields="name"
+    )
+    third = stock_use_case.get_out_of_stock_products(
+        cursor=second.next_cursor, limit=2, fields="name"
+    )
+    assert [names(first), names(second), names(third)] == [
+        ["Cable", "Dock"],
+        ["Hub", "Mouse"],
+        ["Pad"],
+    ]
+    assert third.next_cursor is None
+    assert set(first.items[0]) == {"name"}
@@ -0,0 +1,88 @@
+from sqlalchemy import delete
+from sqlmodel import Session, select
+from app.models import Tag
+from app.core.cache.commit_hooks import after_commit
+from app.core.cache.tag_cache import TagCache, tag_cache
+from app.core.services.tag_service import TagService
+
+
+def test_get_ids_resolves_names_and_serves_them_from_the_cache(session):
+    session.add_all([Tag(name="Wireless"), Tag(name="Gaming")])
+    session.commit()
+    cache = TagCache()
+
+    ids = cache.get_ids(session, ["Wireless", "Gaming", "Unknown"])
+    assert set(ids) == {"Wireless", "Gaming"}
+
+    # deleted behind the cache's back: the cached ids are still served
+    session.exec(delete(Tag))
+    session.commit()
+    assert cache.get_ids(session, ["Wireless", "Gaming"]) == ids
+    assert cache.get_names(session, list(ids.values())) == {
+        tag_id: name for name, tag_id in ids.items()
+    }
+
+
+def test_invalidate_drops_a_name_and_its_id(session):
+    session.add(Tag(name="Wireless"))
+    session.commit()
+    cache = TagCache()
+    tag_id = cache.get_id(session, "Wireless")
+
+    session.exec(delete(Tag))
+    session.commit()
+    cache.invalidate(["Wireless"])
+    assert cache.get_id(session, "Wireless") is None
+    assert cache.get_names(session, [tag_id]) == {}
+
+
+def test_tags_created_in_a_rolled_back_transaction_are_never_cached(
+    session, make_product
+):
+    product = make_product()
+    service = TagService(session)
+
+    service.bulk_update_product_tags([product.id], ["Phantom"], [], commit=False)
+    # the open transaction sees its own tag, the cache does not keep it
+    assert tag_cache.get_id(session, "Phantom") is not None
+    session.rollback()
+
+    assert tag_cache.get_id(session, "Phantom") is None
+    service.add_tags_to_product(product.id, ["Phantom"])
+    tag_id = tag_cache.get_id(session, "Phantom")
+    assert session.get(Tag, tag_id).name == "Phantom"
+
+
+def test_tags_created_by_a_committed_transaction_are_cached(session, make_product):
+    product = make_product()
+    TagService(session).add_tags_to_product(product.id, ["Wireless"])
+    tag_id = session.exec(select(Tag.id).where(Tag.name == "Wireless")).one()
+
+    session.exec(delete(Tag).where(Tag.id == tag_id))
+    session.commit()
+    assert tag_cache.get_id(session, "Wireless") == tag_id
+
+
+def test_after_commit_runs_on_commit_and_discards_on_rollback(engine):
+    log = []
+    with Session(engine) as session:
+        session.add(Tag(name="Committed"))
+        session.flush()
+        after_commit(session, lambda: log.append("commit 1"), lambda: log.append("1"))
+        session.commit()
+
+        session.add(Tag(name="Rolled back"))
+        session.flush()
+        after_commit(session, lambda: log.append("commit 2"), lambda: log.append("2"))
+        session.rollback()
+
+        session.add(Tag(name="Closed"))
+        session.flush()
+        after_commit(session, lambda: log.append("commit 3"), lambda: log.append("3"))
+    assert log == ["commit 1", "2", "3"]
+
+
+def test_after_commit_outside_a_transaction_runs_at_once(session):
+    log = []
+    after_commit(session, lambda: log.append("commit"))
+    assert log == ["commit"]
@@ -0,0 +1,78 @@
+import threading
+import pytest
+from sqlmodel import Session, select
+from app.models import Tag
+from app.core.cache.tag_cache import tag_cache
+from app.core.cache.tag_index import tag_index
+from app.core.jobs import TAG_CLEANUP_JOB
+from app.core.scheduler import MaintenanceScheduler
+from app.core.services.tag_service import TagService
+from app.core.use_cases.tag_use import TagUseCase
+
+
+def test_cleanup_deletes_only_tags_nobody_uses(session, make_product, make_user):
+    product = make_product()
+    user = make_user()
+    service = TagService(session)
+    service.add_tags_to_product(product.id, ["Wireless", "Orphan"])
+    service.add_favorite_tag(user.id, "Favorite")
+    session.add(Tag(name="Never used"))
+    session.commit()
+    orphan = tag_cache.get_id(session, "Orphan")
+    tag_index.all_products(session)
+    service.remove_tags_from_product(product.id, ["Orphan"])
+
+    assert service.cleanup_unused_tags() == 2
+
+    names = set(session.exec(select(Tag.name)))
+    assert names == {"Wireless", "Favorite"}
+    assert tag_cache.get_id(session, "Orphan") is None
+    assert tag_index.get(session, orphan) == 0
+    assert service.cleanup_unused_tags() == 0
+
+
+def test_cleanup_runs_as_a_scheduled_job(engine, session):
+    session.add(Tag(name="Orphan"))
+    session.commit()
+    ran = threading.Event()
+    scheduler = MaintenanceScheduler()
+
+    def cleanup():
+        try:
+            with Session(engine) as job_session:
+                return TagService(job_session).cleanup_unused_tags()
+        finally:
+            ran.set()
+
+    scheduler.register(TAG_CLEANUP_JOB, cleanup, interval_seconds=3600)
+    tag_use_case = TagUseCase(session, TagService(session), scheduler=scheduler)
+
+    # nothing runs before the scheduler is started and the job enqueued
+    assert tag_use_case.get_cleanup_status().last_result is None
+    scheduler.start()
+    try:
+        queued = tag_use_case.schedule_cleanup_unused_tags()
+        assert queued.queued or queued.running or queued.last_result is not None
+        assert ran.wait(timeout=5)
+    finally:
+        scheduler.stop()
+
+    status = tag_use_case.get_cleanup_status()
+    assert status.last_result == 1
+    assert status.last_error is None
+    assert status.queued is False and status.running is False
+
+
+def test_a_failing_job_reports_its_error():
+    scheduler = MaintenanceScheduler()
+
+    def fail():
+        raise RuntimeError("database is locked")
+
+    job = scheduler.register("failing", fail, interval_seconds=3600)
+    scheduler.run_job(job)
+    assert job.last_error == "database is locked"
+    assert job.running is False
+
+    with pytest.raises(ValueError, match="is not registered"):
+        scheduler.enqueue("unknown")
@@ -0,0 +1,119 @@
+import threading
+import time
+import pytest
+from sqlmodel import Session
+from app.core.cache import tag_cooccurrence as cooccurrence_module
+from app.core.cache.tag_cache import tag_cache
+from app.core.cache.tag_cooccurrence import TagCooccurrence, tag_cooccurrence
+from app.core.factories import get_tag_use_case
+from app.core.services.tag_service import TagService
+
+
+@pytest.fixture
+def tagged(session, make_product):
+    service = TagService(session)
+    products = [make_product(f"Product {i}") for i in range(3)]
+    service.add_tags_to_product(products[0].id, ["Wireless", "Gaming", "RGB"])
+    service.add_tags_to_product(products[1].id, ["Wireless", "Gaming"])
+    service.add_tags_to_product(products[2].id, ["Wireless", "Office"])
+    return [product.id for product in products]
+
+
+def related_names(session, tag_name: str) -> list[tuple[str, int]]:
+    response = get_tag_use_case(session).get_related_tags(tag_name)
+    return [(tag["name"], tag["count"]) for tag in response.related_tags]
+
+
+def test_related_tags_are_counted_over_shared_products(session, tagged):
+    assert related_names(session, "Wireless") == [
+        ("Gaming", 2),
+        ("RGB", 1),
+        ("Office", 1),
+    ]
+    assert related_names(session, "Office") == [("Wireless", 1)]
+
+
+def test_tag_writes_keep_the_counts_equal_to_a_rebuild(session, tagged):
+    service = TagService(session)
+    wireless = tag_cache.get_id(session, "Wireless")
+    tag_cooccurrence.related(session, wireless, 10)
+
+    service.add_tags_to_product(tagged[2], ["Gaming"])
+    service.remove_tags_from_product(tagged[0], ["Wireless"])
+    service.bulk_update_product_tags(tagged[1:], ["RGB"], ["Gaming"])
+
+    for name in ("Wireless", "Gaming", "RGB", "Office"):
+        tag_id = tag_cache.get_id(session, name)
+        assert tag_cooccurrence.related(session, tag_id, 10) == (
+            TagCooccurrence().related(session, tag_id, 10)
+        )
+
+
+def test_new_tags_beyond_the_dense_headroom_trigger_a_rebuild(
+    session, tagged, monkeypatch
+):
+    monkeypatch.setattr(cooccurrence_module, "DENSE_HEADROOM", 1)
+    wireless = tag_cache.get_id(session, "Wireless")
+    tag_cooccurrence.related(session, wireless, 10)
+
+    TagService(session).add_tags_to_product(tagged[0], ["New 1", "New 2"])
+
+    assert not tag_cooccurrence.loaded
+    assert ("New 2", 1) in related_names(session, "Wireless")
+
+
+def test_related_tags_validate_their_input(session, tagged):
+    tag_use_case = get_tag_use_case(session)
+    with pytest.raises(ValueError, match="not found"):
+        tag_use_case.get_related_tags("Unknown")
+    with pytest.raises(ValueError, match="Limit must be positive"):
+        tag_use_case.get_related_tags("Wireless", limit=0)
+    assert len(tag_use_case.get_related_tags("Wireless", limit=1).related_tags) == 1
+
+
+def test_tags_added_during_the_build_are_not_lost(engine, make_product, pause_read):
+    product = make_product()
+    with Session(engine) as session:
+        TagService(session).add_tags_to_product(product.id, ["Wireless"])
+    matrix = TagCooccurrence()
+
+    with Session(engine) as loader, Session(engine) as writer:
+        wireless = tag_cache.get_id(writer, "Wireless")
+        # the build has read the tags and the old pair counts
+        reached, release = pause_read(loader, nth=2)
+        build = threading.Thread(target=matrix.related, args=(loader, wireless, 10))
+        build.start()
+        assert reached.wait(5)
+
+        service = TagService(writer, cooccurrence=matrix)
+        add = threading.Thread(
+            target=service.add_tags_to_product, args=(product.id, ["Gaming"])
+        )
+        add.start()
+        time.sleep(0.1)
+        release.set()
+        build.join(5)
+        add.join(5)
+
+        gaming = tag_cache.get_id(writer, "Gaming")
+        assert matrix.related(writer, wireless, 10) == [(gaming, 1)]
+
+
+def test_an_untracked_change_committed_after_the_build_resets_the_counts(
+    engine, session, tagged
+):
+    matrix = TagCooccurrence()
+    service = TagService(session, cooccurrence=matrix)
+    wireless = tag_cache.get_id(session, "Wireless")
+
+    # the matrix is not loaded yet, so the change does not track its pairs
+    service.bulk_update_product_tags(tagged, [], ["Gaming"], commit=False)
+    with Session(engine) as reader:
+        assert (tag_cache.get_id(reader, "Gaming"), 2) in matrix.related(
+            reader, wireless, 10
+        )
+    session.commit()
+
+    assert matrix.related(session, wireless, 10) == (
+        TagCooccurrence().related(session, wireless, 10)
+    )
@@ -0,0 +1,169 @@
+import threading
+import time
+import pytest
+from sqlmodel import Session
+from app.core.cache.tag_cache import tag_cache
+from app.core.cache.tag_index import (
+    TagIndex,
+    bitmap_from_ids,
+    evaluate_tag_expression,
+    ids_from_bitmap,
+    tag_names_in_expression,
+    tokenize_tag_expression,
+)
+from app.core.factories import get_tag_use_case
+from app.core.services.tag_service import TagService
+
+
+TAGGED = {
+    "Wireless": [1, 2, 3],
+    "Gaming": [2, 3, 4],
+    "Premium": [3, 5],
+    "Noise cancelling": [1, 5],
+}
+UNIVERSE = bitmap_from_ids(range(1, 7))
+
+
+def evaluate(expression: str) -> list[int]:
+    tokens = tokenize_tag_expression(expression)
+    bitmap = evaluate_tag_expression(
+        tokens, lambda name: bitmap_from_ids(TAGGED.get(name, [])), UNIVERSE
+    )
+    return ids_from_bitmap(bitmap)
+
+
+def test_bitmaps_round_trip_product_ids():
+    assert ids_from_bitmap(bitmap_from_ids([7, 0, 64, 3])) == [0, 3, 7, 64]
+    assert bitmap_from_ids([]) == 0
+    assert ids_from_bitmap(0) == []
+
+
+def test_tokenizer_joins_words_of_a_tag_name_and_keeps_quoted_keywords():
+    tokens = tokenize_tag_expression('Noise cancelling AND NOT ("OR" OR Gaming)')
+    assert tokens == [
+        ("tag", "Noise cancelling"),
+        "AND",
+        "NOT",
+        "(",
+        ("tag", "OR"),
+        "OR",
+        ("tag", "Gaming"),
+        ")",
+    ]
+    assert tag_names_in_expression(tokens) == ["Noise cancelling", "OR", "Gaming"]
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("Wireless", [1, 2, 3]),
+        ("Wireless AND Gaming", [2, 3]),
+        ("Wireless OR Premium", [1, 2, 3, 5]),
+        ("NOT Wireless", [4, 5, 6]),
+        ("NOT NOT Wireless", [1, 2, 3]),
+        ("Wireless AND Gaming AND NOT Premium", [2]),
+        # AND binds tighter than OR
+        ("Premium OR Wireless AND Gaming", [2, 3, 5]),
+        ("(Premium OR Wireless) AND Gaming", [2, 3]),
+        ("Noise cancelling AND NOT Premium", [1]),
+        ("Unknown OR Premium", [3, 5]),
+        ("Unknown", []),
+    ],
+)
+def test_expressions_evaluate_to_the_matching_products(expression, expected):
+    assert evaluate(expression) == expected
+
+
+@pytest.mark.parametrize(
+    "expression, message",
+    [
+        ("", "cannot be empty"),
+        ("(Wireless", "Unbalanced parentheses"),
+        ("(Wireless OR Gaming", "Unbalanced parentheses"),
+        ("Wireless)", "Unexpected token"),
+        ("Wireless AND", "Expected a tag name"),
+        ("AND Wireless", "Expected a tag name"),
+        ("Wireless OR OR Gaming", "Expected a tag name"),
+        ("NOT", "Expected a tag name"),
+        ("()", "Expected a tag name"),
+    ],
+)
+def test_malformed_expressions_are_rejected(expression, message):
+    with pytest.raises(ValueError, match=message):
+        evaluate(expression)
+
+
+@pytest.fixture
+def tagged_products(session, make_product):
+    service = TagService(session)
+    products = {
+        "mouse": make_product("Mouse"),
+        "headset": make_product("Headset"),
+        "keyboard": make_product("Keyboard", stock_quantity=0),
+    }
+    service.add_tags_to_product(products["mouse"].id, ["Wireless", "Gaming"])
+    service.add_tags_to_product(products["headset"].id, ["Wireless", "Premium"])
+    service.add_tags_to_product(products["keyboard"].id, ["Wireless", "Gaming"])
+    return products
+
+
+def test_query_returns_in_stock_matches_in_id_order(session, tagged_products):
+    tag_use_case = get_tag_use_case(session)
+
+    response = tag_use_case.query_products_by_tags("Wireless AND NOT Premium")
+    assert [p["name"] for p in response.products] == ["Mouse"]
+
+    response = tag_use_case.query_products_by_tags("Gaming", in_stock_only=False)
+    assert [p["name"] for p in response.products] == ["Mouse", "Keyboard"]
+
+    response = tag_use_case.query_products_by_tags("Wireless", limit=1)
+    assert [p["name"] for p in response.products] == ["Mouse"]
+
+
+def test_query_sees_tags_added_after_the_index_was_loaded(session, tagged_products):
+    tag_use_case = get_tag_use_case(session)
+    assert tag_use_case.query_products_by_tags("Premium AND Gaming").products == []
+
+    service = TagService(session)
+    service.add_tags_to_product(tagged_products["headset"].id, ["Gaming"])
+    service.remove_tags_from_product(tagged_products["mouse"].id, ["Gaming"])
+
+    response = tag_use_case.query_products_by_tags("Gaming")
+    assert [p["name"] for p in response.products] == ["Headset"]
+
+
+def test_query_rejects_malformed_input(session, tagged_products):
+    tag_use_case = get_tag_use_case(session)
+    with pytest.raises(ValueError, match="cannot be empty"):
+        tag_use_case.query_products_by_tags("   ")
+    with pytest.raises(ValueError, match="Limit must be positive"):
+        tag_use_case.query_products_by_tags("Wireless", limit=0)
+    with pytest.raises(ValueError, match="Unbalanced parentheses"):
+        tag_use_case.query_products_by_tags("(Wireless AND Gaming")
+
+
+def test_tags_added_during_the_initial_load_are_not_lost(
+    engine, make_product, pause_read
+):
+    product = make_product()
+    index = TagIndex()
+
+    with Session(engine) as loader, Session(engine) as writer:
+        # the load has read the products and the old tag pairs
+        reached, release = pause_read(loader, nth=2)
+        load = threading.Thread(target=index.all_products, args=(loader,))
+        load.start()
+        assert reached.wait(5)
+
+        service = TagService(writer, index=index)
+        add = threading.Thread(
+            target=service.add_tags_to_product, args=(product.id, ["Gaming"])
+        )
+        add.start()
+        time.sleep(0.1)
+        release.set()
+        load.join(5)
+        add.join(5)
+
+        gaming = tag_cache.get_id(writer, "Gaming")
+        assert ids_from_bitmap(index.get(writer, gaming)) == [product.id]
@@ -0,0 +1,51 @@
+from app.core.services.tag_service import TagService
+from app.routers.tags import router
+
+
+def test_products_by_tag_pages_through_the_tagged_products(
+    session, make_product, make_client
+):
+    service = TagService(session)
+    for name in ["Mouse", "Headset", "Keyboard"]:
+        service.add_tags_to_product(make_product(name).id, ["Wireless"])
+    service.add_tags_to_product(make_product("Cable").id, ["Wired"])
+    client = make_client(router)
+
+    names, cursor = [], None
+    while True:
+        params = {"tag_name": "Wireless", "limit": 2, "fields": "name,price"}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/tags/products/by-tag", params=params)
+        assert response.status_code == 200
+        body = response.json()
+        assert all(set(product) == {"name", "price"} for product in body["products"])
+        names += [product["name"] for product in body["products"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert names == ["Headset", "Keyboard", "Mouse"]
+
+
+def test_products_by_tag_rejects_bad_input(session, make_product, make_client):
+    client = make_client(router)
+    response = client.get(
+        "/tags/products/by-tag", params={"tag_name": "Wireless", "fields": "secret"}
+    )
+    assert response.status_code == 400
+    response = client.get(
+        "/tags/products/by-tag", params={"tag_name": "Wireless", "cursor": "???"}
+    )
+    assert response.status_code == 400
+
+
+def test_product_tags_route_still_serves_a_products_tags(
+    session, make_product, make_client
+):
+    product = make_product()
+    TagService(session).add_tags_to_product(product.id, ["Wireless"])
+    client = make_client(router)
+
+    response = client.get("/tags/products", params={"product_id": product.id})
+    assert response.status_code == 200
+    assert response.json()["tag_names"] == ["Wireless"]